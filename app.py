@@ -6,18 +6,20 @@ from werkzeug.security import generate_password_hash, check_password_hash
 import os
 import uuid
 import logging
-import json
 import stripe
 import shutil
 from dotenv import load_dotenv
 from datetime import datetime, timezone
 from typing import Dict, Any, List
 from functools import wraps
+from operator import attrgetter, itemgetter
 import time
 from utils.database import BookDatabase
-from utils.task_manager import task_manager, TaskStatus
-from models.book_model import BookProject
+from utils import json_utils
+from utils.task_manager import get_task_manager, TaskStatus
+from models.book_model import BookProject, ProjectStats, count_words
 from utils.agent_factory import get_agent, ALL_TOOLS
+from tools.file_tools import write_atomic
 
 # Load environment variables
 load_dotenv()
@@ -505,7 +507,13 @@ def webhook():
 def list_projects():
     """List all book projects for the current user."""
     try:
-        projects = storage.list_user_projects(current_user.id)
+        # Optional keyset paging: ?limit=N&before=<updated_at>&before_id=<id>
+        before = request.args.get('before')
+        projects = storage.list_user_projects(
+            current_user.id,
+            limit=request.args.get('limit', type=int),
+            before=(before, request.args.get('before_id', '')) if before else None
+        )
         return jsonify({
             'success': True,
             'projects': projects
@@ -629,7 +637,7 @@ def start_writing(project_id):
             }), 403
 
         # Check if project is already being processed
-        existing_tasks = task_manager.get_project_tasks(project_id)
+        existing_tasks = get_task_manager().get_project_tasks(project_id)
         running_tasks = [task for task in existing_tasks if task.status.value in ['pending', 'running']]
         
         if running_tasks:
@@ -639,7 +647,7 @@ def start_writing(project_id):
             }), 400
         
         # Create async task for writing
-        task_id = task_manager.create_task('write_book', project_id)
+        task_id = get_task_manager().create_task('write_book', project_id)
         
         # Update project status
         project.status = 'writing'
@@ -679,7 +687,7 @@ def stop_writing(project_id):
             }), 403
 
         # Get active tasks for this project
-        tasks = task_manager.get_project_tasks(project_id)
+        tasks = get_task_manager().get_project_tasks(project_id)
         running_tasks = [task for task in tasks if task.status.value in ['pending', 'running']]
         
         if not running_tasks:
@@ -691,7 +699,7 @@ def stop_writing(project_id):
         # Cancel all running tasks
         cancelled_count = 0
         for task in running_tasks:
-            if task_manager.cancel_task(task.id):
+            if get_task_manager().cancel_task(task.id):
                 cancelled_count += 1
         
         if cancelled_count > 0:
@@ -722,7 +730,7 @@ def stop_writing(project_id):
 def resume_writing(project_id):
     """Resume a stopped or failed writing process."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({
                 'success': False,
@@ -744,7 +752,7 @@ def resume_writing(project_id):
             }), 400
 
         # Check for existing running tasks
-        existing_tasks = task_manager.get_project_tasks(project_id)
+        existing_tasks = get_task_manager().get_project_tasks(project_id)
         running_tasks = [task for task in existing_tasks if task.status.value in ['pending', 'running']]
 
         if running_tasks:
@@ -754,7 +762,7 @@ def resume_writing(project_id):
             }), 400
 
         # Create resume task
-        task_id = task_manager.create_task('resume_book', project_id)
+        task_id = get_task_manager().create_task('resume_book', project_id)
 
         return jsonify({
             'success': True,
@@ -790,13 +798,17 @@ def get_progress(project_id):
             }), 403
 
         # Get the most recent task for this project
-        tasks = task_manager.get_project_tasks(project_id)
+        tasks = get_task_manager().get_project_tasks(project_id)
         
         # If no tasks found, return project-based progress
         if not tasks:
             # Check if project has been written to (has chapters or files)
             project_dir = f"projects/{project_id}"
-            has_chapters = os.path.exists(f"{project_dir}/chapters") and os.listdir(f"{project_dir}/chapters")
+            has_chapters = False
+            if os.path.isdir(f"{project_dir}/chapters"):
+                # Stop at the first entry instead of listing the whole directory
+                with os.scandir(f"{project_dir}/chapters") as entries:
+                    has_chapters = any(entries)
             has_outline = os.path.exists(f"{project_dir}/outline.txt")
             has_research = os.path.exists(f"{project_dir}/research_notes.txt")
             
@@ -852,24 +864,25 @@ def get_progress(project_id):
             })
         
         # Get the most recent task
-        latest_task = max(tasks, key=lambda t: t.created_at)
+        latest_task = max(tasks, key=attrgetter('created_at'))
         
-        # Convert task to progress format
+        # Convert task to progress format; one snapshot keeps the fields consistent
+        snapshot = latest_task.to_dict()
         progress_data = {
             'success': True,
             'project_id': project_id,
-            'task_id': latest_task.id,
-            'phase': latest_task.current_phase,
-            'progress_percentage': latest_task.progress,
-            'message': latest_task.message,
-            'status': latest_task.status.value,
-            'completed': latest_task.status.value == 'completed',
-            'error': latest_task.error,
-            'recent_activities': latest_task.activities,
-            'phase_order': _get_phase_order(latest_task.current_phase),
-            'created_at': latest_task.created_at.isoformat(),
-            'started_at': latest_task.started_at.isoformat() if latest_task.started_at else None,
-            'completed_at': latest_task.completed_at.isoformat() if latest_task.completed_at else None
+            'task_id': snapshot['id'],
+            'phase': snapshot['current_phase'],
+            'progress_percentage': snapshot['progress'],
+            'message': snapshot['message'],
+            'status': snapshot['status'],
+            'completed': snapshot['status'] == 'completed',
+            'error': snapshot['error'],
+            'recent_activities': snapshot['activities'],
+            'phase_order': _get_phase_order(snapshot['current_phase']),
+            'created_at': snapshot['created_at'],
+            'started_at': snapshot['started_at'],
+            'completed_at': snapshot['completed_at']
         }
         
         return jsonify(progress_data)
@@ -957,7 +970,7 @@ def _get_recent_activities(project, has_outline: bool, has_chapters: bool) -> li
 def check_project_task_status(project_id):
     """Check if a project has an active background task."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({
                 'success': False,
@@ -972,14 +985,14 @@ def check_project_task_status(project_id):
             }), 403
 
         # Get tasks for this project
-        tasks = task_manager.get_project_tasks(project_id)
+        tasks = get_task_manager().get_project_tasks(project_id)
         
         # Find active tasks (pending or running)
         active_tasks = [task for task in tasks if task.status.value in ['pending', 'running']]
         
         if active_tasks:
             # Return the most recent active task
-            latest_active = max(active_tasks, key=lambda t: t.created_at)
+            latest_active = max(active_tasks, key=attrgetter('created_at'))
             return jsonify({
                 'success': True,
                 'hasActiveTask': True,
@@ -1026,11 +1039,11 @@ def get_project_chapters(project_id):
         
         if os.path.exists(chapters_dir):
             # Get all .md files and sort them naturally
-            chapter_files = [f for f in os.listdir(chapters_dir) if f.endswith('.md')]
-            chapter_files.sort(key=lambda x: int(x.split('_')[1].split('.')[0]))
+            with os.scandir(chapters_dir) as entries:
+                chapter_files = [(e.name, e.path) for e in entries if e.name.endswith('.md')]
+            chapter_files.sort(key=lambda x: int(x[0].split('_')[1].split('.')[0]))
             
-            for filename in chapter_files:
-                chapter_path = os.path.join(chapters_dir, filename)
+            for filename, chapter_path in chapter_files:
                 try:
                     with open(chapter_path, 'r', encoding='utf-8') as f:
                         content = f.read()
@@ -1079,7 +1092,7 @@ def get_project_chapters(project_id):
 def get_project_documents(project_id):
     """Get planning and supporting documents for a project."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({
                 'success': False,
@@ -1208,7 +1221,7 @@ def get_project_history(project_id):
 def get_project_statistics(project_id):
     """Get statistics for a project."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({
                 'success': False,
@@ -1317,7 +1330,7 @@ def get_file_content():
 def delete_project(project_id):
     """Delete a project and all its associated data."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({
                 'success': False,
@@ -1332,20 +1345,22 @@ def delete_project(project_id):
             }), 403
 
         # Check if project has active tasks
-        tasks = task_manager.get_project_tasks(project_id)
+        tasks = get_task_manager().get_project_tasks(project_id)
         running_tasks = [task for task in tasks if task.status.value in ['pending', 'running']]
         
         # Cancel any pending tasks
         for task in tasks:
             if task.status.value == 'pending':
-                task_manager.cancel_task(task.id)
+                get_task_manager().cancel_task(task.id)
         
         # For running tasks, mark them as cancelled to allow deletion
         for task in running_tasks:
             if task.status.value == 'running':
-                task.status = TaskStatus.CANCELLED
-                task.completed_at = datetime.now()
-                task.message = "Task cancelled due to project deletion"
+                task.update(
+                    status=TaskStatus.CANCELLED,
+                    completed_at=datetime.now(),
+                    message="Task cancelled due to project deletion"
+                )
                 logger.info(f"Cancelled running task {task.id} for project deletion")
         
         # Delete project files and directory
@@ -1381,7 +1396,7 @@ def delete_project(project_id):
 def download_book(project_id):
     """Download the final book as a text file."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({
                 'success': False,
@@ -1428,7 +1443,7 @@ def download_book(project_id):
 def download_pdf(project_id):
     """Download the book as a formatted PDF."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({
                 'success': False,
@@ -1494,7 +1509,7 @@ def chat_with_agent(project_id):
             }), 402
 
         # Get project context for the Supervisor
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
         
@@ -1503,7 +1518,7 @@ def chat_with_agent(project_id):
         if stream:
             def generate():
                 for update in agent.chat_with_agent_stream(project_id, message):
-                    yield f"data: {json.dumps(update)}\n\n"
+                    yield f"data: {json_utils.dumps(update)}\n\n"
             return Response(generate(), mimetype='text/event-stream')
         
         # Route to agent's chat
@@ -1933,7 +1948,7 @@ def list_tools():
 def list_project_files(project_id):
     """List files in a project directory."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({
                 'success': False,
@@ -1965,7 +1980,7 @@ def list_project_files(project_id):
 def read_project_file(project_id, file_path):
     """Read a specific project file."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({
                 'success': False,
@@ -2079,7 +2094,7 @@ def save_settings():
 def export_book(project_id, format):
     """Export book to specified format (txt, json, pdf, epub, docx)."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({
                 'success': False,
@@ -2185,7 +2200,7 @@ def get_export_formats(project_id):
 def get_chapter_versions(project_id, chapter_num):
     """Get version history for a chapter."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2210,7 +2225,7 @@ def get_chapter_versions(project_id, chapter_num):
 def get_chapter_version_content(project_id, chapter_num, version_num):
     """Get content of a specific chapter version."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2247,7 +2262,7 @@ def get_chapter_version_content(project_id, chapter_num, version_num):
 def restore_chapter_version(project_id, chapter_num, version_num):
     """Restore a chapter to a specific version."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2282,7 +2297,7 @@ def restore_chapter_version(project_id, chapter_num, version_num):
 def get_chapter_content(project_id, chapter_num):
     """Get chapter content for editing."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2355,9 +2370,8 @@ def update_chapter_content(project_id, chapter_num):
                 change_summary='Version before manual edit'
             )
 
-        # Write new content
-        with open(chapter_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Write new content; the old file stays intact if the write fails
+        write_atomic(chapter_path, content.encode('utf-8'))
 
         # Save new version
         storage.save_chapter_version(
@@ -2370,10 +2384,11 @@ def update_chapter_content(project_id, chapter_num):
 
         # Update project word count
         total_words = 0
-        for filename in os.listdir(chapters_dir):
-            if filename.endswith('.md'):
-                with open(os.path.join(chapters_dir, filename), 'r', encoding='utf-8') as f:
-                    total_words += len(f.read().split())
+        with os.scandir(chapters_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.md') and entry.is_file():
+                    with open(entry.path, 'r', encoding='utf-8') as f:
+                        total_words += len(f.read().split())
 
         project.total_words = total_words
         project.updated_at = datetime.now()
@@ -2432,7 +2447,7 @@ def delete_chapter(project_id, chapter_num):
 def reorder_chapters(project_id):
     """Reorder chapters."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2483,7 +2498,7 @@ def reorder_chapters(project_id):
 def get_characters(project_id):
     """Get all characters for a project."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2506,7 +2521,7 @@ def get_characters(project_id):
 def create_character(project_id):
     """Create a new character."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2536,7 +2551,7 @@ def create_character(project_id):
 def update_character(project_id, character_id):
     """Update a character."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2563,7 +2578,7 @@ def update_character(project_id, character_id):
 def delete_character(project_id, character_id):
     """Delete a character."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2590,7 +2605,7 @@ def delete_character(project_id, character_id):
 def get_plot_points(project_id):
     """Get all plot points for a project."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2613,7 +2628,7 @@ def get_plot_points(project_id):
 def create_plot_point(project_id):
     """Create a new plot point."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2642,7 +2657,7 @@ def create_plot_point(project_id):
 def update_plot_point(project_id, plot_id):
     """Update a plot point."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2669,7 +2684,7 @@ def update_plot_point(project_id, plot_id):
 def delete_plot_point(project_id, plot_id):
     """Delete a plot point."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2805,7 +2820,7 @@ def get_genre_prompts():
 def progress_stream(project_id):
     """Server-Sent Events stream for real-time progress updates."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2818,22 +2833,23 @@ def progress_stream(project_id):
 
             while True:
                 # Get current task status
-                tasks = task_manager.get_project_tasks(project_id)
+                tasks = get_task_manager().get_project_tasks(project_id)
                 active_tasks = [t for t in tasks if t.status.value in ['pending', 'running']]
 
                 if active_tasks:
-                    latest_task = max(active_tasks, key=lambda t: t.created_at)
+                    latest_task = max(active_tasks, key=attrgetter('created_at'))
+                    snapshot = latest_task.to_dict()
                     progress_data = {
                         'type': 'progress',
-                        'phase': latest_task.current_phase,
-                        'progress': latest_task.progress,
-                        'message': latest_task.message,
-                        'status': latest_task.status.value,
-                        'activities': latest_task.activities[-5:] if latest_task.activities else []
+                        'phase': snapshot['current_phase'],
+                        'progress': snapshot['progress'],
+                        'message': snapshot['message'],
+                        'status': snapshot['status'],
+                        'activities': snapshot['activities'][-5:]
                     }
                 else:
                     # Check project status
-                    project = storage.get_project(project_id)
+                    project = storage.get_project_summary(project_id)
                     progress_data = {
                         'type': 'progress',
                         'phase': project.status if project else 'unknown',
@@ -2845,7 +2861,7 @@ def progress_stream(project_id):
 
                 # Only send if changed
                 if progress_data != last_progress:
-                    yield f"data: {json.dumps(progress_data)}\n\n"
+                    yield f"data: {json_utils.dumps(progress_data)}\n\n"
                     last_progress = progress_data
 
                 time.sleep(2)  # Poll every 2 seconds
@@ -2911,15 +2927,16 @@ def backup_project(project_id):
         backup_data['chapter_versions'] = {}
         chapters_dir = f"{project_dir}/chapters"
         if os.path.exists(chapters_dir):
-            for filename in os.listdir(chapters_dir):
-                if filename.endswith('.md'):
-                    chapter_num = filename.split('_')[1].split('.')[0]
-                    versions = storage.get_chapter_versions(f"chapter_{chapter_num}", project_id)
-                    if versions:
-                        backup_data['chapter_versions'][chapter_num] = versions
+            with os.scandir(chapters_dir) as entries:
+                chapter_names = [e.name for e in entries if e.name.endswith('.md')]
+            for filename in chapter_names:
+                chapter_num = filename.split('_')[1].split('.')[0]
+                versions = storage.get_chapter_versions(f"chapter_{chapter_num}", project_id)
+                if versions:
+                    backup_data['chapter_versions'][chapter_num] = versions
 
         return Response(
-            json.dumps(backup_data, indent=2),
+            json_utils.dumpb(backup_data, indent=True),
             mimetype='application/json',
             headers={
                 'Content-Disposition': f'attachment; filename="backup_{project.title.replace(" ", "_")}_{project_id}.json"'
@@ -2935,7 +2952,7 @@ def backup_project(project_id):
 def restore_project(project_id):
     """Restore project from backup."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2946,15 +2963,14 @@ def restore_project(project_id):
             return jsonify({'success': False, 'error': 'No backup file provided'}), 400
 
         backup_file = request.files['backup_file']
-        backup_data = json.load(backup_file.stream)
+        backup_data = json_utils.loads(backup_file.stream.read())
 
         # Restore files
         project_dir = f"projects/{project_id}"
         for rel_path, content in backup_data.get('files', {}).items():
             file_path = os.path.join(project_dir, rel_path)
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            write_atomic(file_path, content.encode('utf-8'))
 
         # Restore characters
         for char_data in backup_data.get('characters', []):
@@ -2984,7 +3000,7 @@ def restore_project(project_id):
 def get_project_analytics(project_id):
     """Get detailed analytics for a project."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -2996,32 +3012,35 @@ def get_project_analytics(project_id):
         chapters_dir = f"projects/{project_id}/chapters"
 
         if os.path.exists(chapters_dir):
-            for filename in os.listdir(chapters_dir):
-                if filename.endswith('.md'):
-                    chapter_num = int(filename.split('_')[1].split('.')[0])
-                    with open(os.path.join(chapters_dir, filename), 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        chapters.append({
-                            'number': chapter_num,
-                            'word_count': len(content.split()),
-                            'char_count': len(content)
-                        })
-
-        chapters.sort(key=lambda x: x['number'])
-
-        # Calculate statistics
+            with os.scandir(chapters_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.md') and entry.is_file():
+                        chapter_num = int(entry.name.split('_')[1].split('.')[0])
+                        with open(entry.path, 'r', encoding='utf-8') as f:
+                            content = f.read()
+                            chapters.append({
+                                'number': chapter_num,
+                                'word_count': count_words(content),
+                                'char_count': len(content)
+                            })
+
+        chapters.sort(key=itemgetter('number'))
+
+        # Calculate statistics over the flat word-count list, summing it only once
         word_counts = [c['word_count'] for c in chapters]
+        total_words = sum(word_counts)
+        stats = ProjectStats.from_word_counts(project_id, word_counts)
 
         analytics = {
             'total_chapters': len(chapters),
-            'total_words': sum(word_counts) if word_counts else 0,
-            'average_chapter_length': sum(word_counts) / len(word_counts) if word_counts else 0,
+            'total_words': total_words,
+            'average_chapter_length': stats.average_chapter_length,
             'max_chapter_length': max(word_counts) if word_counts else 0,
             'min_chapter_length': min(word_counts) if word_counts else 0,
             'chapters': chapters,
             'word_count_distribution': word_counts,
             'target_length': project.target_length,
-            'completion_percentage': (sum(word_counts) / project.target_length * 100) if project.target_length > 0 else 0,
+            'completion_percentage': (total_words / project.target_length * 100) if project.target_length > 0 else 0,
             'days_since_creation': (datetime.now() - datetime.fromisoformat(project.created_at)).days if project.created_at else 0,
             'estimated_completion': None
         }
@@ -3067,7 +3086,7 @@ project_shares = {}
 def share_project(project_id):
     """Share project with another user."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -3116,7 +3135,7 @@ def share_project(project_id):
 def get_project_shares(project_id):
     """Get all shares for a project."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -3139,7 +3158,7 @@ def get_project_shares(project_id):
 def revoke_share(project_id, share_id):
     """Revoke a project share."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -3164,7 +3183,7 @@ project_comments = {}
 def get_comments(project_id):
     """Get comments for a project."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -3181,7 +3200,7 @@ def get_comments(project_id):
 def add_comment(project_id, chapter_num=None):
     """Add a comment to a project or chapter."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -3378,7 +3397,7 @@ def check_content_safety(content: str) -> Dict[str, Any]:
 def check_project_safety(project_id):
     """Check content safety for the entire project."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -3394,23 +3413,24 @@ def check_project_safety(project_id):
         # Check each chapter
         chapters_dir = f"projects/{project_id}/chapters"
         if os.path.exists(chapters_dir):
-            for filename in os.listdir(chapters_dir):
-                if filename.endswith('.md'):
-                    chapter_num = int(filename.split('_')[1].split('.')[0])
-                    with open(os.path.join(chapters_dir, filename), 'r', encoding='utf-8') as f:
-                        content = f.read()
-
-                    safety_result = check_content_safety(content)
-                    results['chapters'].append({
-                        'chapter_number': chapter_num,
-                        'safety': safety_result
-                    })
+            with os.scandir(chapters_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.md') and entry.is_file():
+                        chapter_num = int(entry.name.split('_')[1].split('.')[0])
+                        with open(entry.path, 'r', encoding='utf-8') as f:
+                            content = f.read()
+
+                        safety_result = check_content_safety(content)
+                        results['chapters'].append({
+                            'chapter_number': chapter_num,
+                            'safety': safety_result
+                        })
 
-                    if safety_result['has_warnings']:
-                        results['overall_warnings'].extend([
-                            {'chapter': chapter_num, **w}
-                            for w in safety_result['warnings']
-                        ])
+                        if safety_result['has_warnings']:
+                            results['overall_warnings'].extend([
+                                {'chapter': chapter_num, **w}
+                                for w in safety_result['warnings']
+                            ])
 
         return jsonify({
             'success': True,
@@ -3455,7 +3475,7 @@ scheduled_tasks = {}
 def schedule_writing(project_id):
     """Schedule a writing task for later."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -3507,7 +3527,7 @@ def schedule_writing(project_id):
 def get_scheduled_tasks(project_id):
     """Get all scheduled tasks for a project."""
     try:
-        project = storage.get_project(project_id)
+        project = storage.get_project_summary(project_id)
         if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
 
@@ -5,19 +5,20 @@ This agent uses OpenAI (or OpenAI-compatible APIs) for real AI-powered book gene
 following the patterns from OpenAI's function calling and coding agent templates.
 """
 
-import json
 import uuid
 import os
 import time
 from typing import List, Dict, Any, Optional, Generator, Callable
 from datetime import datetime
 import logging
+from contextvars import ContextVar
 from functools import wraps
 
 from utils.llm_client import (
     LLMClient,
     LLMConfig,
     LLMResponse,
+    IterationInfo,
     ToolDefinition,
     ChatMessage,
     AgentMode,
@@ -31,13 +32,19 @@ from utils.llm_client import (
 
 
 from utils.database import BookDatabase
-from models.book_model import BookProject
+from utils import json_utils
+from models.book_model import BookProject, count_words
 
 # Import BaseTool from tools package
 from tools.file_tools import BaseTool
 
 logger = logging.getLogger(__name__)
 
+# Progress callback for the writing process running in the current context.
+# The agent instance is shared by every task worker thread, so the callback
+# cannot live on the instance without workers overwriting each other's.
+_progress_callback: 'ContextVar[Optional[Callable]]' = ContextVar('bookgpt_progress_callback', default=None)
+
 
 # =============================================================================
 # RETRY LOGIC
@@ -186,12 +193,13 @@ Focus on:
         self.tools = {tool.name(): tool for tool in tools}
         self.conversation_history = {}
         self.project_states = {}
-        self.progress_callback = None
         self.db = db or BookDatabase()
         
         # Agent configuration
         self.max_iterations = 20
         self.current_iteration = 0
+        # Token budget for a single chapter's editing agent before it is cut off
+        self.max_editing_tokens_per_chapter = int(os.getenv("MAX_EDITING_TOKENS_PER_CHAPTER", "200000"))
         
         # Initialize LLM client
         if llm_client:
@@ -204,7 +212,9 @@ Focus on:
             ToolDefinition(
                 name=tool.name(),
                 description=tool.description(),
-                parameters=tool.parameters_schema()
+                parameters=tool.parameters_schema(),
+                pure=tool.READ_ONLY,
+                target_path=tool.target_path
             )
             for tool in tools
         ]
@@ -231,6 +241,7 @@ Focus on:
             'chapter_count': project.chapters_completed,
             'total_words': project.total_words,
             'iterations': 0, # We don't track iterations across restarts yet
+            'target_chapters': max(1, project.target_length // 5000),
             'completed': project.status == 'completed',
             'errors': [],
             'conversation_history': project.metadata.get('conversation_history', []),
@@ -256,6 +267,11 @@ Focus on:
         
         # Save conversation history in metadata
         project.metadata['conversation_history'] = state.get('conversation_history', [])
+        in_flight = state.get('in_flight_message')
+        if in_flight:
+            project.metadata['in_flight_message'] = in_flight
+        else:
+            project.metadata.pop('in_flight_message', None)
         
         # Persist to database
         self.db.save_project(project)
@@ -283,6 +299,7 @@ Focus on:
                 'chapter_count': project.chapters_completed,
                 'total_words': project.total_words,
                 'iterations': 0,
+                'target_chapters': max(1, project.target_length // 5000),
                 'completed': project.status == 'completed',
                 'errors': [],
                 'conversation_history': project.metadata.get('conversation_history', []),
@@ -324,13 +341,20 @@ Focus on:
             }
 
     def set_progress_callback(self, callback):
-        """Set a callback function to receive progress updates."""
-        self.progress_callback = callback
+        """
+        Set a callback function to receive progress updates.
+        
+        The callback applies to the current thread (context) only, so tasks
+        running concurrently on the shared agent each get their own updates.
+        Pass None to clear it.
+        """
+        _progress_callback.set(callback)
     
     def _report_progress(self, phase: str, progress: float, message: str, activity: str = None):
         """Report progress to the callback if set."""
-        if self.progress_callback:
-            self.progress_callback(phase, progress, message, activity)
+        callback = _progress_callback.get()
+        if callback:
+            callback(phase, progress, message, activity)
     
     def _create_llm_client(
         self, 
@@ -383,6 +407,7 @@ Focus on:
                 'current_phase': 'planning',
                 'chapter_count': 0,
                 'total_words': 0,
+                'target_chapters': max(1, project.target_length // 5000),
                 'iterations': 0,
                 'completed': False,
                 'errors': [],
@@ -681,7 +706,7 @@ This research will inform the writing process."""}
                         'chapter_number': i+1,
                         'title': chapter.get('title', 'Untitled'),
                         'content': chapter_content,
-                        'word_count': len(chapter_content.split())
+                        'word_count': count_words(chapter_content)
                     })
                 else:
                     logger.error(f"Failed to write chapter {i+1}")
@@ -715,7 +740,7 @@ This research will inform the writing process."""}
             # Get chapter-specific guidance from outline
             chapters = outline.get('chapters', [])
             chapter_guidance = ""
-            total_expected_chapters = len(chapters) if chapters else max(1, project.target_length // 5000)
+            total_expected_chapters = len(chapters) if chapters else state['target_chapters']
             
             # Report progress
             progress = 30.0 + (min(chapter_number - 1, total_expected_chapters) / total_expected_chapters) * 60.0
@@ -736,7 +761,7 @@ This research will inform the writing process."""}
 
 Genre: {project.genre}
 Writing Style: {project.writing_style}
-Target chapter length: approximately {project.target_length // (project.target_length // 5000):,} words
+Target chapter length: approximately {project.target_length // state['target_chapters']:,} words
 {chapter_guidance}
 {previous_context}
 
@@ -760,7 +785,7 @@ Begin the chapter now:"""}
             
             if response.content:
                 chapter_content = response.content
-                word_count = len(chapter_content.split())
+                word_count = count_words(chapter_content)
                 
                 # Save chapter using write_file tool
                 if 'write_file' in self.tools:
@@ -798,11 +823,29 @@ Begin the chapter now:"""}
         state = self.project_states[project_id]
         project = state['project']
         
-        editing_changes = []
+        # One slot per chapter, assigned by index so results stay in chapter order
+        editing_changes: List[Optional[Dict[str, Any]]] = [None] * state['chapter_count']
+        total_iterations = 0
+        total_tool_calls = 0
         
         try:
             logger.info(f"Starting agentic editing for project: {project.title}")
             
+            # Read the invariant reference files once and embed them in the system
+            # prompt, rather than having every chapter's agent re-fetch them
+            reference_sections = []
+            if 'read_file' in self.tools:
+                for ref_path, ref_title in (("outline.md", "Outline"), ("research_notes.md", "Research Notes")):
+                    ref_result = self.tools['read_file'].execute(project_id=project_id, path=ref_path)
+                    if ref_result.get('success'):
+                        reference_sections.append(f"### {ref_title} ({ref_path})\n{ref_result['content']}")
+            reference_materials = ""
+            if reference_sections:
+                reference_materials = (
+                    "\n\nReference Materials (already loaded - no need to read these files again):\n\n"
+                    + "\n\n".join(reference_sections)
+                )
+            
             # System prompt for the editing agent - framed like a coding agent for books
             editing_system_message = f"""You are a professional book editor working like a coding agent (similar to Cursor, Windsurf, or Aider), but for book manuscripts.
 
@@ -847,8 +890,39 @@ For each chapter:
 
 Always include "project_id": "{project_id}" in every tool call.
 
-Start by reading chapter 1 and begin editing it."""
-
+Start by reading chapter 1 and begin editing it.{reference_materials}"""
+
+            # Use AgentMode for agentic editing (shared by every chapter)
+            agent = AgentMode(
+                client=self.llm,
+                tools=[ToolDefinition(
+                    name=tool.name(),
+                    description=tool.description(),
+                    parameters=tool.parameters_schema(),
+                    pure=tool.READ_ONLY,
+                    target_path=tool.target_path
+                ) for tool in [
+                    self.tools.get('read_file'),
+                    self.tools.get('edit_file'),
+                    self.tools.get('grep_search'),
+                    self.tools.get('write_file')
+                ] if tool is not None],
+                system_message=editing_system_message,
+                max_iterations=15
+            )
+            
+            # Tool executor that includes project_id
+            def tool_executor(tool_name: str, args: Dict[str, Any]) -> Any:
+                args.setdefault('project_id', project_id)
+                tool = self.tools.get(tool_name)
+                if not tool:
+                    return {'success': False, 'error': f"Unknown tool: {tool_name}"}
+                try:
+                    return tool.execute(**args)
+                except Exception as e:
+                    logger.error(f"Tool execution error for {tool_name}: {e}")
+                    return {'success': False, 'error': str(e)}
+            
             # Iterate through each chapter and use AgentMode to edit it
             for chapter_num in range(1, state['chapter_count'] + 1):
                 logger.info(f"Editing chapter {chapter_num} of {state['chapter_count']}")
@@ -871,61 +945,62 @@ Read the full chapter file at chapters/chapter_{chapter_num}.md, then:
 
 After making edits, briefly summarize what you changed."""
                 
-                # Use AgentMode for agentic editing
-                agent = AgentMode(
-                    client=self.llm,
-                    tools=[ToolDefinition(
-                        name=tool.name(),
-                        description=tool.description(),
-                        parameters=tool.parameters_schema()
-                    ) for tool in [
-                        self.tools.get('read_file'),
-                        self.tools.get('edit_file'),
-                        self.tools.get('grep_search'),
-                        self.tools.get('write_file')
-                    ] if tool is not None],
-                    system_message=editing_system_message,
-                    max_iterations=15
-                )
+                # Abort runaway loops once this chapter exceeds its token budget
+                chapter_tokens = {'used': 0}
                 
-                # Tool executor that includes project_id
-                def tool_executor(tool_name: str, args: Dict[str, Any]) -> Any:
-                    args.setdefault('project_id', project_id)
-                    tool = self.tools.get(tool_name)
-                    if not tool:
-                        return {'success': False, 'error': f"Unknown tool: {tool_name}"}
-                    try:
-                        return tool.execute(**args)
-                    except Exception as e:
-                        logger.error(f"Tool execution error for {tool_name}: {e}")
-                        return {'success': False, 'error': str(e)}
+                def on_iteration(info: IterationInfo, chapter_num: int = chapter_num) -> bool:
+                    chapter_tokens['used'] += info.input_tokens + info.output_tokens
+                    logger.debug(
+                        f"Chapter {chapter_num} editing round {info.iteration}: "
+                        f"{info.input_tokens} in / {info.output_tokens} out tokens, "
+                        f"{info.tool_calls} tool calls, {info.elapsed_ms:.0f}ms"
+                    )
+                    if chapter_tokens['used'] > self.max_editing_tokens_per_chapter:
+                        logger.warning(
+                            f"Chapter {chapter_num} editing exceeded token budget "
+                            f"({chapter_tokens['used']} > {self.max_editing_tokens_per_chapter}), aborting"
+                        )
+                        return False
+                    return True
                 
                 # Run the editing agent for this chapter
+                # project_id goes in as context so memoized reads are keyed on
+                # the file they actually read
                 result = agent.run(
                     messages=[{"role": "user", "content": edit_message}],
-                    tool_executor=tool_executor
+                    tool_executor=tool_executor,
+                    context={'project_id': project_id},
+                    on_iteration=on_iteration
                 )
                 
                 # Track what was edited
-                editing_changes.append({
+                chapter_iterations = result.get('iterations', 0)
+                chapter_tool_calls = len(result.get('tool_results', []))
+                total_iterations += chapter_iterations
+                total_tool_calls += chapter_tool_calls
+                editing_changes[chapter_num - 1] = {
                     'chapter': chapter_num,
-                    'iterations': result.get('iterations', 0),
+                    'iterations': chapter_iterations,
                     'summary': result.get('content', ''),
-                    'tool_calls_made': len(result.get('tool_results', [])),
+                    'tool_calls_made': chapter_tool_calls,
                     'finished': result.get('finished', True)
-                })
+                }
                 
-                logger.info(f"Chapter {chapter_num} editing complete: {result.get('iterations', 0)} iterations, {len(result.get('tool_results', []))} tool calls")
+                logger.info(f"Chapter {chapter_num} editing complete: {chapter_iterations} iterations, {chapter_tool_calls} tool calls")
                 
                 # Save the edited chapter info to track progress
-                state['editing_progress'] = editing_changes
+                state['editing_progress'] = [c for c in editing_changes if c is not None]
                 
                 # Brief pause to avoid rate limiting
                 import time
                 time.sleep(1)
             
+            editing_changes = [c for c in editing_changes if c is not None]
+            
             # Generate editing summary document
-            summary_content = self._generate_editing_summary(editing_changes, project, state)
+            summary_content = self._generate_editing_summary(
+                editing_changes, project, state, total_iterations, total_tool_calls
+            )
             
             if 'write_file' in self.tools:
                 self.tools['write_file'].execute(
@@ -940,8 +1015,8 @@ After making edits, briefly summarize what you changed."""
                 'success': True,
                 'editing_summary': summary_content,
                 'chapters_edited': state['chapter_count'],
-                'total_editing_iterations': sum(c['iterations'] for c in editing_changes),
-                'total_tool_calls': sum(c['tool_calls_made'] for c in editing_changes),
+                'total_editing_iterations': total_iterations,
+                'total_tool_calls': total_tool_calls,
                 'changes_made': True
             }
             
@@ -951,7 +1026,14 @@ After making edits, briefly summarize what you changed."""
             logger.error(f"Full traceback: {traceback.format_exc()}")
             return {'success': False, 'error': str(e)}
     
-    def _generate_editing_summary(self, editing_changes: List[Dict[str, Any]], project: Any, state: Dict[str, Any]) -> str:
+    def _generate_editing_summary(
+        self,
+        editing_changes: List[Dict[str, Any]],
+        project: Any,
+        state: Dict[str, Any],
+        total_iterations: int,
+        total_tool_calls: int
+    ) -> str:
         """
         Generate a comprehensive summary of all editing changes made.
         
@@ -959,6 +1041,8 @@ After making edits, briefly summarize what you changed."""
             editing_changes: List of changes made per chapter
             project: The book project
             state: Current project state
+            total_iterations: Sum of agent iterations across all chapters
+            total_tool_calls: Sum of tool calls across all chapters
             
         Returns:
             Formatted editing summary document
@@ -975,13 +1059,10 @@ After making edits, briefly summarize what you changed."""
         lines.append("---\n\n")
         
         # Statistics
-        total_iterations = sum(c.get('iterations', 0) for c in editing_changes)
-        total_tool_calls = sum(c.get('tool_calls_made', 0) for c in editing_changes)
-        
         lines.append("## Editing Statistics\n")
         lines.append(f"- **Total Editing Iterations:** {total_iterations}\n")
         lines.append(f"- **Total Tool Calls Made:** {total_tool_calls}\n")
-        lines.append(f"- **Average Iterations per Chapter:** {total_iterations / len(editing_changes):.1f}\n\n")
+        lines.append(f"- **Average Iterations per Chapter:** {total_iterations / max(1, len(editing_changes)):.1f}\n\n")
         lines.append("---\n\n")
         
         # Per-chapter summary
@@ -1068,11 +1149,8 @@ After making edits, briefly summarize what you changed."""
         state = self.project_states[project_id]
         project = state['project']
         
-        target_chapters = max(1, project.target_length // 5000)
-        target_words = project.target_length
-        
-        return (state['chapter_count'] >= target_chapters or 
-                state['total_words'] >= target_words)
+        return (state['chapter_count'] >= state['target_chapters'] or 
+                state['total_words'] >= project.target_length)
     
     def get_progress(self, project_id: str) -> Dict[str, Any]:
         """Get the current progress of a writing project."""
@@ -1096,6 +1174,7 @@ After making edits, briefly summarize what you changed."""
             'phase': state['current_phase'],
             'iterations': state['iterations'],
             'chapters_completed': state['chapter_count'],
+            'target_chapters': state['target_chapters'],
             'current_words': current_words,
             'target_words': target_words,
             'progress_percentage': round(progress_percentage, 2),
@@ -1158,6 +1237,7 @@ After making edits, briefly summarize what you changed."""
                     'current_phase': step_type,
                     'chapter_count': 0,
                     'total_words': 0,
+                    'target_chapters': max(1, project.target_length // 5000),
                     'iterations': 0,
                     'completed': False,
                     'errors': [],
@@ -1221,13 +1301,6 @@ After making edits, briefly summarize what you changed."""
             system_message = f"""You are a professional AI Writing Agent working on the book "{project.title}".
 Your role is similar to a "coding agent" (like Cursor or Windsurf) but specialized for creative writing and book production.
 
-Current Project Status:
-- Title: {project.title}
-- Genre: {project.genre}
-- Current Phase: {state['current_phase']}
-- Chapters Completed: {state['chapter_count']}
-- Total Words: {state['total_words']:,}
-
 Project Structure:
 - `outline.md`: The book's structure and chapter summaries.
 - `research_notes.md`: Background information and world-building.
@@ -1252,6 +1325,14 @@ After performing tool actions, explain exactly what you changed and why.
 Always include "project_id": "{project_id}" in every tool call.
 Paths are relative to the project root (e.g., "chapters/chapter_1.md")."""
 
+            # Status changes as the book grows, so it follows the cacheable static prompt
+            status_message = f"""Current Project Status:
+- Title: {project.title}
+- Genre: {project.genre}
+- Current Phase: {state['current_phase']}
+- Chapters Completed: {state['chapter_count']}
+- Total Words: {state['total_words']:,}"""
+
             # Add user message to history
             state.setdefault('conversation_history', [])
             state['conversation_history'].append({"role": "user", "content": user_message})
@@ -1276,6 +1357,7 @@ Paths are relative to the project root (e.g., "chapters/chapter_1.md")."""
                     client=self.llm,
                     tools=self.tool_definitions,
                     system_message=system_message,
+                    dynamic_system=status_message,
                     max_iterations=20
                 )
                 result = agent.run(
@@ -1285,7 +1367,8 @@ Paths are relative to the project root (e.g., "chapters/chapter_1.md")."""
             else:
                 # No tools, just chat
                 response = self.llm.chat(
-                    messages=[{"role": "system", "content": system_message}] + messages
+                    messages=[{"role": "system", "content": system_message},
+                              {"role": "system", "content": status_message}] + messages
                 )
                 result = {
                     'content': response.content,
@@ -1306,7 +1389,7 @@ Paths are relative to the project root (e.g., "chapters/chapter_1.md")."""
                         'type': 'function',
                         'function': {
                             'name': tr.get('tool_name'),
-                            'arguments': json.dumps(tr.get('arguments', {}))
+                            'arguments': json_utils.dumps(tr.get('arguments', {}))
                         }
                     })
                 assistant_msg["tool_calls"] = tool_calls
@@ -1318,7 +1401,7 @@ Paths are relative to the project root (e.g., "chapters/chapter_1.md")."""
                     "role": "tool",
                     "tool_call_id": tr.get('tool_call_id'),
                     "name": tr.get('tool_name'),
-                    "content": json.dumps(tr.get('result', {}))
+                    "content": json_utils.dumps(tr.get('result', {}))
                 })
             
             self._save_project_state(project_id)
@@ -1370,13 +1453,6 @@ Paths are relative to the project root (e.g., "chapters/chapter_1.md")."""
             system_message = f"""You are a professional AI Writing Agent working on the book "{project.title}".
 Your role is similar to a "coding agent" (like Cursor or Windsurf) but specialized for creative writing and book production.
 
-Current Project Status:
-- Title: {project.title}
-- Genre: {project.genre}
-- Current Phase: {state['current_phase']}
-- Chapters Completed: {state['chapter_count']}
-- Total Words: {state['total_words']:,}
-
 Project Structure:
 - `outline.md`: The book's structure and chapter summaries.
 - `research_notes.md`: Background information and world-building.
@@ -1401,6 +1477,14 @@ After performing tool actions, explain exactly what you changed and why.
 Always include "project_id": "{project_id}" in every tool call.
 Paths are relative to the project root (e.g., "chapters/chapter_1.md")."""
 
+            # Status changes as the book grows, so it follows the cacheable static prompt
+            status_message = f"""Current Project Status:
+- Title: {project.title}
+- Genre: {project.genre}
+- Current Phase: {state['current_phase']}
+- Chapters Completed: {state['chapter_count']}
+- Total Words: {state['total_words']:,}"""
+
             # Add user message to history
             state.setdefault('conversation_history', [])
             state['conversation_history'].append({"role": "user", "content": user_message})
@@ -1425,34 +1509,38 @@ Paths are relative to the project root (e.g., "chapters/chapter_1.md")."""
                     client=self.llm,
                     tools=self.tool_definitions,
                     system_message=system_message,
+                    dynamic_system=status_message,
                     max_iterations=20
                 )
                 
-                # Forward all streaming updates
+                # Forward all streaming updates. The in-flight assistant message is
+                # kept out of conversation_history until the run completes.
+                turn_content = []
                 for update in agent.run_stream(messages, tool_executor=tool_executor):
-                    if update['type'] == 'turn_complete':
-                        # Save state after each turn
-                        self._save_project_state(project_id)
-                        
-                        # Update conversation history with messages from this turn
-                        # Note: AgentMode doesn't expose internal history, so we add basic structure
-                        state['conversation_history'].append({
+                    if update['type'] == 'content':
+                        turn_content.append(update['data'])
+                    elif update['type'] == 'turn_complete':
+                        state['in_flight_message'] = {
                             "role": "assistant",
-                            "content": "Thinking..."
-                        })
-                    elif update['type'] == 'complete':
+                            "content": ''.join(turn_content)
+                        }
+                        turn_content = []
                         self._save_project_state(project_id)
+                    elif update['type'] == 'complete':
+                        state.pop('in_flight_message', None)
                         
                         # Add final response to history
                         state['conversation_history'].append({
                             "role": "assistant",
                             "content": update['data'].get('content', '')
                         })
+                        self._save_project_state(project_id)
                     
                     yield update
             else:
                 # No tools - just stream regular chat
-                all_messages = [{"role": "system", "content": system_message}] + messages
+                all_messages = [{"role": "system", "content": system_message},
+                                {"role": "system", "content": status_message}] + messages
                 for chunk in self.llm.chat_stream(all_messages):
                     yield {'type': 'content', 'data': chunk}
                 yield {'type': 'complete', 'data': {'content': '', 'finished': True}}
@@ -8,11 +8,54 @@ from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import json
+import sys
 
-@dataclass
+# Try to import optional dependencies
+try:
+    from ciso8601 import parse_datetime as _parse_dt
+except ImportError:
+    _parse_dt = datetime.fromisoformat
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Slotted dataclasses need Python 3.10+; older interpreters keep __dict__ storage
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+def count_words(text: str) -> int:
+    """
+    Count whitespace-separated words in text.
+    
+    str.split() runs entirely in C and measures several times faster than
+    regex-based counters (re.finditer/findall) on chapter-sized text, despite
+    building a temporary list.
+    """
+    return len(text.split())
+
+
+def _intern(value: Any) -> Any:
+    """
+    Intern a small-vocabulary string (status, genre, step type) read from storage.
+    
+    Every loaded record then shares one object per distinct value instead of
+    holding its own copy. Non-str values (e.g. None) pass through unchanged.
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class BookProject:
     """Model representing a book writing project."""
     
+    FIELDS = ('id', 'user_id', 'title', 'genre', 'target_length', 'writing_style',
+              'status', 'outline', 'research_materials', 'chapters_completed',
+              'total_words', 'current_chapter', 'created_at', 'updated_at',
+              'completed_at', 'metadata')
+    
     id: str
     user_id: str
     title: str
@@ -30,6 +73,27 @@ class BookProject:
     completed_at: Optional[datetime] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
     
+    def to_tuple(self) -> tuple:
+        """Return the to_dict() values as a tuple ordered like FIELDS."""
+        return (
+            self.id,
+            self.user_id,
+            self.title,
+            self.genre,
+            self.target_length,
+            self.writing_style,
+            self.status,
+            self.outline,
+            self.research_materials,
+            self.chapters_completed,
+            self.total_words,
+            self.current_chapter,
+            self.created_at.isoformat(),
+            self.updated_at.isoformat(),
+            self.completed_at.isoformat() if self.completed_at else None,
+            self.metadata
+        )
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert project to dictionary for JSON serialization."""
         return {
@@ -54,19 +118,22 @@ class BookProject:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'BookProject':
         """Create project from dictionary."""
-        # Parse datetime fields
-        created_at = datetime.fromisoformat(data['created_at']) if data.get('created_at') else datetime.now()
-        updated_at = datetime.fromisoformat(data['updated_at']) if data.get('updated_at') else datetime.now()
-        completed_at = datetime.fromisoformat(data['completed_at']) if data.get('completed_at') else None
+        # Parse datetime fields (a single dict lookup each)
+        created_at = data.get('created_at')
+        created_at = _parse_dt(created_at) if created_at else datetime.now()
+        updated_at = data.get('updated_at')
+        updated_at = _parse_dt(updated_at) if updated_at else datetime.now()
+        completed_at = data.get('completed_at')
+        completed_at = _parse_dt(completed_at) if completed_at else None
         
         return cls(
             id=data['id'],
             user_id=data['user_id'],
             title=data['title'],
-            genre=data['genre'],
+            genre=_intern(data['genre']),
             target_length=data['target_length'],
-            writing_style=data['writing_style'],
-            status=data.get('status', 'created'),
+            writing_style=_intern(data['writing_style']),
+            status=_intern(data.get('status', 'created')),
             outline=data.get('outline'),
             research_materials=data.get('research_materials'),
             chapters_completed=data.get('chapters_completed', 0),
@@ -87,12 +154,13 @@ class BookProject:
             self.total_words = total_words
         if current_chapter is not None:
             self.current_chapter = current_chapter
+        now = datetime.now()
         if status is not None:
             self.status = status
             if status == 'completed':
-                self.completed_at = datetime.now()
+                self.completed_at = now
         
-        self.updated_at = datetime.now()
+        self.updated_at = now
     
     def get_progress_percentage(self) -> float:
         """Calculate progress percentage based on word count."""
@@ -102,10 +170,35 @@ class BookProject:
         percentage = (self.total_words / self.target_length) * 100
         return min(100.0, percentage)
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
+class ProjectSummary:
+    """Scalar columns of a project, without the outline/research/metadata JSON."""
+    
+    FIELDS = ('id', 'user_id', 'title', 'genre', 'target_length', 'writing_style',
+              'status', 'chapters_completed', 'total_words', 'current_chapter',
+              'created_at', 'updated_at', 'completed_at')
+    
+    id: str
+    user_id: str
+    title: str
+    genre: str
+    target_length: int
+    writing_style: str
+    status: str
+    chapters_completed: int
+    total_words: int
+    current_chapter: int
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Chapter:
     """Model representing a single chapter."""
     
+    FIELDS = ('id', 'project_id', 'chapter_number', 'title', 'content', 'word_count',
+              'status', 'created_at', 'updated_at', 'notes')
+    
     id: str
     project_id: str
     chapter_number: int
@@ -117,6 +210,21 @@ class Chapter:
     updated_at: datetime = field(default_factory=datetime.now)
     notes: str = ""
     
+    def to_tuple(self) -> tuple:
+        """Return the to_dict() values as a tuple ordered like FIELDS."""
+        return (
+            self.id,
+            self.project_id,
+            self.chapter_number,
+            self.title,
+            self.content,
+            self.word_count,
+            self.status,
+            self.created_at.isoformat(),
+            self.updated_at.isoformat(),
+            self.notes
+        )
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert chapter to dictionary."""
         return {
@@ -135,8 +243,10 @@ class Chapter:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Chapter':
         """Create chapter from dictionary."""
-        created_at = datetime.fromisoformat(data['created_at']) if data.get('created_at') else datetime.now()
-        updated_at = datetime.fromisoformat(data['updated_at']) if data.get('updated_at') else datetime.now()
+        created_at = data.get('created_at')
+        created_at = _parse_dt(created_at) if created_at else datetime.now()
+        updated_at = data.get('updated_at')
+        updated_at = _parse_dt(updated_at) if updated_at else datetime.now()
         
         return cls(
             id=data['id'],
@@ -145,7 +255,7 @@ class Chapter:
             title=data['title'],
             content=data.get('content', ''),
             word_count=data.get('word_count', 0),
-            status=data.get('status', 'draft'),
+            status=_intern(data.get('status', 'draft')),
             created_at=created_at,
             updated_at=updated_at,
             notes=data.get('notes', '')
@@ -154,13 +264,16 @@ class Chapter:
     def update_content(self, content: str):
         """Update chapter content and recalculate word count."""
         self.content = content
-        self.word_count = len(content.split())
+        self.word_count = count_words(content)
         self.updated_at = datetime.now()
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class AgentExecution:
     """Model representing an agent execution step."""
     
+    FIELDS = ('id', 'project_id', 'step_type', 'input_prompt', 'tool_calls', 'results',
+              'status', 'started_at', 'completed_at', 'error_message', 'execution_time')
+    
     id: str
     project_id: str
     step_type: str
@@ -173,6 +286,22 @@ class AgentExecution:
     error_message: Optional[str] = None
     execution_time: Optional[float] = None
     
+    def to_tuple(self) -> tuple:
+        """Return the to_dict() values as a tuple ordered like FIELDS."""
+        return (
+            self.id,
+            self.project_id,
+            self.step_type,
+            self.input_prompt,
+            self.tool_calls,
+            self.results,
+            self.status,
+            self.started_at.isoformat(),
+            self.completed_at.isoformat() if self.completed_at else None,
+            self.error_message,
+            self.execution_time
+        )
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert execution to dictionary."""
         return {
@@ -192,17 +321,19 @@ class AgentExecution:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'AgentExecution':
         """Create execution from dictionary."""
-        started_at = datetime.fromisoformat(data['started_at']) if data.get('started_at') else datetime.now()
-        completed_at = datetime.fromisoformat(data['completed_at']) if data.get('completed_at') else None
+        started_at = data.get('started_at')
+        started_at = _parse_dt(started_at) if started_at else datetime.now()
+        completed_at = data.get('completed_at')
+        completed_at = _parse_dt(completed_at) if completed_at else None
         
         return cls(
             id=data['id'],
             project_id=data['project_id'],
-            step_type=data['step_type'],
+            step_type=_intern(data['step_type']),
             input_prompt=data['input_prompt'],
             tool_calls=data.get('tool_calls', []),
             results=data.get('results', []),
-            status=data.get('status', 'pending'),
+            status=_intern(data.get('status', 'pending')),
             started_at=started_at,
             completed_at=completed_at,
             error_message=data.get('error_message'),
@@ -211,23 +342,29 @@ class AgentExecution:
     
     def mark_completed(self):
         """Mark execution as completed."""
+        now = datetime.now()
         self.status = "completed"
-        self.completed_at = datetime.now()
+        self.completed_at = now
         if self.started_at:
-            self.execution_time = (self.completed_at - self.started_at).total_seconds()
+            self.execution_time = (now - self.started_at).total_seconds()
     
     def mark_failed(self, error_message: str):
         """Mark execution as failed."""
+        now = datetime.now()
         self.status = "failed"
         self.error_message = error_message
-        self.completed_at = datetime.now()
+        self.completed_at = now
         if self.started_at:
-            self.execution_time = (self.completed_at - self.started_at).total_seconds()
+            self.execution_time = (now - self.started_at).total_seconds()
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ProjectStats:
     """Model representing project statistics."""
     
+    FIELDS = ('project_id', 'total_sessions', 'total_agent_steps', 'total_files_created',
+              'average_chapter_length', 'writing_velocity', 'most_productive_hour',
+              'last_activity')
+    
     project_id: str
     total_sessions: int = 0
     total_agent_steps: int = 0
@@ -237,6 +374,19 @@ class ProjectStats:
     most_productive_hour: int = 0
     last_activity: Optional[datetime] = None
     
+    def to_tuple(self) -> tuple:
+        """Return the to_dict() values as a tuple ordered like FIELDS."""
+        return (
+            self.project_id,
+            self.total_sessions,
+            self.total_agent_steps,
+            self.total_files_created,
+            self.average_chapter_length,
+            self.writing_velocity,
+            self.most_productive_hour,
+            self.last_activity.isoformat() if self.last_activity else None
+        )
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert stats to dictionary."""
         return {
@@ -250,10 +400,27 @@ class ProjectStats:
             'last_activity': self.last_activity.isoformat() if self.last_activity else None
         }
     
+    @classmethod
+    def from_word_counts(cls, project_id: str, word_counts: List[int],
+                         hours: float = 0.0) -> 'ProjectStats':
+        """
+        Build stats from a flat list of per-chapter word counts.
+        
+        Works on plain ints so callers never need to hold Chapter objects
+        (and their content) just to aggregate lengths.
+        """
+        total_words = sum(word_counts)
+        return cls(
+            project_id=project_id,
+            average_chapter_length=total_words / len(word_counts) if word_counts else 0.0,
+            writing_velocity=total_words / hours if hours > 0 else 0.0
+        )
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ProjectStats':
         """Create stats from dictionary."""
-        last_activity = datetime.fromisoformat(data['last_activity']) if data.get('last_activity') else None
+        last_activity = data.get('last_activity')
+        last_activity = _parse_dt(last_activity) if last_activity else None
         
         return cls(
             project_id=data['project_id'],
@@ -264,4 +431,22 @@ class ProjectStats:
             writing_velocity=data.get('writing_velocity', 0.0),
             most_productive_hour=data.get('most_productive_hour', 0),
             last_activity=last_activity
-        )
\ No newline at end of file
+        )
+
+
+def to_json(model: Any) -> str:
+    """
+    Serialize a model to a JSON string with the same shape as model.to_dict().
+    
+    With orjson the dataclass is encoded directly (datetimes natively as ISO
+    strings), skipping the intermediate to_dict() copy.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(model, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(model.to_dict())
+
+
+def from_json(model_cls: Any, data: Any) -> Any:
+    """Deserialize a JSON str/bytes value produced by to_json() into model_cls."""
+    parsed = orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+    return model_cls.from_dict(parsed)
@@ -0,0 +1,41 @@
+"""
+Tests for StructuralCache request templating.
+"""
+
+import unittest
+
+from utils.llm_client import StructuralCache
+
+
+class StructuralCacheTest(unittest.TestCase):
+
+    def test_replays_whole_slot_arguments_with_new_values(self):
+        cache = StructuralCache()
+        cache.record('Read "a.md" from line 10', [("read_file", {"path": "a.md", "start_line": 10})])
+
+        self.assertEqual(
+            cache.plan('Read "b.md" from line 20'),
+            [("read_file", {"path": "b.md", "start_line": 20})]
+        )
+
+    def test_does_not_record_arguments_derived_from_a_slot(self):
+        cache = StructuralCache()
+        cache.record(
+            'Summarize chapter 3 of project "abc"',
+            [("read_file", {"project_id": "abc", "path": "chapters/chapter_3.md"})]
+        )
+        cache.record('What is 2 + 2?', [("calc", {"expr": "2 + 2"})])
+
+        self.assertIsNone(cache.plan('Summarize chapter 5 of project "xyz"'))
+        self.assertIsNone(cache.plan('What is 7 + 9?'))
+
+    def test_derived_arguments_drop_an_earlier_entry_of_the_same_shape(self):
+        cache = StructuralCache()
+        cache.record('Read "a.md"', [("read_file", {"path": "a.md"})])
+        cache.record('Read "b.md"', [("read_file", {"path": "drafts/b.md"})])
+
+        self.assertIsNone(cache.plan('Read "c.md"'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,9 +16,18 @@ All tools follow the OpenAI function calling schema pattern.
 
 import os
 import re
-import glob
+import stat
 import fnmatch
-from typing import Dict, Any, List, Optional, Tuple
+import functools
+import io
+import mmap
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 import logging
 from pathlib import Path
@@ -28,17 +37,78 @@ logger = logging.getLogger(__name__)
 
 # Base directory for all book projects
 PROJECTS_BASE_DIR = "projects"
+_PROJECTS_BASE_NORM = os.path.normpath(PROJECTS_BASE_DIR)
+
+# Line prefixes used in listing and search output
+DIR_MARK = "📁 "
+FILE_MARK = "📄 "
 
 # Directories to always ignore
-IGNORE_DIRS = {'.git', 'node_modules', '__pycache__', '.venv', 'venv', 'env', 
-               '.env', 'dist', 'build', '.idea', '.vscode', '.cache'}
+IGNORE_DIRS = frozenset({'.git', 'node_modules', '__pycache__', '.venv', 'venv', 'env', 
+                         '.env', 'dist', 'build', '.idea', '.vscode', '.cache'})
 
 # File patterns to ignore
-IGNORE_PATTERNS = {'*.pyc', '*.pyo', '.DS_Store', '*.swp', '*.swo', 'Thumbs.db'}
+IGNORE_PATTERNS = frozenset({'*.pyc', '*.pyo', '.DS_Store', '*.swp', '*.swo', 'Thumbs.db'})
+
+
+def _compile_glob_set(patterns: Iterable[str]) -> 're.Pattern[str]':
+    """
+    Fold shell-style patterns into a single compiled regex.
+    
+    Matching a name against the result costs one regex scan no matter how
+    many patterns there are, and honours the platform's case sensitivity the
+    same way fnmatch.fnmatch() does.
+    """
+    flags = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+    return re.compile('|'.join(f'(?:{fnmatch.translate(p)})' for p in patterns), flags)
+
+
+# Globs of the form '*.ext', which reduce to a suffix test
+_SUFFIX_GLOB_RE = re.compile(r'\*(\.[A-Za-z0-9]+)')
+
+
+def _name_matcher(pattern: str) -> Callable[[str], Any]:
+    """
+    Return a predicate testing a bare file name against one glob pattern.
+    
+    The common '*.ext' form (e.g. '*.md') becomes a plain suffix check;
+    anything else goes through the compiled regex from _compile_glob_set().
+    """
+    suffix_match = _SUFFIX_GLOB_RE.fullmatch(pattern)
+    if suffix_match is None:
+        return _compile_glob_set([pattern]).match
+    
+    suffix = suffix_match.group(1)
+    if os.path.normcase('A') == 'a':
+        # Case-insensitive filesystem, as fnmatch would treat it
+        suffix = suffix.lower()
+        return lambda name: name.lower().endswith(suffix)
+    return lambda name: name.endswith(suffix)
+
+
+# All ignore patterns folded into one regex so each name costs a single match
+_IGNORE_RE = _compile_glob_set(sorted(IGNORE_PATTERNS))
+
+# Characters that make a glob segment a wildcard rather than a literal name
+_GLOB_MAGIC_RE = re.compile('[*?[]')
 
 
 class BaseTool(ABC):
-    """Abstract base class for all tools."""
+    """
+    Abstract base class for all tools.
+    
+    parameters_schema() returns a class-level dict shared by every caller;
+    treat it as read-only.
+    
+    READ_ONLY tools never modify project files, so agents may reuse their
+    results for repeated calls until a modifying tool runs.
+    """
+    
+    READ_ONLY = False
+    
+    def target_path(self, args: Dict[str, Any]) -> Optional[str]:
+        """Absolute path of the single file a call with args reads, or None."""
+        return None
     
     @abstractmethod
     def name(self) -> str:
@@ -64,31 +134,195 @@ def get_project_path(project_id: str) -> str:
 
 def resolve_path(project_id: str, relative_path: str) -> str:
     """Resolve a relative path to an absolute path within the project."""
-    base_path = get_project_path(project_id)
+    return _resolve_path_cached(project_id, relative_path)
+
+
+@functools.lru_cache(maxsize=2048)
+def _resolve_path_cached(project_id: str, relative_path: str) -> str:
+    """Memoized body of resolve_path; escapes raise and are therefore never cached."""
+    base_path = os.path.normpath(os.path.join(_PROJECTS_BASE_NORM, project_id))
     # Normalize and join paths
     full_path = os.path.normpath(os.path.join(base_path, relative_path))
     
-    # Security check: ensure the path is within the project directory
-    if not full_path.startswith(os.path.normpath(base_path)):
+    # Security check: ensure the path is within the project directory. Compare
+    # whole path components so 'projects/foo' does not admit 'projects/foobar'.
+    if full_path != base_path and not full_path.startswith(base_path + os.sep):
         raise ValueError(f"Path '{relative_path}' escapes project directory")
     
     return full_path
 
 
+def project_relpath(base_path: str) -> Callable[[str], str]:
+    """
+    Return a function mapping paths under base_path to project-relative form.
+    
+    Paths produced by joining onto the resolved project directory start with
+    base_path + os.sep, so slicing that prefix off gives the same result as
+    os.path.relpath() without its per-call splitting and normalization. Any
+    other path falls back to os.path.relpath().
+    """
+    prefix = os.path.normpath(base_path) + os.sep
+    prefix_len = len(prefix)
+    
+    def relpath(path: str) -> str:
+        if path.startswith(prefix):
+            return path[prefix_len:]
+        return os.path.relpath(path, base_path)
+    
+    return relpath
+
+
 def should_ignore(path: str) -> bool:
     """Check if a path should be ignored."""
-    basename = os.path.basename(path)
+    return is_ignored_name(os.path.basename(path))
+
+
+def is_ignored_name(name: str) -> bool:
+    """Check if a bare file or directory name (no path components) should be ignored."""
+    return name in IGNORE_DIRS or _IGNORE_RE.match(name) is not None
+
+
+@functools.lru_cache(maxsize=256)
+def compile_search_pattern(pattern: str, flags: int = 0, escape: bool = False) -> 're.Pattern[str]':
+    """
+    Compile a search pattern, escaping it first when it is a literal.
     
-    # Check directory ignores
-    if basename in IGNORE_DIRS:
-        return True
+    Memoized across tool calls, so an agent repeating a search or edit skips
+    both re.escape() and the re module's own (smaller) compile cache lookup.
+    """
+    return re.compile(re.escape(pattern) if escape else pattern, flags)
+
+
+def _ci_literal_replace(haystack: str, needle: str, repl: str,
+                        replace_all: bool) -> Tuple[str, int]:
+    """
+    Case-insensitively replace a literal in ASCII text, preserving other casing.
     
-    # Check file pattern ignores
-    for pattern in IGNORE_PATTERNS:
-        if fnmatch.fnmatch(basename, pattern):
-            return True
+    Searches a lowercased copy with str.find and stitches slices of the
+    original around each replacement. Callers must ensure both strings are
+    ASCII so offsets in the lowered copy line up with the original.
     
-    return False
+    Returns:
+        Tuple of (new text, replacements made)
+    """
+    hay_lower = haystack.lower()
+    needle_lower = needle.lower()
+    parts = []
+    pos = 0
+    count = 0
+    while True:
+        idx = hay_lower.find(needle_lower, pos)
+        if idx < 0:
+            break
+        parts.append(haystack[pos:idx])
+        parts.append(repl)
+        pos = idx + len(needle)
+        count += 1
+        if not replace_all:
+            break
+    if not count:
+        return haystack, 0
+    parts.append(haystack[pos:])
+    return ''.join(parts), count
+
+
+# Directory listings keyed by path, validated against the directory's mtime
+_DIR_CACHE_SIZE = 4096
+_DIR_CACHE_MIN_AGE_NS = 2_000_000_000  # Younger mtimes may not reflect a same-tick change yet
+_dir_cache: "OrderedDict[str, Tuple[int, List[Tuple[str, bool, bool]]]]" = OrderedDict()
+_dir_cache_lock = threading.Lock()
+
+
+def scandir_cached(dir_path: str) -> List[Tuple[str, bool, bool]]:
+    """
+    List dir_path as (name, is_dir, is_file) tuples, in os.scandir() order.
+    
+    A snapshot is reused while the directory's st_mtime_ns is unchanged, so
+    repeated listings of an unchanged tree cost one stat() instead of a
+    readdir. Directories modified within the last couple of seconds are not
+    cached, since filesystem timestamp granularity could hide a change made
+    in the same tick. Raises OSError like os.scandir().
+    """
+    mtime_ns = os.stat(dir_path).st_mtime_ns
+    with _dir_cache_lock:
+        cached = _dir_cache.get(dir_path)
+        if cached is not None and cached[0] == mtime_ns:
+            _dir_cache.move_to_end(dir_path)
+            return cached[1]
+    
+    with os.scandir(dir_path) as it:
+        entries = [(entry.name, entry.is_dir(), entry.is_file()) for entry in it]
+    
+    if time.time_ns() - mtime_ns >= _DIR_CACHE_MIN_AGE_NS:
+        with _dir_cache_lock:
+            _dir_cache[dir_path] = (mtime_ns, entries)
+            _dir_cache.move_to_end(dir_path)
+            while len(_dir_cache) > _DIR_CACHE_SIZE:
+                _dir_cache.popitem(last=False)
+    return entries
+
+
+def replace_file(tmp_path: str, full_path: str) -> None:
+    """
+    Atomically move tmp_path over full_path, keeping full_path's permission bits.
+    
+    Readers see either the old file or the new one, never a partial write.
+    """
+    os.chmod(tmp_path, stat.S_IMODE(os.stat(full_path).st_mode))
+    os.replace(tmp_path, full_path)
+
+
+def count_lines(data: bytes) -> int:
+    """Count lines in encoded text, including a final line without a trailing newline."""
+    return data.count(b'\n') + (1 if data[-1:] not in (b'', b'\n') else 0)
+
+
+def write_bytes(full_path: str, data: bytes, fsync: bool = False) -> None:
+    """Write data to full_path, truncating any existing file, with raw os.write calls."""
+    fd = os.open(full_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(full_path: str, data: bytes, fsync: bool = False) -> None:
+    """
+    Replace full_path with data without ever exposing a partial file.
+    
+    An existing file is rewritten via a temp file in the same directory and
+    os.replace(), so a crash mid-write leaves the old contents intact. A new
+    file has nothing to lose and is written in place. With fsync the data,
+    and on POSIX the directory entry of the rename, are flushed to disk.
+    """
+    if not os.path.exists(full_path):
+        write_bytes(full_path, data, fsync=fsync)
+        return
+    
+    parent_dir = os.path.dirname(full_path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.write-', dir=parent_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        replace_file(tmp_path, full_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    if fsync and os.name == 'posix':
+        dir_fd = os.open(parent_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
 
 
 # =============================================================================
@@ -107,7 +341,37 @@ class ReadFileTool(BaseTool):
     Based on Cursor/RooCode read_file tool patterns.
     """
     
+    READ_ONLY = True
     MAX_LINES = 500  # Maximum lines to return without explicit range
+    CACHE_SIZE = 32  # Files whose lines are kept in memory, validated by mtime/size
+    CACHE_MAX_BYTES = 1024 * 1024  # Larger files are streamed instead of cached
+    
+    _SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "project_id": {
+                "type": "string",
+                "description": "The book project identifier"
+            },
+            "path": {
+                "type": "string",
+                "description": "Path to the file to read, relative to project root"
+            },
+            "start_line": {
+                "type": "integer",
+                "description": "Starting line number (1-indexed). Optional."
+            },
+            "end_line": {
+                "type": "integer",
+                "description": "Ending line number (1-indexed, inclusive). Optional."
+            }
+        },
+        "required": ["project_id", "path"]
+    }
+    
+    def __init__(self):
+        self._cache: "OrderedDict[str, Tuple[Tuple[int, int, int, int], List[str]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
     
     def name(self) -> str:
         return "read_file"
@@ -118,28 +382,10 @@ For large files, content is automatically truncated. Use start_line and end_line
 for precise control over which lines to read."""
     
     def parameters_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "project_id": {
-                    "type": "string",
-                    "description": "The book project identifier"
-                },
-                "path": {
-                    "type": "string",
-                    "description": "Path to the file to read, relative to project root"
-                },
-                "start_line": {
-                    "type": "integer",
-                    "description": "Starting line number (1-indexed). Optional."
-                },
-                "end_line": {
-                    "type": "integer",
-                    "description": "Ending line number (1-indexed, inclusive). Optional."
-                }
-            },
-            "required": ["project_id", "path"]
-        }
+        return self._SCHEMA
+    
+    def target_path(self, args: Dict[str, Any]) -> Optional[str]:
+        return resolve_path(args['project_id'], args['path'])
     
     def execute(
         self, 
@@ -163,57 +409,48 @@ for precise control over which lines to read."""
         try:
             full_path = resolve_path(project_id, path)
             
-            if not os.path.exists(full_path):
+            # One stat call covers both the existence and the regular-file check
+            try:
+                st = os.stat(full_path)
+            except FileNotFoundError:
                 return {
                     'success': False,
                     'error': f"File not found: {path}"
                 }
             
-            if not os.path.isfile(full_path):
+            if not stat.S_ISREG(st.st_mode):
                 return {
                     'success': False,
                     'error': f"Path is not a file: {path}"
                 }
             
-            # Read file content
-            with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-                lines = f.readlines()
-            
-            total_lines = len(lines)
             truncated = False
             
             # Handle line range
             if start_line is not None or end_line is not None:
-                start_idx = (start_line - 1) if start_line else 0
-                end_idx = end_line if end_line else total_lines
+                start_idx = start_line - 1 if start_line and start_line > 1 else 0
+                end_idx = (end_line if end_line > 0 else 0) if end_line else None
                 
-                # Clamp to valid range
-                start_idx = max(0, min(start_idx, total_lines))
-                end_idx = max(0, min(end_idx, total_lines))
+                selected_lines, total_lines = self._read_lines(full_path, st, start_idx, end_idx)
                 
-                selected_lines = lines[start_idx:end_idx]
+                # Clamp to valid range
+                if start_idx > total_lines:
+                    start_idx = total_lines
                 actual_start = start_idx + 1
                 actual_end = start_idx + len(selected_lines)
             else:
                 # No range specified - apply truncation if needed
-                if total_lines > self.MAX_LINES:
-                    selected_lines = lines[:self.MAX_LINES]
-                    truncated = True
-                    actual_start = 1
-                    actual_end = self.MAX_LINES
-                else:
-                    selected_lines = lines
-                    actual_start = 1
-                    actual_end = total_lines
-            
-            # Format content with line numbers
-            numbered_lines = []
-            for i, line in enumerate(selected_lines, start=actual_start):
-                # Remove trailing newline for cleaner output
-                line_content = line.rstrip('\n\r')
-                numbered_lines.append(f"{i:4d} | {line_content}")
-            
-            content = '\n'.join(numbered_lines)
+                selected_lines, total_lines = self._read_lines(full_path, st, 0, self.MAX_LINES)
+                truncated = total_lines > self.MAX_LINES
+                actual_start = 1
+                actual_end = len(selected_lines)
+            
+            # Format content with line numbers (trailing newlines stripped for cleaner output)
+            eol = '\n\r'
+            content = '\n'.join([
+                f"{i:4d} | {line.rstrip(eol)}"
+                for i, line in enumerate(selected_lines, start=actual_start)
+            ])
             
             # Add context markers
             result_content = ""
@@ -246,6 +483,54 @@ for precise control over which lines to read."""
                 'success': False,
                 'error': str(e)
             }
+    
+    def _read_lines(self, full_path: str, st: os.stat_result, start: int,
+                    stop: Optional[int]) -> Tuple[List[str], int]:
+        """
+        Return the lines in [start, stop) and the file's total line count.
+        
+        st is the caller's os.stat() of full_path. Small files are read whole
+        and cached (without line endings) until their inode, timestamps or size
+        change; write_atomic() swaps in a new inode on every rewrite. As with
+        scandir_cached(), files changed in the last couple of seconds are not
+        cached, since a same-size rewrite in the same timestamp tick could
+        otherwise go unnoticed. Files over CACHE_MAX_BYTES are streamed so only
+        the requested range is held in memory.
+        """
+        key = (st.st_ino, st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+        
+        with self._cache_lock:
+            cached = self._cache.get(full_path)
+            if cached is not None and cached[0] == key:
+                self._cache.move_to_end(full_path)
+                lines = cached[1]
+                return lines[start:stop], len(lines)
+        
+        if st.st_size > self.CACHE_MAX_BYTES:
+            with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
+                skipped = sum(1 for _ in islice(f, start))
+                selected = list(islice(f, None if stop is None else max(0, stop - start)))
+                total_lines = skipped + len(selected) + sum(1 for _ in f)
+            return selected, total_lines
+        
+        # Read and decode in one shot, then split in C rather than line by line
+        with open(full_path, 'rb') as f:
+            text = f.read().decode('utf-8', errors='replace')
+        if '\r' in text:
+            # Match text-mode universal newlines so line numbers are unchanged
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        lines = text.split('\n')
+        if lines[-1] == '':
+            lines.pop()
+        
+        if time.time_ns() - max(st.st_mtime_ns, st.st_ctime_ns) >= _DIR_CACHE_MIN_AGE_NS:
+            with self._cache_lock:
+                self._cache[full_path] = (key, lines)
+                self._cache.move_to_end(full_path)
+                while len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        
+        return lines[start:stop], len(lines)
 
 
 # =============================================================================
@@ -262,6 +547,25 @@ class WriteFileTool(BaseTool):
     Based on RooCode write_to_file tool patterns.
     """
     
+    _SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "project_id": {
+                "type": "string",
+                "description": "The book project identifier"
+            },
+            "path": {
+                "type": "string",
+                "description": "Path to the file to write, relative to project root"
+            },
+            "content": {
+                "type": "string",
+                "description": "The complete content to write to the file"
+            }
+        },
+        "required": ["project_id", "path", "content"]
+    }
+    
     def name(self) -> str:
         return "write_file"
     
@@ -270,30 +574,14 @@ class WriteFileTool(BaseTool):
 or completely overwrites it if it does. Parent directories are created automatically."""
     
     def parameters_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "project_id": {
-                    "type": "string",
-                    "description": "The book project identifier"
-                },
-                "path": {
-                    "type": "string",
-                    "description": "Path to the file to write, relative to project root"
-                },
-                "content": {
-                    "type": "string",
-                    "description": "The complete content to write to the file"
-                }
-            },
-            "required": ["project_id", "path", "content"]
-        }
+        return self._SCHEMA
     
     def execute(
         self, 
         project_id: str, 
         path: str, 
-        content: str
+        content: str,
+        fsync: bool = False
     ) -> Dict[str, Any]:
         """
         Write content to a file.
@@ -302,6 +590,7 @@ or completely overwrites it if it does. Parent directories are created automatic
             project_id: The book project identifier
             path: Path to the file relative to project root
             content: Content to write
+            fsync: Flush the file to disk before returning (default: False)
             
         Returns:
             Dict with operation result
@@ -317,12 +606,12 @@ or completely overwrites it if it does. Parent directories are created automatic
             # Check if file exists (for logging)
             file_existed = os.path.exists(full_path)
             
-            # Write content
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # Write content as pre-encoded bytes, bypassing the text IO layer
+            data = content.encode('utf-8')
+            write_atomic(full_path, data, fsync=fsync)
             
             # Calculate stats
-            line_count = content.count('\n') + (1 if content and not content.endswith('\n') else 0)
+            line_count = count_lines(data)
             char_count = len(content)
             
             action = "Updated" if file_existed else "Created"
@@ -363,6 +652,43 @@ class EditFileTool(BaseTool):
     Based on RooCode search_and_replace and Aider diff patterns.
     """
     
+    _SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "project_id": {
+                "type": "string",
+                "description": "The book project identifier"
+            },
+            "path": {
+                "type": "string",
+                "description": "Path to the file to edit, relative to project root"
+            },
+            "search": {
+                "type": "string",
+                "description": "The text or regex pattern to search for"
+            },
+            "replace": {
+                "type": "string",
+                "description": "The replacement text"
+            },
+            "use_regex": {
+                "type": "boolean",
+                "description": "Whether to treat search as a regex pattern (default: false)"
+            },
+            "replace_all": {
+                "type": "boolean",
+                "description": "Replace all occurrences (default: true)"
+            },
+            "ignore_case": {
+                "type": "boolean",
+                "description": "Case-insensitive search (default: false)"
+            }
+        },
+        "required": ["project_id", "path", "search", "replace"]
+    }
+    
+    CHUNK_SIZE = 8 * 1024 * 1024  # Bytes read per step when streaming literal edits
+    
     def name(self) -> str:
         return "edit_file"
     
@@ -371,40 +697,7 @@ class EditFileTool(BaseTool):
 or regex patterns. Can replace first occurrence only or all occurrences."""
     
     def parameters_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "project_id": {
-                    "type": "string",
-                    "description": "The book project identifier"
-                },
-                "path": {
-                    "type": "string",
-                    "description": "Path to the file to edit, relative to project root"
-                },
-                "search": {
-                    "type": "string",
-                    "description": "The text or regex pattern to search for"
-                },
-                "replace": {
-                    "type": "string",
-                    "description": "The replacement text"
-                },
-                "use_regex": {
-                    "type": "boolean",
-                    "description": "Whether to treat search as a regex pattern (default: false)"
-                },
-                "replace_all": {
-                    "type": "boolean",
-                    "description": "Replace all occurrences (default: true)"
-                },
-                "ignore_case": {
-                    "type": "boolean",
-                    "description": "Case-insensitive search (default: false)"
-                }
-            },
-            "required": ["project_id", "path", "search", "replace"]
-        }
+        return self._SCHEMA
     
     def execute(
         self, 
@@ -440,39 +733,63 @@ or regex patterns. Can replace first occurrence only or all occurrences."""
                     'error': f"File not found: {path}"
                 }
             
-            # Read current content
-            with open(full_path, 'r', encoding='utf-8') as f:
-                original_content = f.read()
-            
-            # Perform replacement
-            flags = re.IGNORECASE if ignore_case else 0
+            if not search:
+                return {
+                    'success': False,
+                    'error': "Search text must not be empty"
+                }
             
-            if use_regex:
-                pattern = re.compile(search, flags)
-                if replace_all:
-                    new_content = pattern.sub(replace, original_content)
-                    count = len(pattern.findall(original_content))
-                else:
-                    new_content = pattern.sub(replace, original_content, count=1)
-                    count = 1 if pattern.search(original_content) else 0
+            streamed = None
+            if not (use_regex or ignore_case):
+                # Simple string replacement, streamed so memory stays bounded.
+                # Files with CR line endings come back as None and take the
+                # text-mode path below, so search newlines match them as well.
+                streamed = self._stream_literal_replace(
+                    full_path, search, replace, replace_all
+                )
+            
+            if streamed is not None:
+                count, original_lines, new_lines = streamed
             else:
-                if ignore_case:
-                    # Case-insensitive literal replacement
-                    pattern = re.compile(re.escape(search), flags)
-                    if replace_all:
-                        new_content = pattern.sub(replace, original_content)
-                        count = len(pattern.findall(original_content))
-                    else:
-                        new_content = pattern.sub(replace, original_content, count=1)
-                        count = 1 if pattern.search(original_content) else 0
+                # Read current content
+                with open(full_path, 'r', encoding='utf-8') as f:
+                    original_content = f.read()
+                
+                # Perform replacement
+                flags = re.IGNORECASE if ignore_case else 0
+                
+                if not (use_regex or ignore_case):
+                    # Literal edit of a CRLF file, now read with universal newlines
+                    count = original_content.count(search)
+                    if not replace_all:
+                        count = min(count, 1)
+                    new_content = original_content.replace(search, replace, count)
+                elif (not use_regex and '\\' not in replace
+                        and search.isascii() and original_content.isascii()):
+                    # Case-insensitive literal on ASCII text: plain find, no regex engine
+                    new_content, count = _ci_literal_replace(
+                        original_content, search, replace, replace_all
+                    )
                 else:
-                    # Simple string replacement
-                    if replace_all:
-                        count = original_content.count(search)
-                        new_content = original_content.replace(search, replace)
-                    else:
-                        count = 1 if search in original_content else 0
-                        new_content = original_content.replace(search, replace, 1)
+                    pattern = compile_search_pattern(search, flags, escape=not use_regex)
+                    
+                    # subn replaces and counts in a single scan
+                    new_content, count = pattern.subn(
+                        replace, original_content, count=0 if replace_all else 1
+                    )
+                
+                # Write new content
+                if count:
+                    write_atomic(full_path, new_content.encode('utf-8'), fsync=True)
+                
+                # Generate simple diff summary. Every literal match spans the same
+                # number of newlines, so only regex edits (or replacements with
+                # escapes re expands) need the new content rescanned.
+                original_lines = original_content.count('\n')
+                if use_regex or (ignore_case and '\\' in replace):
+                    new_lines = new_content.count('\n')
+                else:
+                    new_lines = original_lines + count * (replace.count('\n') - search.count('\n'))
             
             if count == 0:
                 return {
@@ -480,14 +797,6 @@ or regex patterns. Can replace first occurrence only or all occurrences."""
                     'error': f"Search pattern not found: {search[:50]}{'...' if len(search) > 50 else ''}"
                 }
             
-            # Write new content
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
-            
-            # Generate simple diff summary
-            original_lines = original_content.count('\n')
-            new_lines = new_content.count('\n')
-            
             logger.info(f"Edited file: {path} ({count} replacement(s))")
             
             return {
@@ -510,6 +819,85 @@ or regex patterns. Can replace first occurrence only or all occurrences."""
                 'success': False,
                 'error': str(e)
             }
+    
+    def _mkstemp_beside(self, full_path: str) -> Tuple[int, str]:
+        """Create a hidden temp file next to full_path, so os.replace() stays on one filesystem."""
+        return tempfile.mkstemp(prefix='.edit-', dir=os.path.dirname(full_path) or '.')
+    
+    def _stream_literal_replace(self, full_path: str, search: str, replace: str,
+                                replace_all: bool) -> Optional[Tuple[int, int, int]]:
+        """
+        Replace a literal string in full_path without loading the whole file.
+        
+        The file is processed as raw bytes in CHUNK_SIZE reads into a temp file
+        in the same directory. The last len(search) - 1 bytes of each read are
+        carried into the next so matches straddling a boundary are still found.
+        The temp file is fsynced and atomically swapped in only when something
+        was replaced.
+        
+        Raw bytes keep CRs that text mode would turn into newlines, so a file
+        containing any CR is left untouched and None is returned; the caller
+        then edits it in text mode.
+        
+        Returns:
+            Tuple of (replacements made, original newline count, new newline count),
+            or None if the file has CR line endings
+        """
+        needle = search.encode('utf-8')
+        repl = replace.encode('utf-8')
+        keep = len(needle) - 1
+        count = 0
+        original_lines = 0
+        carry = b''
+        
+        fd, tmp_path = self._mkstemp_beside(full_path)
+        try:
+            with os.fdopen(fd, 'wb') as dst, open(full_path, 'rb') as src:
+                while True:
+                    chunk = src.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        # Too short to hold a match; flush as-is
+                        dst.write(carry)
+                        break
+                    if b'\r' in chunk:
+                        return None
+                    original_lines += chunk.count(b'\n')
+                    buf = carry + chunk if carry else chunk
+                    
+                    pos = 0
+                    if replace_all or count == 0:
+                        parts = []
+                        while True:
+                            idx = buf.find(needle, pos)
+                            if idx < 0:
+                                break
+                            parts.append(buf[pos:idx])
+                            parts.append(repl)
+                            pos = idx + len(needle)
+                            count += 1
+                            if not replace_all:
+                                break
+                        dst.writelines(parts)
+                        # A match starting in the last `keep` bytes may continue in the next read
+                        safe = max(pos, len(buf) - keep) if (replace_all or count == 0) else len(buf)
+                    else:
+                        safe = len(buf)
+                    
+                    dst.write(buf[pos:safe])
+                    carry = buf[safe:]
+                
+                if count:
+                    dst.flush()
+                    os.fsync(dst.fileno())
+            
+            if count:
+                replace_file(tmp_path, full_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        new_lines = original_lines + count * (repl.count(b'\n') - needle.count(b'\n'))
+        return count, original_lines, new_lines
 
 
 # =============================================================================
@@ -529,8 +917,32 @@ class ListDirectoryTool(BaseTool):
     Based on Cursor list_dir tool patterns.
     """
     
+    READ_ONLY = True
     MAX_ENTRIES = 200  # Maximum entries to return
     
+    _SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "project_id": {
+                "type": "string",
+                "description": "The book project identifier"
+            },
+            "path": {
+                "type": "string",
+                "description": "Path to the directory to list, relative to project root. Use '.' for project root."
+            },
+            "recursive": {
+                "type": "boolean",
+                "description": "Whether to list contents recursively (default: false)"
+            },
+            "pattern": {
+                "type": "string",
+                "description": "Optional glob pattern to filter results (e.g., '*.txt', '*.py')"
+            }
+        },
+        "required": ["project_id", "path"]
+    }
+    
     def name(self) -> str:
         return "list_directory"
     
@@ -540,28 +952,7 @@ Use recursive=true to list all nested contents. Common directories like .git and
 node_modules are automatically ignored."""
     
     def parameters_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "project_id": {
-                    "type": "string",
-                    "description": "The book project identifier"
-                },
-                "path": {
-                    "type": "string",
-                    "description": "Path to the directory to list, relative to project root. Use '.' for project root."
-                },
-                "recursive": {
-                    "type": "boolean",
-                    "description": "Whether to list contents recursively (default: false)"
-                },
-                "pattern": {
-                    "type": "string",
-                    "description": "Optional glob pattern to filter results (e.g., '*.txt', '*.py')"
-                }
-            },
-            "required": ["project_id", "path"]
-        }
+        return self._SCHEMA
     
     def execute(
         self, 
@@ -599,12 +990,13 @@ node_modules are automatically ignored."""
             
             entries = []
             truncated = False
-            base_path = get_project_path(project_id)
+            relpath = project_relpath(get_project_path(project_id))
+            name_match = _name_matcher(pattern) if pattern else None
             
             if recursive:
-                for root, dirs, files in os.walk(full_path):
+                for root, dirs, files in self._walk(full_path):
                     # Filter out ignored directories
-                    dirs[:] = [d for d in dirs if not should_ignore(d)]
+                    dirs[:] = [d for d in dirs if not is_ignored_name(d)]
                     
                     for name in dirs:
                         if len(entries) >= self.MAX_ENTRIES:
@@ -612,9 +1004,9 @@ node_modules are automatically ignored."""
                             break
                         
                         full_item_path = os.path.join(root, name)
-                        rel_path = os.path.relpath(full_item_path, base_path)
+                        rel_path = relpath(full_item_path)
                         
-                        if pattern and not fnmatch.fnmatch(name, pattern):
+                        if name_match and not name_match(name):
                             continue
                         
                         entries.append({
@@ -623,68 +1015,67 @@ node_modules are automatically ignored."""
                             'type': 'directory'
                         })
                     
-                    for name in files:
+                    for file_entry in files:
                         if len(entries) >= self.MAX_ENTRIES:
                             truncated = True
                             break
                         
-                        if should_ignore(name):
+                        name = file_entry.name
+                        if is_ignored_name(name):
                             continue
                         
-                        full_item_path = os.path.join(root, name)
-                        rel_path = os.path.relpath(full_item_path, base_path)
+                        rel_path = relpath(file_entry.path)
                         
-                        if pattern and not fnmatch.fnmatch(name, pattern):
+                        if name_match and not name_match(name):
                             continue
                         
-                        stat = os.stat(full_item_path)
                         entries.append({
                             'name': name,
                             'path': rel_path,
                             'type': 'file',
-                            'size': stat.st_size
+                            'size': file_entry.stat().st_size
                         })
                     
                     if truncated:
                         break
             else:
-                for name in sorted(os.listdir(full_path)):
+                for name, is_dir, _ in sorted(scandir_cached(full_path)):
                     if len(entries) >= self.MAX_ENTRIES:
                         truncated = True
                         break
                     
-                    if should_ignore(name):
+                    if is_ignored_name(name):
                         continue
                     
                     full_item_path = os.path.join(full_path, name)
-                    rel_path = os.path.relpath(full_item_path, base_path)
+                    rel_path = relpath(full_item_path)
                     
-                    if pattern and not fnmatch.fnmatch(name, pattern):
+                    if name_match and not name_match(name):
                         continue
                     
-                    if os.path.isdir(full_item_path):
+                    if is_dir:
                         entries.append({
                             'name': name,
                             'path': rel_path,
                             'type': 'directory'
                         })
                     else:
-                        stat = os.stat(full_item_path)
+                        st = os.stat(full_item_path)
                         entries.append({
                             'name': name,
                             'path': rel_path,
                             'type': 'file',
-                            'size': stat.st_size
+                            'size': st.st_size
                         })
             
             # Format output as text tree
             output_lines = []
             for entry in entries:
                 if entry['type'] == 'directory':
-                    output_lines.append(f"📁 {entry['path']}/")
+                    output_lines.append(DIR_MARK + entry['path'] + '/')
                 else:
                     size_str = self._format_size(entry.get('size', 0))
-                    output_lines.append(f"📄 {entry['path']} ({size_str})")
+                    output_lines.append(f"{FILE_MARK}{entry['path']} ({size_str})")
             
             output = '\n'.join(output_lines)
             
@@ -709,6 +1100,41 @@ node_modules are automatically ignored."""
                 'error': str(e)
             }
     
+    def _walk(self, top: str) -> Iterator[Tuple[str, List[str], List[os.DirEntry]]]:
+        """
+        Top-down os.walk() that hands back file DirEntry objects instead of names.
+        
+        Yields (root, dir_names, file_entries); prune dir_names in place to skip
+        subtrees, as with os.walk. File sizes then come from DirEntry.stat(),
+        which is served from the directory read on Windows and needs no path
+        re-resolution elsewhere. Symlinked directories are listed but not
+        followed, and unreadable directories are skipped, matching os.walk().
+        """
+        try:
+            with os.scandir(top) as it:
+                scanned = list(it)
+        except OSError:
+            return
+        
+        dirs = {}
+        files = []
+        for entry in scanned:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                dirs[entry.name] = entry
+            else:
+                files.append(entry)
+        
+        dir_names = list(dirs)
+        yield top, dir_names, files
+        
+        for name in dir_names:
+            if not dirs[name].is_symlink():
+                yield from self._walk(dirs[name].path)
+    
     def _format_size(self, size: int) -> str:
         """Format file size in human-readable form."""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -731,8 +1157,28 @@ class SearchFilesTool(BaseTool):
     Based on Windsurf fd tool patterns.
     """
     
+    READ_ONLY = True
     MAX_RESULTS = 50
     
+    _SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "project_id": {
+                "type": "string",
+                "description": "The book project identifier"
+            },
+            "pattern": {
+                "type": "string",
+                "description": "Glob pattern to match files (e.g., '*.txt', '**/*.py', 'chapter_*.txt')"
+            },
+            "path": {
+                "type": "string",
+                "description": "Directory to search in, relative to project root (default: '.')"
+            }
+        },
+        "required": ["project_id", "pattern"]
+    }
+    
     def name(self) -> str:
         return "search_files"
     
@@ -741,24 +1187,7 @@ class SearchFilesTool(BaseTool):
 Returns matching file paths. Use '**/' prefix for recursive search."""
     
     def parameters_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "project_id": {
-                    "type": "string",
-                    "description": "The book project identifier"
-                },
-                "pattern": {
-                    "type": "string",
-                    "description": "Glob pattern to match files (e.g., '*.txt', '**/*.py', 'chapter_*.txt')"
-                },
-                "path": {
-                    "type": "string",
-                    "description": "Directory to search in, relative to project root (default: '.')"
-                }
-            },
-            "required": ["project_id", "pattern"]
-        }
+        return self._SCHEMA
     
     def execute(
         self, 
@@ -786,23 +1215,11 @@ Returns matching file paths. Use '**/' prefix for recursive search."""
                     'error': f"Directory not found: {path}"
                 }
             
-            # Build search pattern
-            search_pattern = os.path.join(full_path, pattern)
-            
             # Find matching files
-            matches = []
-            base_path = get_project_path(project_id)
-            
-            for match in glob.glob(search_pattern, recursive=True):
-                if should_ignore(match):
-                    continue
-                
-                if os.path.isfile(match):
-                    rel_path = os.path.relpath(match, base_path)
-                    matches.append(rel_path)
-                
-                if len(matches) >= self.MAX_RESULTS:
-                    break
+            relpath = project_relpath(get_project_path(project_id))
+            matches = [
+                relpath(match) for match in islice(self._iter_glob(full_path, pattern), self.MAX_RESULTS)
+            ]
             
             truncated = len(matches) >= self.MAX_RESULTS
             
@@ -829,6 +1246,90 @@ Returns matching file paths. Use '**/' prefix for recursive search."""
                 'success': False,
                 'error': str(e)
             }
+    
+    def _iter_glob(self, root: str, pattern: str) -> Iterator[str]:
+        """
+        Yield files under root matching a glob pattern, like glob.glob(recursive=True).
+        
+        Walks with os.scandir one pattern segment at a time. Each segment is a
+        literal name, a compiled wildcard, or '**' (any depth), so only
+        directories that can still match are listed. Ignored names are skipped
+        while descending rather than after the whole tree has been globbed.
+        Hidden names only match segments that start with '.', as in glob.
+        """
+        if os.altsep:
+            pattern = pattern.replace(os.altsep, os.sep)
+        segments = [seg for seg in pattern.split(os.sep) if seg not in ('', '.')]
+        if '..' in segments:
+            raise ValueError(f"Pattern '{pattern}' escapes project directory")
+        if segments:
+            yield from self._glob_segments(root, segments)
+    
+    def _glob_segments(self, dir_path: str, segments: List[str]) -> Iterator[str]:
+        """Yield files under dir_path matching the remaining pattern segments."""
+        segment, rest = segments[0], segments[1:]
+        
+        if segment == '**':
+            if rest:
+                # Zero or more directories, then the rest of the pattern
+                yield from self._glob_segments(dir_path, rest)
+                for sub_dir in self._iter_subdirs(dir_path):
+                    yield from self._glob_segments(sub_dir, rest)
+            else:
+                yield from self._iter_files(dir_path)
+            return
+        
+        if not _GLOB_MAGIC_RE.search(segment):
+            target = os.path.join(dir_path, segment)
+            if rest:
+                if os.path.isdir(target):
+                    yield from self._glob_segments(target, rest)
+            elif os.path.isfile(target) and not is_ignored_name(segment):
+                yield target
+            return
+        
+        match = _name_matcher(segment)
+        include_hidden = segment.startswith('.')
+        try:
+            entries = scandir_cached(dir_path)
+        except OSError:
+            return
+        
+        for name, is_dir, is_file in entries:
+            if ((not include_hidden and name.startswith('.'))
+                    or is_ignored_name(name) or not match(name)):
+                continue
+            if rest:
+                if is_dir:
+                    yield from self._glob_segments(os.path.join(dir_path, name), rest)
+            elif is_file:
+                yield os.path.join(dir_path, name)
+    
+    def _iter_subdirs(self, dir_path: str) -> Iterator[str]:
+        """Yield every visible, non-ignored directory below dir_path, depth first."""
+        try:
+            entries = scandir_cached(dir_path)
+        except OSError:
+            return
+        for name, is_dir, _ in entries:
+            if is_dir and not name.startswith('.') and not is_ignored_name(name):
+                sub_dir = os.path.join(dir_path, name)
+                yield sub_dir
+                yield from self._iter_subdirs(sub_dir)
+    
+    def _iter_files(self, dir_path: str) -> Iterator[str]:
+        """Yield every visible, non-ignored file below dir_path, depth first."""
+        try:
+            entries = scandir_cached(dir_path)
+        except OSError:
+            return
+        for name, is_dir, is_file in entries:
+            if name.startswith('.') or is_ignored_name(name):
+                continue
+            if is_file:
+                yield os.path.join(dir_path, name)
+            elif is_dir:
+                yield from self._iter_files(os.path.join(dir_path, name))
 
 
 # =============================================================================
@@ -845,8 +1346,43 @@ class GrepSearchTool(BaseTool):
     Based on RooCode search_files and grep_search patterns.
     """
     
+    READ_ONLY = True
     MAX_MATCHES = 100
     CONTEXT_LINES = 2  # Lines of context around each match
+    MMAP_MIN_BYTES = 64 * 1024  # Smaller files are read outright; mmap setup costs more
+    BINARY_SNIFF_BYTES = 8192  # Files with a NUL byte in this prefix are skipped as binary
+    PARALLEL_MIN_FILES = 16  # Fewer candidate files are scanned on the calling thread
+    
+    _SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "project_id": {
+                "type": "string",
+                "description": "The book project identifier"
+            },
+            "query": {
+                "type": "string",
+                "description": "Text or regex pattern to search for"
+            },
+            "path": {
+                "type": "string",
+                "description": "Directory to search in, relative to project root (default: '.')"
+            },
+            "file_pattern": {
+                "type": "string",
+                "description": "Glob pattern to filter files (e.g., '*.txt', '*.py')"
+            },
+            "use_regex": {
+                "type": "boolean",
+                "description": "Treat query as regex pattern (default: false)"
+            },
+            "ignore_case": {
+                "type": "boolean",
+                "description": "Case-insensitive search (default: true)"
+            }
+        },
+        "required": ["project_id", "query"]
+    }
     
     def name(self) -> str:
         return "grep_search"
@@ -856,41 +1392,12 @@ class GrepSearchTool(BaseTool):
 with surrounding context. Supports regex patterns and can filter by file type."""
     
     def parameters_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "project_id": {
-                    "type": "string",
-                    "description": "The book project identifier"
-                },
-                "query": {
-                    "type": "string",
-                    "description": "Text or regex pattern to search for"
-                },
-                "path": {
-                    "type": "string",
-                    "description": "Directory to search in, relative to project root (default: '.')"
-                },
-                "file_pattern": {
-                    "type": "string",
-                    "description": "Glob pattern to filter files (e.g., '*.txt', '*.py')"
-                },
-                "use_regex": {
-                    "type": "boolean",
-                    "description": "Treat query as regex pattern (default: false)"
-                },
-                "ignore_case": {
-                    "type": "boolean",
-                    "description": "Case-insensitive search (default: true)"
-                }
-            },
-            "required": ["project_id", "query"]
-        }
+        return self._SCHEMA
     
     def execute(
         self, 
         project_id: str, 
-        query: str,
+        query: Union[str, List[str]],
         path: str = ".",
         file_pattern: Optional[str] = None,
         use_regex: bool = False,
@@ -901,7 +1408,7 @@ with surrounding context. Supports regex patterns and can filter by file type.""
         
         Args:
             project_id: The book project identifier
-            query: Text or pattern to search for
+            query: Text or pattern to search for, or a list of them to match any of
             path: Directory to search in
             file_pattern: Optional file pattern filter
             use_regex: Treat query as regex
@@ -919,66 +1426,39 @@ with surrounding context. Supports regex patterns and can filter by file type.""
                     'error': f"Directory not found: {path}"
                 }
             
-            # Compile search pattern
+            # Compile search pattern; a list of queries is folded into a single
+            # alternation so every line is scanned once for all of them
             flags = re.IGNORECASE if ignore_case else 0
-            if use_regex:
-                pattern = re.compile(query, flags)
+            if isinstance(query, (list, tuple)):
+                if not query:
+                    return {
+                        'success': False,
+                        'error': "Query list must not be empty"
+                    }
+                terms = query if use_regex else [re.escape(q) for q in query]
+                pattern = compile_search_pattern('|'.join(f'(?:{t})' for t in terms), flags)
+                literals = [] if use_regex else list(query)
             else:
-                pattern = re.compile(re.escape(query), flags)
-            
-            matches = []
-            base_path = get_project_path(project_id)
-            
-            # Walk directory
-            for root, dirs, files in os.walk(full_path):
-                # Filter ignored directories
-                dirs[:] = [d for d in dirs if not should_ignore(d)]
-                
-                for filename in files:
-                    if should_ignore(filename):
-                        continue
-                    
-                    # Apply file pattern filter
-                    if file_pattern and not fnmatch.fnmatch(filename, file_pattern):
-                        continue
-                    
-                    file_path = os.path.join(root, filename)
-                    rel_path = os.path.relpath(file_path, base_path)
-                    
-                    # Search file
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                            lines = f.readlines()
-                        
-                        for i, line in enumerate(lines):
-                            if pattern.search(line):
-                                # Get context
-                                start = max(0, i - self.CONTEXT_LINES)
-                                end = min(len(lines), i + self.CONTEXT_LINES + 1)
-                                
-                                context = []
-                                for j in range(start, end):
-                                    prefix = ">" if j == i else " "
-                                    context.append(f"{j+1:4d}{prefix}| {lines[j].rstrip()}")
-                                
-                                matches.append({
-                                    'file': rel_path,
-                                    'line': i + 1,
-                                    'match': line.strip(),
-                                    'context': '\n'.join(context)
-                                })
-                                
-                                if len(matches) >= self.MAX_MATCHES:
-                                    break
-                    except Exception:
-                        # Skip files that can't be read
-                        continue
-                    
-                    if len(matches) >= self.MAX_MATCHES:
-                        break
-                
-                if len(matches) >= self.MAX_MATCHES:
-                    break
+                pattern = compile_search_pattern(query, flags, escape=not use_regex)
+                literals = [] if use_regex else [query]
+            
+            # Literal queries are searched over each file's whole text instead of
+            # line by line, and a single case-sensitive literal can rule a file
+            # out from its raw bytes first. Queries spanning line endings are
+            # left to the line loop, since text mode rewrites \r\n first.
+            needle = None
+            whole_text = bool(literals) and not any('\n' in q or '\r' in q for q in literals)
+            if whole_text and len(literals) == 1 and not ignore_case and '\ufffd' not in literals[0]:
+                needle = literals[0].encode('utf-8')
+            
+            relpath = project_relpath(get_project_path(project_id))
+            file_match = _name_matcher(file_pattern) if file_pattern else None
+            
+            # The generator stops walking as soon as MAX_MATCHES have been taken
+            matches = list(islice(
+                self._iter_matches(full_path, relpath, pattern, file_match, needle, whole_text),
+                self.MAX_MATCHES
+            ))
             
             truncated = len(matches) >= self.MAX_MATCHES
             
@@ -986,7 +1466,7 @@ with surrounding context. Supports regex patterns and can filter by file type.""
             if matches:
                 output_parts = []
                 for m in matches:
-                    output_parts.append(f"📄 {m['file']}:{m['line']}")
+                    output_parts.append(f"{FILE_MARK}{m['file']}:{m['line']}")
                     output_parts.append(m['context'])
                     output_parts.append("")
                 output = '\n'.join(output_parts)
@@ -1019,6 +1499,184 @@ with surrounding context. Supports regex patterns and can filter by file type.""
                 'success': False,
                 'error': str(e)
             }
+    
+    def _iter_matches(self, full_path: str, relpath: Callable[[str], str], pattern: 're.Pattern[str]',
+                      file_match: Optional[Callable[[str], Any]], needle: Optional[bytes],
+                      whole_text: bool) -> Iterator[Dict[str, Any]]:
+        """
+        Yield match dicts for every matching line under full_path, in walk order.
+        
+        Larger trees are scanned on a thread pool so file reads overlap; results
+        are still consumed in walk order, and files not yet started are
+        cancelled once the caller stops iterating.
+        """
+        candidates = list(self._iter_candidates(full_path, file_match))
+        scan = functools.partial(
+            self._scan_file, relpath=relpath, pattern=pattern,
+            needle=needle, whole_text=whole_text
+        )
+        
+        if len(candidates) < self.PARALLEL_MIN_FILES:
+            for file_path in candidates:
+                yield from scan(file_path)
+            return
+        
+        with ThreadPoolExecutor() as pool:
+            futures = [pool.submit(scan, file_path) for file_path in candidates]
+            try:
+                for future in futures:
+                    yield from future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+    
+    def _iter_candidates(self, full_path: str,
+                         file_match: Optional[Callable[[str], Any]]) -> Iterator[str]:
+        """Yield the paths of files under full_path that pass the ignore and file_pattern filters."""
+        for root, dirs, files in os.walk(full_path):
+            # Filter ignored directories
+            dirs[:] = [d for d in dirs if not is_ignored_name(d)]
+            
+            for filename in files:
+                if is_ignored_name(filename):
+                    continue
+                
+                # Apply file pattern filter
+                if file_match and not file_match(filename):
+                    continue
+                
+                yield os.path.join(root, filename)
+    
+    def _scan_file(self, file_path: str, relpath: Callable[[str], str], pattern: 're.Pattern[str]',
+                   needle: Optional[bytes], whole_text: bool) -> List[Dict[str, Any]]:
+        """Return the match dicts for a single file (empty if it has none or can't be read)."""
+        try:
+            text = self._read_text_if_match(file_path, needle)
+        except Exception:
+            # Skip files that can't be read
+            return []
+        if text is None:
+            return []
+        
+        if whole_text:
+            return self._match_text(relpath(file_path), text, pattern)
+        
+        # Universal newlines, exactly like reading the file in text mode
+        lines = io.StringIO(text, newline=None).readlines()
+        rel_path = relpath(file_path)
+        matches = []
+        for i, line in enumerate(lines):
+            if pattern.search(line):
+                # Get context
+                start = max(0, i - self.CONTEXT_LINES)
+                end = min(len(lines), i + self.CONTEXT_LINES + 1)
+                
+                context = []
+                for j in range(start, end):
+                    prefix = ">" if j == i else " "
+                    context.append(f"{j+1:4d}{prefix}| {lines[j].rstrip()}")
+                
+                matches.append({
+                    'file': rel_path,
+                    'line': i + 1,
+                    'match': line.strip(),
+                    'context': '\n'.join(context)
+                })
+                
+                if len(matches) >= self.MAX_MATCHES:
+                    # The caller never takes more than this from one file
+                    break
+        return matches
+    
+    def _match_text(self, rel_path: str, text: str, pattern: 're.Pattern[str]') -> List[Dict[str, Any]]:
+        """
+        Find matching lines by searching the whole text, without splitting it into lines.
+        
+        Only valid for patterns that cannot span or anchor on line breaks (the
+        literal queries). Line numbers come from counting newlines between hits
+        and each context window is sliced straight out of the text, so only the
+        lines around a match are ever materialized.
+        """
+        if '\r' in text:
+            # Universal newlines, as text-mode reading would apply
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        text_len = len(text)
+        
+        matches = []
+        line_idx = 0  # Zero-based line number of offset `counted`
+        counted = 0
+        pos = 0
+        while len(matches) < self.MAX_MATCHES:
+            m = pattern.search(text, pos)
+            if m is None:
+                break
+            
+            offset = m.start()
+            line_idx += text.count('\n', counted, offset)
+            counted = offset
+            line_start = text.rfind('\n', 0, offset) + 1
+            line_end = text.find('\n', offset)
+            if line_end < 0:
+                line_end = text_len
+            
+            # Widen to CONTEXT_LINES whole lines on either side
+            ctx_start = line_start
+            before = 0
+            while before < self.CONTEXT_LINES and ctx_start > 0:
+                ctx_start = text.rfind('\n', 0, ctx_start - 1) + 1
+                before += 1
+            ctx_end = line_end
+            for _ in range(self.CONTEXT_LINES):
+                if ctx_end + 1 >= text_len:
+                    break
+                next_end = text.find('\n', ctx_end + 1)
+                ctx_end = text_len if next_end < 0 else next_end
+            
+            first = line_idx - before
+            context = [
+                f"{j+1:4d}{'>' if j == line_idx else ' '}| {line.rstrip()}"
+                for j, line in enumerate(text[ctx_start:ctx_end].split('\n'), start=first)
+            ]
+            
+            matches.append({
+                'file': rel_path,
+                'line': line_idx + 1,
+                'match': text[line_start:line_end].strip(),
+                'context': '\n'.join(context)
+            })
+            
+            # Only the first hit on a line counts; resume on the next line
+            pos = line_end + 1
+            if pos >= text_len:
+                break
+        return matches
+    
+    def _read_text_if_match(self, file_path: str, needle: Optional[bytes]) -> Optional[str]:
+        """
+        Return a file's decoded text, or None if it is binary or cannot match.
+        
+        Binary files (a NUL byte in the first BINARY_SNIFF_BYTES) are skipped.
+        needle, when given, is a UTF-8 literal looked up in the raw bytes (via
+        mmap for large files, so non-matching files are never copied into
+        Python) before anything is decoded.
+        """
+        with open(file_path, 'rb') as f:
+            # Like grep, treat a NUL byte near the start as a binary file and skip it
+            head = f.read(self.BINARY_SNIFF_BYTES)
+            if b'\0' in head:
+                return None
+            
+            if needle is not None and os.fstat(f.fileno()).st_size >= self.MMAP_MIN_BYTES:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if mm.find(needle) < 0:
+                        return None
+                    data = mm[:]
+            else:
+                data = head + f.read() if len(head) == self.BINARY_SNIFF_BYTES else head
+                if needle is not None and needle not in data:
+                    return None
+        
+        return data.decode('utf-8', errors='replace')
 
 
 # =============================================================================
@@ -1032,6 +1690,21 @@ class DeleteFileTool(BaseTool):
     Based on Cursor DeleteFile tool.
     """
     
+    _SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "project_id": {
+                "type": "string",
+                "description": "The book project identifier"
+            },
+            "path": {
+                "type": "string",
+                "description": "Path to the file to delete, relative to project root"
+            }
+        },
+        "required": ["project_id", "path"]
+    }
+    
     def name(self) -> str:
         return "delete_file"
     
@@ -1039,20 +1712,7 @@ class DeleteFileTool(BaseTool):
         return "Delete a file from the project. Use with caution - this cannot be undone."
     
     def parameters_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "project_id": {
-                    "type": "string",
-                    "description": "The book project identifier"
-                },
-                "path": {
-                    "type": "string",
-                    "description": "Path to the file to delete, relative to project root"
-                }
-            },
-            "required": ["project_id", "path"]
-        }
+        return self._SCHEMA
     
     def execute(self, project_id: str, path: str) -> Dict[str, Any]:
         """
@@ -1081,8 +1741,8 @@ class DeleteFileTool(BaseTool):
                 }
             
             # Get file info before deletion
-            stat = os.stat(full_path)
-            size = stat.st_size
+            st = os.stat(full_path)
+            size = st.st_size
             
             # Delete the file
             os.remove(full_path)
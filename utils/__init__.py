@@ -6,8 +6,10 @@ This package provides utility modules for database and LLM client functionality.
 
 from .llm_client import (
     LLMClient,
+    AsyncLLMClient,
     LLMConfig,
     LLMResponse,
+    IterationInfo,
     LLMProvider,
     ChatMessage,
     ToolDefinition,
@@ -19,8 +21,10 @@ from .llm_client import (
 
 __all__ = [
     'LLMClient',
+    'AsyncLLMClient',
     'LLMConfig',
     'LLMResponse',
+    'IterationInfo',
     'LLMProvider',
     'ChatMessage',
     'ToolDefinition',
@@ -3,7 +3,10 @@ Agent Factory for BookGPT.
 Centralizes agent creation and management.
 """
 
+import functools
 import logging
+import threading
+from collections.abc import Mapping
 from book_agent import BookWritingAgent
 from utils.llm_client import get_llm_client
 from utils.database import BookDatabase
@@ -19,32 +22,69 @@ from tools.file_tools import (
 
 logger = logging.getLogger(__name__)
 
-# Global tool registry
-ALL_TOOLS = {
-    'read_file': ReadFileTool(),
-    'write_file': WriteFileTool(),
-    'edit_file': EditFileTool(),
-    'list_directory': ListDirectoryTool(),
-    'search_files': SearchFilesTool(),
-    'grep_search': GrepSearchTool(),
-    'delete_file': DeleteFileTool()
+# Tool classes by name; instances are created on first use
+_TOOL_FACTORIES = {
+    'read_file': ReadFileTool,
+    'write_file': WriteFileTool,
+    'edit_file': EditFileTool,
+    'list_directory': ListDirectoryTool,
+    'search_files': SearchFilesTool,
+    'grep_search': GrepSearchTool,
+    'delete_file': DeleteFileTool
 }
 
+@functools.lru_cache(maxsize=None)
+def get_tool(name: str):
+    """Get the shared instance of a tool, creating it on first request."""
+    return _TOOL_FACTORIES[name]()
+
+class _ToolRegistry(Mapping):
+    """Read-only name -> tool mapping backed by get_tool()."""
+
+    def __getitem__(self, name):
+        if name not in _TOOL_FACTORIES:
+            raise KeyError(name)
+        return get_tool(name)
+
+    def __iter__(self):
+        return iter(_TOOL_FACTORIES)
+
+    def __len__(self):
+        return len(_TOOL_FACTORIES)
+
+# Global tool registry
+ALL_TOOLS = _ToolRegistry()
+
 # Global agent instance
 _agent = None
+_agent_lock = threading.Lock()
 
 def get_agent() -> BookWritingAgent:
     """Get or create the global agent instance."""
     global _agent
+    # Fast path is a single global read; the lock is only taken while creating
     if _agent is None:
-        llm_client = get_llm_client()
-        tools_list = list(ALL_TOOLS.values())
-        db = BookDatabase()
-        _agent = BookWritingAgent(tools=tools_list, llm_client=llm_client, db=db)
-        logger.info("Global BookWritingAgent initialized")
+        with _agent_lock:
+            if _agent is None:
+                llm_client = get_llm_client()
+                tools_list = [get_tool(name) for name in _TOOL_FACTORIES]
+                db = BookDatabase()
+                _agent = BookWritingAgent(tools=tools_list, llm_client=llm_client, db=db)
+                logger.info("Global BookWritingAgent initialized")
     return _agent
 
+class _LazyAgent:
+    """Proxy that creates the global agent on first attribute access."""
+
+    def __getattr__(self, name):
+        return getattr(get_agent(), name)
+
+def get_agent_lazy() -> BookWritingAgent:
+    """Return a stand-in for the global agent without creating it yet."""
+    return _LazyAgent()
+
 def reset_agent():
     """Reset the global agent instance."""
     global _agent
-    _agent = None
+    with _agent_lock:
+        _agent = None
@@ -5,210 +5,521 @@ Provides persistent storage for book projects, settings, and related data.
 """
 
 import sqlite3
-import json
 import uuid
 import os
-from typing import List, Dict, Any, Optional
+import copy
+import queue
+import threading
+import time
+import zlib
+from pathlib import Path
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 from datetime import datetime
 import logging
-from models.book_model import BookProject, Chapter, AgentExecution, ProjectStats
+from utils import json_utils
+from models.book_model import (
+    BookProject, ProjectSummary, Chapter, AgentExecution, ProjectStats, count_words
+)
 
 logger = logging.getLogger(__name__)
 
+# Try to import optional dependencies
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    logger.debug("zstandard not installed. Chapter versions will be compressed with zlib.")
+
+# Datetimes bind as ISO-8601 text; result columns labelled "name [isodatetime]"
+# (read with PARSE_COLNAMES) come back as datetime objects
+sqlite3.register_adapter(datetime, datetime.isoformat)
+sqlite3.register_converter('isodatetime', lambda raw: datetime.fromisoformat(raw.decode()))
+
+# Bump whenever _SCHEMA_SQL changes so existing databases re-run it
+SCHEMA_VERSION = 2
+
+# Tables whose row counts storage_counters tracks for get_storage_stats
+COUNTED_TABLES = ('projects', 'chapters', 'agent_executions')
+
+# Every table and index, created in one transaction by init_database
+_SCHEMA_SQL = '''
+BEGIN IMMEDIATE;
+
+-- Projects table
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    genre TEXT NOT NULL,
+    target_length INTEGER NOT NULL,
+    writing_style TEXT NOT NULL,
+    status TEXT DEFAULT 'created',
+    outline TEXT,
+    research_materials TEXT,
+    chapters_completed INTEGER DEFAULT 0,
+    total_words INTEGER DEFAULT 0,
+    current_chapter INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL,
+    metadata TEXT DEFAULT '{}'
+);
+
+-- Settings table
+CREATE TABLE IF NOT EXISTS settings (
+    id TEXT PRIMARY KEY DEFAULT 'default',
+    category TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Chapters table
+CREATE TABLE IF NOT EXISTS chapters (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    chapter_number INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    content TEXT DEFAULT '',
+    word_count INTEGER DEFAULT 0,
+    status TEXT DEFAULT 'draft',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    notes TEXT DEFAULT '',
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+);
+
+-- Agent executions table
+CREATE TABLE IF NOT EXISTS agent_executions (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    step_type TEXT NOT NULL,
+    input_prompt TEXT NOT NULL,
+    tool_calls TEXT DEFAULT '[]',
+    results TEXT DEFAULT '[]',
+    status TEXT DEFAULT 'pending',
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL,
+    error_message TEXT NULL,
+    execution_time REAL NULL,
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+);
+
+-- Project stats table
+CREATE TABLE IF NOT EXISTS project_stats (
+    project_id TEXT PRIMARY KEY,
+    total_sessions INTEGER DEFAULT 0,
+    total_agent_steps INTEGER DEFAULT 0,
+    total_files_created INTEGER DEFAULT 0,
+    average_chapter_length REAL DEFAULT 0.0,
+    writing_velocity REAL DEFAULT 0.0,
+    most_productive_hour INTEGER DEFAULT 0,
+    last_activity TIMESTAMP NULL,
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+);
+
+-- Chapter versions table - for version history
+CREATE TABLE IF NOT EXISTS chapter_versions (
+    id TEXT PRIMARY KEY,
+    chapter_id TEXT NOT NULL,
+    project_id TEXT NOT NULL,
+    version_number INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    word_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_by TEXT DEFAULT 'agent',
+    change_summary TEXT DEFAULT '',
+    parent_version_id TEXT,
+    metadata TEXT DEFAULT '{}',
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+);
+
+-- Characters table - for character management
+CREATE TABLE IF NOT EXISTS characters (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT DEFAULT '',
+    role TEXT DEFAULT '',
+    first_appearance_chapter INTEGER,
+    last_appearance_chapter INTEGER,
+    traits TEXT DEFAULT '[]',
+    relationships TEXT DEFAULT '{}',
+    backstory TEXT DEFAULT '',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    metadata TEXT DEFAULT '{}',
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+);
+
+-- Plot points table - for plot management
+CREATE TABLE IF NOT EXISTS plot_points (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT DEFAULT '',
+    chapter_number INTEGER,
+    plot_type TEXT DEFAULT 'event',
+    importance INTEGER DEFAULT 1,
+    characters_involved TEXT DEFAULT '[]',
+    dependencies TEXT DEFAULT '[]',
+    consequences TEXT DEFAULT '[]',
+    status TEXT DEFAULT 'planned',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    metadata TEXT DEFAULT '{}',
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+);
+
+-- Writing templates table
+CREATE TABLE IF NOT EXISTS writing_templates (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT DEFAULT '',
+    genre TEXT DEFAULT 'fiction',
+    system_prompt TEXT NOT NULL,
+    outline_template TEXT DEFAULT '',
+    character_template TEXT DEFAULT '',
+    chapter_prompt_template TEXT DEFAULT '',
+    created_by TEXT,
+    is_public INTEGER DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    metadata TEXT DEFAULT '{}'
+);
+
+-- Create additional indexes
+CREATE INDEX IF NOT EXISTS idx_chapter_versions_project ON chapter_versions(project_id);
+CREATE INDEX IF NOT EXISTS idx_chapter_versions_chapter ON chapter_versions(chapter_id);
+CREATE INDEX IF NOT EXISTS idx_characters_project ON characters(project_id);
+CREATE INDEX IF NOT EXISTS idx_plot_points_project ON plot_points(project_id);
+CREATE INDEX IF NOT EXISTS idx_templates_genre ON writing_templates(genre);
+CREATE INDEX IF NOT EXISTS idx_templates_public ON writing_templates(is_public);
+
+-- Create indexes
+CREATE INDEX IF NOT EXISTS idx_projects_user_id ON projects(user_id);
+CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(status);
+CREATE INDEX IF NOT EXISTS idx_projects_created_at ON projects(created_at);
+-- Covering indexes for iter_projects: the list columns ride along in
+-- the index so listings never touch the table rows (and their JSON)
+CREATE INDEX IF NOT EXISTS idx_projects_updated_at_cover ON projects(
+    updated_at DESC, id DESC, title, genre, status, chapters_completed,
+    total_words, target_length, created_at);
+CREATE INDEX IF NOT EXISTS idx_projects_user_updated_at_cover ON projects(
+    user_id, updated_at DESC, id DESC, title, genre, status,
+    chapters_completed, total_words, target_length, created_at);
+CREATE INDEX IF NOT EXISTS idx_chapters_project_id ON chapters(project_id);
+CREATE INDEX IF NOT EXISTS idx_executions_project_id ON agent_executions(project_id);
+CREATE INDEX IF NOT EXISTS idx_settings_category ON settings(category);
+
+-- Row counts kept current by triggers, so stats never COUNT(*) a whole table.
+-- Upserts take the DO UPDATE path and fire no INSERT trigger.
+CREATE TABLE IF NOT EXISTS storage_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+''' + ''.join(f'''
+INSERT OR REPLACE INTO storage_counters (name, value) SELECT '{table}', COUNT(*) FROM {table};
+CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert AFTER INSERT ON {table} BEGIN
+    UPDATE storage_counters SET value = value + 1 WHERE name = '{table}';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete AFTER DELETE ON {table} BEGIN
+    UPDATE storage_counters SET value = value - 1 WHERE name = '{table}';
+END;
+''' for table in COUNTED_TABLES) + f'''
+PRAGMA user_version = {SCHEMA_VERSION};
+COMMIT;
+'''
+
+
+def _upsert_clause(cols: tuple) -> str:
+    """
+    ON CONFLICT clause that updates every non-key column in place.
+    
+    Unlike INSERT OR REPLACE this never deletes the existing row, so ON DELETE
+    CASCADE children (chapters, executions, stats) are left alone.
+    """
+    return ' ON CONFLICT(id) DO UPDATE SET ' + ', '.join(
+        f'{col} = excluded.{col}' for col in cols if col != 'id')
+
+
+SQL_INSERT_PROJECT = '''
+    INSERT INTO projects
+    (id, user_id, title, genre, target_length, writing_style, status,
+     outline, research_materials, chapters_completed, total_words, current_chapter,
+     created_at, updated_at, completed_at, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+''' + _upsert_clause(BookProject.FIELDS)
+
+SQL_SELECT_PROJECT = '''
+    SELECT id, user_id, title, genre, target_length, writing_style, status,
+           outline, research_materials, chapters_completed, total_words, current_chapter,
+           created_at AS "created_at [isodatetime]",
+           updated_at AS "updated_at [isodatetime]",
+           completed_at AS "completed_at [isodatetime]",
+           metadata
+    FROM projects WHERE id = ?
+'''
+
+SQL_SELECT_PROJECT_SUMMARY = '''
+    SELECT id, user_id, title, genre, target_length, writing_style, status,
+           chapters_completed, total_words, current_chapter,
+           created_at AS "created_at [isodatetime]",
+           updated_at AS "updated_at [isodatetime]",
+           completed_at AS "completed_at [isodatetime]"
+    FROM projects WHERE id = ?
+'''
+
+SQL_LIST_PROJECTS_BASE = '''
+    SELECT id, title, genre, status, chapters_completed, total_words,
+           target_length, created_at, updated_at
+    FROM projects
+'''
+
+SQL_DELETE_PROJECT = 'DELETE FROM projects WHERE id = ?'
+
+# Tables holding per-project rows, removed together with the project
+PROJECT_CHILD_TABLES = ('chapters', 'agent_executions', 'project_stats', 'chapter_versions',
+                        'characters', 'plot_points')
+
+SQL_INSERT_SETTINGS = '''
+    INSERT INTO settings (id, category, data, updated_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(id) DO UPDATE SET
+        category = excluded.category, data = excluded.data, updated_at = excluded.updated_at
+'''
+
+SQL_SELECT_SETTINGS = 'SELECT data FROM settings WHERE category = ?'
+
+SQL_SELECT_ALL_SETTINGS = 'SELECT category, data FROM settings'
+
+# All storage counters plus the oldest/newest project in one statement
+SQL_STORAGE_STATS = '''
+    SELECT (SELECT value FROM storage_counters WHERE name = 'projects') AS total_projects,
+           (SELECT value FROM storage_counters WHERE name = 'chapters') AS total_chapters,
+           (SELECT value FROM storage_counters WHERE name = 'agent_executions') AS total_executions,
+           oldest.id AS oldest_id, oldest.title AS oldest_title,
+           oldest.created_at AS oldest_created_at,
+           newest.id AS newest_id, newest.title AS newest_title,
+           newest.created_at AS newest_created_at
+    FROM (SELECT 1)
+    LEFT JOIN (SELECT id, title, created_at FROM projects
+               ORDER BY created_at ASC LIMIT 1) AS oldest
+    LEFT JOIN (SELECT id, title, created_at FROM projects
+               ORDER BY created_at DESC LIMIT 1) AS newest
+'''
+
+# How long a connection waits on a locked database before raising, in seconds.
+# sqlite3 installs this as SQLite's C-level busy handler (same as PRAGMA busy_timeout)
+BUSY_TIMEOUT = 5.0
+
+# Prepared statements kept per connection (the sqlite3 default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+# Bound-parameter ceiling per statement (SQLite raised it from 999 in 3.32)
+MAX_SQL_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
+# Chapter version bodies at least this many UTF-8 bytes are stored compressed;
+# below it the frame overhead outweighs the saving
+COMPRESS_MIN_BYTES = 4096
+
+# Every zstd frame starts with this magic number; anything else is zlib
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def _pack_text(text: str) -> Union[str, bytes]:
+    """
+    Prepare a large text value for storage.
+    
+    Returns text unchanged when it is short, otherwise a zstd (level 1) or
+    zlib (level 1) compressed BLOB. SQLite keeps the storage class per value,
+    so _unpack_text() can tell the two apart on read.
+    """
+    data = text.encode('utf-8')
+    if len(data) < COMPRESS_MIN_BYTES:
+        return text
+    if ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=1).compress(data)
+    return zlib.compress(data, 1)
+
+
+def _unpack_text(value: Union[str, bytes, None]) -> Optional[str]:
+    """Reverse _pack_text(); plain TEXT values pass through."""
+    if not isinstance(value, bytes):
+        return value
+    if value[:4] == _ZSTD_MAGIC:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read this chapter version")
+        return zstandard.ZstdDecompressor().decompress(value).decode('utf-8')
+    return zlib.decompress(value).decode('utf-8')
+
+
+def _dump_json(value: Any) -> Optional[str]:
+    """Serialize a JSON column value, storing SQL NULL only for None."""
+    return None if value is None else json_utils.dumps(value)
+
+
+def _project_row(project: BookProject) -> tuple:
+    """Build the SQL_INSERT_PROJECT parameters for a project."""
+    return (
+        project.id,
+        project.user_id,
+        project.title,
+        project.genre,
+        project.target_length,
+        project.writing_style,
+        project.status,
+        _dump_json(project.outline),
+        _dump_json(project.research_materials),
+        project.chapters_completed,
+        project.total_words,
+        project.current_chapter,
+        project.created_at,
+        project.updated_at,
+        project.completed_at,
+        _dump_json(project.metadata)
+    )
+
+
+def _bulk_insert(conn: sqlite3.Connection, table: str, cols: tuple, rows: List[tuple],
+                 chunk: int = 500):
+    """Upsert rows (keyed on id) using multi-row VALUES statements."""
+    chunk = max(1, min(chunk, MAX_SQL_VARIABLES // len(cols)))
+    placeholders = "(" + ", ".join("?" * len(cols)) + ")"
+    prefix = f"INSERT INTO {table} ({', '.join(cols)}) VALUES "
+    upsert = _upsert_clause(cols)
+    for i in range(0, len(rows), chunk):
+        chunk_rows = rows[i:i + chunk]
+        sql = prefix + ", ".join([placeholders] * len(chunk_rows)) + upsert
+        conn.execute(sql, [value for row in chunk_rows for value in row])
+
+
+def _execution_row(execution: AgentExecution) -> tuple:
+    """Build the agent_executions row (AgentExecution.FIELDS order) for a record."""
+    return (
+        execution.id,
+        execution.project_id,
+        execution.step_type,
+        execution.input_prompt,
+        json_utils.dumps(execution.tool_calls),
+        json_utils.dumps(execution.results),
+        execution.status,
+        execution.started_at,
+        execution.completed_at,
+        execution.error_message,
+        execution.execution_time
+    )
+
+
 class BookDatabase:
     """Handles SQLite database operations for BookGPT."""
 
+    # Idle read connections kept open between calls
+    READ_POOL_SIZE = 4
+    # Seconds get_storage_stats() may serve a cached result; any write clears it sooner
+    STATS_TTL = 10.0
+
     def __init__(self, db_path: str = "data/bookgpt.db"):
         self.db_path = db_path
         # Ensure directory exists
         db_dir = os.path.dirname(db_path)
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
+        # One shared writer serialized by a lock, plus a pool of reader
+        # connections that WAL lets run alongside it
+        self._write_lock = threading.Lock()
+        self._write_conn = self._connect()
+        self._read_pool: queue.Queue = queue.Queue(maxsize=self.READ_POOL_SIZE)
+        # Bumped on every committed write so cached reads can tell they are stale
+        self._write_count = 0
+        # (monotonic time, write count, stats) from the last get_storage_stats() call
+        self._stats_cache: Optional[Tuple[float, int, Dict[str, Any]]] = None
         self.init_database()
 
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """Open a connection with the per-connection PRAGMAs applied."""
+        if read_only:
+            # mode=ro lets SQLite skip write-lock negotiation for pooled readers
+            target, uri = Path(os.path.abspath(self.db_path)).as_uri() + '?mode=ro', True
+        else:
+            target, uri = self.db_path, False
+        # Pooled connections live long, so keep their prepared statements around
+        # isolation_level=None stops sqlite3 from issuing implicit BEGINs; only
+        # _writer() opens transactions, so reads never start one
+        conn = sqlite3.connect(target, uri=uri, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                               isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE,
+                               detect_types=sqlite3.PARSE_COLNAMES)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+
+    @contextmanager
+    def _writer(self) -> Iterator[sqlite3.Connection]:
+        """Hold the write connection for one transaction."""
+        with self._write_lock:
+            conn = self._write_conn
+            # IMMEDIATE takes SQLite's write lock up front instead of upgrading
+            # a deferred read transaction later (which can fail with SQLITE_BUSY)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+            self._write_count += 1
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read connection from the pool, opening one if none is idle."""
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect(read_only=True)
+        try:
+            yield conn
+        finally:
+            try:
+                self._read_pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        """Close the writer and every pooled reader."""
+        with self._write_lock:
+            self._write_conn.close()
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+
     def init_database(self):
         """Initialize database tables."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Projects table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS projects (
-                        id TEXT PRIMARY KEY,
-                        user_id TEXT NOT NULL,
-                        title TEXT NOT NULL,
-                        genre TEXT NOT NULL,
-                        target_length INTEGER NOT NULL,
-                        writing_style TEXT NOT NULL,
-                        status TEXT DEFAULT 'created',
-                        outline TEXT,
-                        research_materials TEXT,
-                        chapters_completed INTEGER DEFAULT 0,
-                        total_words INTEGER DEFAULT 0,
-                        current_chapter INTEGER DEFAULT 0,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        completed_at TIMESTAMP NULL,
-                        metadata TEXT DEFAULT '{}'
-                    )
-                ''')
-                
-                # Settings table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS settings (
-                        id TEXT PRIMARY KEY DEFAULT 'default',
-                        category TEXT NOT NULL,
-                        data TEXT NOT NULL,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # Chapters table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS chapters (
-                        id TEXT PRIMARY KEY,
-                        project_id TEXT NOT NULL,
-                        chapter_number INTEGER NOT NULL,
-                        title TEXT NOT NULL,
-                        content TEXT DEFAULT '',
-                        word_count INTEGER DEFAULT 0,
-                        status TEXT DEFAULT 'draft',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        notes TEXT DEFAULT '',
-                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
-                    )
-                ''')
-                
-                # Agent executions table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS agent_executions (
-                        id TEXT PRIMARY KEY,
-                        project_id TEXT NOT NULL,
-                        step_type TEXT NOT NULL,
-                        input_prompt TEXT NOT NULL,
-                        tool_calls TEXT DEFAULT '[]',
-                        results TEXT DEFAULT '[]',
-                        status TEXT DEFAULT 'pending',
-                        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        completed_at TIMESTAMP NULL,
-                        error_message TEXT NULL,
-                        execution_time REAL NULL,
-                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
-                    )
-                ''')
-                
-                # Project stats table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS project_stats (
-                        project_id TEXT PRIMARY KEY,
-                        total_sessions INTEGER DEFAULT 0,
-                        total_agent_steps INTEGER DEFAULT 0,
-                        total_files_created INTEGER DEFAULT 0,
-                        average_chapter_length REAL DEFAULT 0.0,
-                        writing_velocity REAL DEFAULT 0.0,
-                        most_productive_hour INTEGER DEFAULT 0,
-                        last_activity TIMESTAMP NULL,
-                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
-                    )
-                ''')
-
-                # Chapter versions table - for version history
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS chapter_versions (
-                        id TEXT PRIMARY KEY,
-                        chapter_id TEXT NOT NULL,
-                        project_id TEXT NOT NULL,
-                        version_number INTEGER NOT NULL,
-                        content TEXT NOT NULL,
-                        word_count INTEGER DEFAULT 0,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        created_by TEXT DEFAULT 'agent',
-                        change_summary TEXT DEFAULT '',
-                        parent_version_id TEXT,
-                        metadata TEXT DEFAULT '{}',
-                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
-                    )
-                ''')
-
-                # Characters table - for character management
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS characters (
-                        id TEXT PRIMARY KEY,
-                        project_id TEXT NOT NULL,
-                        name TEXT NOT NULL,
-                        description TEXT DEFAULT '',
-                        role TEXT DEFAULT '',
-                        first_appearance_chapter INTEGER,
-                        last_appearance_chapter INTEGER,
-                        traits TEXT DEFAULT '[]',
-                        relationships TEXT DEFAULT '{}',
-                        backstory TEXT DEFAULT '',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        metadata TEXT DEFAULT '{}',
-                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
-                    )
-                ''')
-
-                # Plot points table - for plot management
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS plot_points (
-                        id TEXT PRIMARY KEY,
-                        project_id TEXT NOT NULL,
-                        title TEXT NOT NULL,
-                        description TEXT DEFAULT '',
-                        chapter_number INTEGER,
-                        plot_type TEXT DEFAULT 'event',
-                        importance INTEGER DEFAULT 1,
-                        characters_involved TEXT DEFAULT '[]',
-                        dependencies TEXT DEFAULT '[]',
-                        consequences TEXT DEFAULT '[]',
-                        status TEXT DEFAULT 'planned',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        metadata TEXT DEFAULT '{}',
-                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
-                    )
-                ''')
-
-                # Writing templates table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS writing_templates (
-                        id TEXT PRIMARY KEY,
-                        name TEXT NOT NULL,
-                        description TEXT DEFAULT '',
-                        genre TEXT DEFAULT 'fiction',
-                        system_prompt TEXT NOT NULL,
-                        outline_template TEXT DEFAULT '',
-                        character_template TEXT DEFAULT '',
-                        chapter_prompt_template TEXT DEFAULT '',
-                        created_by TEXT,
-                        is_public INTEGER DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        metadata TEXT DEFAULT '{}'
-                    )
-                ''')
-
-                # Create additional indexes
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_chapter_versions_project ON chapter_versions(project_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_chapter_versions_chapter ON chapter_versions(chapter_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_characters_project ON characters(project_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_plot_points_project ON plot_points(project_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_templates_genre ON writing_templates(genre)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_templates_public ON writing_templates(is_public)')
-                
-                # Create indexes
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_projects_user_id ON projects(user_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(status)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_chapters_project_id ON chapters(project_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_executions_project_id ON agent_executions(project_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_settings_category ON settings(category)')
-                
-                conn.commit()
+            with self._write_lock:
+                conn = self._write_conn
+                # WAL is persistent in the database file, so it only needs setting once
+                # (and it cannot be switched from inside a transaction)
+                conn.execute("PRAGMA journal_mode=WAL")
+
+                # Skip the DDL entirely when the file already has the current schema
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                    return
+
+                try:
+                    conn.executescript(_SCHEMA_SQL)
+                except Exception:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    raise
+
                 logger.info("Database initialized successfully")
-                
+
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
             raise
@@ -216,59 +527,58 @@ class BookDatabase:
     def save_project(self, project: BookProject) -> bool:
         """Save a book project to database."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._writer() as conn:
+                conn.execute(SQL_INSERT_PROJECT, _project_row(project))
                 
-                cursor.execute('''
-                    INSERT OR REPLACE INTO projects 
-                    (id, user_id, title, genre, target_length, writing_style, status, 
-                     outline, research_materials, chapters_completed, total_words, current_chapter,
-                     created_at, updated_at, completed_at, metadata)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    project.id,
-                    project.user_id,
-                    project.title,
-                    project.genre,
-                    project.target_length,
-                    project.writing_style,
-                    project.status,
-                    json.dumps(project.outline) if project.outline else None,
-                    json.dumps(project.research_materials) if project.research_materials else None,
-                    project.chapters_completed,
-                    project.total_words,
-                    project.current_chapter,
-                    project.created_at.isoformat(),
-                    project.updated_at.isoformat(),
-                    project.completed_at.isoformat() if project.completed_at else None,
-                    json.dumps(project.metadata)
-                ))
-                
-                conn.commit()
                 logger.info(f"Project saved: {project.id}")
                 return True
                 
         except Exception as e:
             logger.error(f"Error saving project {project.id}: {e}")
             return False
+
+    def _save_many(self, table: str, cols: tuple, rows: List[tuple], kind: str) -> bool:
+        """Write rows with multi-row INSERTs inside a single transaction."""
+        if not rows:
+            return True
+        try:
+            with self._writer() as conn:
+                _bulk_insert(conn, table, cols, rows)
+                logger.info(f"Saved {len(rows)} {kind}")
+                return True
+
+        except Exception as e:
+            logger.error(f"Error saving {kind}: {e}")
+            return False
+
+    def save_projects(self, projects: List[BookProject]) -> bool:
+        """Save several book projects in one transaction."""
+        return self._save_many('projects', BookProject.FIELDS,
+                               [_project_row(p) for p in projects], 'projects')
+
+    def save_chapters(self, chapters: List[Chapter]) -> bool:
+        """Save several chapters in one transaction."""
+        return self._save_many('chapters', Chapter.FIELDS,
+                               [c.to_tuple() for c in chapters], 'chapters')
+
+    def save_agent_executions(self, executions: List[AgentExecution]) -> bool:
+        """Save several agent execution records in one transaction."""
+        return self._save_many('agent_executions', AgentExecution.FIELDS,
+                               [_execution_row(e) for e in executions], 'agent executions')
     
     def get_project(self, project_id: str) -> Optional[BookProject]:
         """Retrieve a book project from database."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                cursor.execute('SELECT * FROM projects WHERE id = ?', (project_id,))
-                row = cursor.fetchone()
+            with self._reader() as conn:
+                row = conn.execute(SQL_SELECT_PROJECT, (project_id,)).fetchone()
                 
                 if not row:
                     return None
                 
                 # Parse JSON fields
-                outline = json.loads(row['outline']) if row['outline'] else None
-                research_materials = json.loads(row['research_materials']) if row['research_materials'] else None
-                metadata = json.loads(row['metadata']) if row['metadata'] else {}
+                outline = json_utils.loads(row['outline']) if row['outline'] else None
+                research_materials = json_utils.loads(row['research_materials']) if row['research_materials'] else None
+                metadata = json_utils.loads(row['metadata']) if row['metadata'] else {}
                 
                 project = BookProject(
                     id=row['id'],
@@ -283,9 +593,9 @@ class BookDatabase:
                     chapters_completed=row['chapters_completed'],
                     total_words=row['total_words'],
                     current_chapter=row['current_chapter'],
-                    created_at=datetime.fromisoformat(row['created_at']),
-                    updated_at=datetime.fromisoformat(row['updated_at']),
-                    completed_at=datetime.fromisoformat(row['completed_at']) if row['completed_at'] else None,
+                    created_at=row['created_at'],
+                    updated_at=row['updated_at'],
+                    completed_at=row['completed_at'],
                     metadata=metadata
                 )
                 
@@ -295,73 +605,80 @@ class BookDatabase:
         except Exception as e:
             logger.error(f"Error loading project {project_id}: {e}")
             return None
+
+    def get_project_summary(self, project_id: str) -> Optional[ProjectSummary]:
+        """Retrieve a project's scalar fields without loading its JSON columns."""
+        try:
+            with self._reader() as conn:
+                row = conn.execute(SQL_SELECT_PROJECT_SUMMARY, (project_id,)).fetchone()
+
+                if not row:
+                    return None
+
+                return ProjectSummary(
+                    id=row['id'],
+                    user_id=row['user_id'],
+                    title=row['title'],
+                    genre=row['genre'],
+                    target_length=row['target_length'],
+                    writing_style=row['writing_style'],
+                    status=row['status'],
+                    chapters_completed=row['chapters_completed'],
+                    total_words=row['total_words'],
+                    current_chapter=row['current_chapter'],
+                    created_at=row['created_at'],
+                    updated_at=row['updated_at'],
+                    completed_at=row['completed_at']
+                )
+
+        except Exception as e:
+            logger.error(f"Error loading project summary {project_id}: {e}")
+            return None
     
+    def iter_projects(self, limit: Optional[int] = 50, before: Optional[Tuple[str, str]] = None,
+                      user_id: Optional[str] = None) -> Iterator[sqlite3.Row]:
+        """
+        Yield project list rows, most recently updated first.
+        
+        Pages with keyset pagination: pass the (updated_at, id) of the last
+        row seen as before to continue after it. limit=None returns every row.
+        """
+        sql = SQL_LIST_PROJECTS_BASE
+        conditions = []
+        params: List[Any] = []
+        if user_id is not None:
+            conditions.append('user_id = ?')
+            params.append(user_id)
+        if before is not None:
+            conditions.append('(updated_at < ? OR (updated_at = ? AND id < ?))')
+            params.extend((before[0], before[0], before[1]))
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY updated_at DESC, id DESC LIMIT ?'
+        params.append(-1 if limit is None else limit)
+
+        with self._reader() as conn:
+            yield from conn.execute(sql, params)
+
     def list_all_projects(self) -> List[Dict[str, Any]]:
         """List all projects with basic information."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                cursor.execute('''
-                    SELECT id, title, genre, status, chapters_completed, total_words,
-                           target_length, created_at, updated_at
-                    FROM projects
-                    ORDER BY updated_at DESC
-                ''')
-
-                projects = []
-                for row in cursor.fetchall():
-                    projects.append({
-                        'id': row['id'],
-                        'title': row['title'],
-                        'genre': row['genre'],
-                        'status': row['status'],
-                        'chapters_completed': row['chapters_completed'],
-                        'total_words': row['total_words'],
-                        'target_length': row['target_length'],
-                        'created_at': row['created_at'],
-                        'updated_at': row['updated_at']
-                    })
-
-                logger.info(f"Listed {len(projects)} total projects")
-                return projects
+            projects = [dict(row) for row in self.iter_projects(limit=None)]
+            logger.info(f"Listed {len(projects)} total projects")
+            return projects
 
         except Exception as e:
             logger.error(f"Error listing all projects: {e}")
             return []
 
-    def list_user_projects(self, user_id: str) -> List[Dict[str, Any]]:
-        """List all projects for a specific user."""
+    def list_user_projects(self, user_id: str, limit: Optional[int] = None,
+                           before: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """List projects for a specific user, optionally one page at a time."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                cursor.execute('''
-                    SELECT id, title, genre, status, chapters_completed, total_words,
-                           target_length, created_at, updated_at
-                    FROM projects
-                    WHERE user_id = ?
-                    ORDER BY updated_at DESC
-                ''', (user_id,))
-
-                projects = []
-                for row in cursor.fetchall():
-                    projects.append({
-                        'id': row['id'],
-                        'title': row['title'],
-                        'genre': row['genre'],
-                        'status': row['status'],
-                        'chapters_completed': row['chapters_completed'],
-                        'total_words': row['total_words'],
-                        'target_length': row['target_length'],
-                        'created_at': row['created_at'],
-                        'updated_at': row['updated_at']
-                    })
-
-                logger.info(f"Listed {len(projects)} projects for user {user_id}")
-                return projects
+            projects = [dict(row) for row in self.iter_projects(limit=limit, before=before,
+                                                                user_id=user_id)]
+            logger.info(f"Listed {len(projects)} projects for user {user_id}")
+            return projects
 
         except Exception as e:
             logger.error(f"Error listing user projects: {e}")
@@ -370,13 +687,17 @@ class BookDatabase:
     def delete_project(self, project_id: str) -> bool:
         """Delete a project and all its associated data."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._writer() as conn:
+                cursor = conn.execute(SQL_DELETE_PROJECT, (project_id,))
+                if cursor.rowcount == 0:
+                    logger.info(f"Project not found, nothing deleted: {project_id}")
+                    return False
                 
-                # Delete project (cascades will handle related records)
-                cursor.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+                # Foreign keys are not enforced on these connections, so the ON DELETE
+                # CASCADE clauses never fire; clear child rows via their project_id indexes
+                for table in PROJECT_CHILD_TABLES:
+                    conn.execute(f'DELETE FROM {table} WHERE project_id = ?', (project_id,))
                 
-                conn.commit()
                 logger.info(f"Project deleted: {project_id}")
                 return True
                 
@@ -387,15 +708,9 @@ class BookDatabase:
     def save_settings(self, category: str, data: Dict[str, Any]) -> bool:
         """Save settings for a category."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._writer() as conn:
+                conn.execute(SQL_INSERT_SETTINGS, (f"{category}_settings", category, json_utils.dumps(data)))
                 
-                cursor.execute('''
-                    INSERT OR REPLACE INTO settings (id, category, data, updated_at)
-                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                ''', (f"{category}_settings", category, json.dumps(data)))
-                
-                conn.commit()
                 logger.info(f"Settings saved for category: {category}")
                 return True
                 
@@ -406,17 +721,13 @@ class BookDatabase:
     def get_settings(self, category: str) -> Optional[Dict[str, Any]]:
         """Get settings for a category."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                cursor.execute('SELECT data FROM settings WHERE category = ?', (category,))
-                row = cursor.fetchone()
+            with self._reader() as conn:
+                row = conn.execute(SQL_SELECT_SETTINGS, (category,)).fetchone()
                 
                 if not row:
                     return None
                 
-                return json.loads(row['data'])
+                return json_utils.loads(row['data'])
                 
         except Exception as e:
             logger.error(f"Error getting settings for {category}: {e}")
@@ -425,16 +736,12 @@ class BookDatabase:
     def get_all_settings(self) -> Dict[str, Dict[str, Any]]:
         """Get all settings categories."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                cursor.execute('SELECT category, data FROM settings')
-                rows = cursor.fetchall()
+            with self._reader() as conn:
+                rows = conn.execute(SQL_SELECT_ALL_SETTINGS).fetchall()
                 
                 settings = {}
                 for row in rows:
-                    settings[row['category']] = json.loads(row['data'])
+                    settings[row['category']] = json_utils.loads(row['data'])
                 
                 return settings
                 
@@ -443,11 +750,14 @@ class BookDatabase:
             return {}
     
     def get_storage_stats(self) -> Dict[str, Any]:
-        """Get storage statistics."""
+        """Get storage statistics, cached for STATS_TTL seconds between writes."""
+        cached = self._stats_cache
+        if (cached is not None and cached[1] == self._write_count
+                and time.monotonic() - cached[0] < self.STATS_TTL):
+            return copy.deepcopy(cached[2])
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
+            computed_at, write_count = time.monotonic(), self._write_count
+            with self._reader() as conn:
                 stats = {
                     'total_projects': 0,
                     'total_chapters': 0,
@@ -457,35 +767,19 @@ class BookDatabase:
                     'newest_project': None
                 }
                 
-                # Count projects
-                cursor.execute('SELECT COUNT(*) FROM projects')
-                stats['total_projects'] = cursor.fetchone()[0]
-                
-                # Count chapters
-                cursor.execute('SELECT COUNT(*) FROM chapters')
-                stats['total_chapters'] = cursor.fetchone()[0]
-                
-                # Count executions
-                cursor.execute('SELECT COUNT(*) FROM agent_executions')
-                stats['total_executions'] = cursor.fetchone()[0]
+                row = conn.execute(SQL_STORAGE_STATS).fetchone()
+                stats['total_projects'] = row['total_projects']
+                stats['total_chapters'] = row['total_chapters']
+                stats['total_executions'] = row['total_executions']
                 
-                # Find oldest and newest projects
-                cursor.execute('''
-                    SELECT id, title, created_at FROM projects 
-                    ORDER BY created_at ASC LIMIT 1
-                ''')
-                oldest = cursor.fetchone()
-                if oldest:
-                    stats['oldest_project'] = {'id': oldest[0], 'title': oldest[1], 'created_at': oldest[2]}
-                
-                cursor.execute('''
-                    SELECT id, title, created_at FROM projects 
-                    ORDER BY created_at DESC LIMIT 1
-                ''')
-                newest = cursor.fetchone()
-                if newest:
-                    stats['newest_project'] = {'id': newest[0], 'title': newest[1], 'created_at': newest[2]}
+                if row['oldest_id'] is not None:
+                    stats['oldest_project'] = {'id': row['oldest_id'], 'title': row['oldest_title'],
+                                               'created_at': row['oldest_created_at']}
+                if row['newest_id'] is not None:
+                    stats['newest_project'] = {'id': row['newest_id'], 'title': row['newest_title'],
+                                               'created_at': row['newest_created_at']}
                 
+                self._stats_cache = (computed_at, write_count, copy.deepcopy(stats))
                 return stats
                 
         except Exception as e:
@@ -501,29 +795,25 @@ class BookDatabase:
                              parent_version_id: str = None, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
         """Save a new version of a chapter."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
+            with self._writer() as conn:
                 # Get next version number
-                cursor.execute('''
+                result = conn.execute('''
                     SELECT MAX(version_number) FROM chapter_versions
                     WHERE chapter_id = ? AND project_id = ?
-                ''', (chapter_id, project_id))
-                result = cursor.fetchone()
+                ''', (chapter_id, project_id)).fetchone()
                 next_version = (result[0] or 0) + 1
 
                 version_id = str(uuid.uuid4())
-                word_count = len(content.split())
+                word_count = count_words(content)
 
-                cursor.execute('''
+                conn.execute('''
                     INSERT INTO chapter_versions
                     (id, chapter_id, project_id, version_number, content, word_count,
                      created_by, change_summary, parent_version_id, metadata)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (version_id, chapter_id, project_id, next_version, content, word_count,
-                      created_by, change_summary, parent_version_id, json.dumps(metadata or {})))
+                ''', (version_id, chapter_id, project_id, next_version, _pack_text(content), word_count,
+                      created_by, change_summary, parent_version_id, json_utils.dumps(metadata or {})))
 
-                conn.commit()
                 logger.info(f"Saved chapter version {next_version} for chapter {chapter_id}")
 
                 return {
@@ -541,11 +831,8 @@ class BookDatabase:
     def get_chapter_versions(self, chapter_id: str, project_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get all versions of a chapter."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                cursor.execute('''
+            with self._reader() as conn:
+                cursor = conn.execute('''
                     SELECT id, chapter_id, project_id, version_number, word_count,
                            created_at, created_by, change_summary, parent_version_id
                     FROM chapter_versions
@@ -577,13 +864,10 @@ class BookDatabase:
     def get_chapter_version_content(self, version_id: str) -> Optional[str]:
         """Get the content of a specific chapter version."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                cursor.execute('SELECT content FROM chapter_versions WHERE id = ?', (version_id,))
-                result = cursor.fetchone()
+            with self._reader() as conn:
+                result = conn.execute('SELECT content FROM chapter_versions WHERE id = ?', (version_id,)).fetchone()
 
-                return result[0] if result else None
+                return _unpack_text(result[0]) if result else None
 
         except Exception as e:
             logger.error(f"Error getting chapter version content: {e}")
@@ -592,10 +876,8 @@ class BookDatabase:
     def restore_chapter_version(self, chapter_id: str, project_id: str, version_number: int) -> bool:
         """Restore a chapter to a specific version."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                cursor.execute('''
+            with self._reader() as conn:
+                cursor = conn.execute('''
                     SELECT content FROM chapter_versions
                     WHERE chapter_id = ? AND project_id = ? AND version_number = ?
                 ''', (chapter_id, project_id, version_number))
@@ -604,18 +886,18 @@ class BookDatabase:
                 if not result:
                     return False
 
-                content = result[0]
+                content = _unpack_text(result[0])
 
-                # Save as new version
-                self.save_chapter_version(
-                    chapter_id=chapter_id,
-                    project_id=project_id,
-                    content=content,
-                    created_by='user',
-                    change_summary=f'Restored from version {version_number}'
-                )
+            # Save as new version (outside the reader so the writer can be taken)
+            self.save_chapter_version(
+                chapter_id=chapter_id,
+                project_id=project_id,
+                content=content,
+                created_by='user',
+                change_summary=f'Restored from version {version_number}'
+            )
 
-                return True
+            return True
 
         except Exception as e:
             logger.error(f"Error restoring chapter version: {e}")
@@ -628,13 +910,11 @@ class BookDatabase:
     def save_character(self, character_data: Dict[str, Any]) -> str:
         """Save or update a character."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
+            with self._writer() as conn:
                 char_id = character_data.get('id') or str(uuid.uuid4())
                 now = datetime.now().isoformat()
 
-                cursor.execute('''
+                conn.execute('''
                     INSERT OR REPLACE INTO characters
                     (id, project_id, name, description, role, first_appearance_chapter,
                      last_appearance_chapter, traits, relationships, backstory,
@@ -644,12 +924,11 @@ class BookDatabase:
                       character_data.get('description', ''), character_data.get('role', ''),
                       character_data.get('first_appearance_chapter'),
                       character_data.get('last_appearance_chapter'),
-                      json.dumps(character_data.get('traits', [])),
-                      json.dumps(character_data.get('relationships', {})),
+                      json_utils.dumps(character_data.get('traits', [])),
+                      json_utils.dumps(character_data.get('relationships', {})),
                       character_data.get('backstory', ''), now,
-                      json.dumps(character_data.get('metadata', {}))))
+                      json_utils.dumps(character_data.get('metadata', {}))))
 
-                conn.commit()
                 logger.info(f"Saved character {char_id}")
                 return char_id
 
@@ -660,11 +939,8 @@ class BookDatabase:
     def get_characters(self, project_id: str) -> List[Dict[str, Any]]:
         """Get all characters for a project."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                cursor.execute('''
+            with self._reader() as conn:
+                cursor = conn.execute('''
                     SELECT id, project_id, name, description, role,
                            first_appearance_chapter, last_appearance_chapter,
                            traits, relationships, backstory, created_at, updated_at
@@ -682,8 +958,8 @@ class BookDatabase:
                         'role': row['role'],
                         'first_appearance_chapter': row['first_appearance_chapter'],
                         'last_appearance_chapter': row['last_appearance_chapter'],
-                        'traits': json.loads(row['traits']),
-                        'relationships': json.loads(row['relationships']),
+                        'traits': json_utils.loads(row['traits']),
+                        'relationships': json_utils.loads(row['relationships']),
                         'backstory': row['backstory'],
                         'created_at': row['created_at'],
                         'updated_at': row['updated_at']
@@ -698,10 +974,8 @@ class BookDatabase:
     def delete_character(self, character_id: str) -> bool:
         """Delete a character."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM characters WHERE id = ?', (character_id,))
-                conn.commit()
+            with self._writer() as conn:
+                conn.execute('DELETE FROM characters WHERE id = ?', (character_id,))
                 return True
         except Exception as e:
             logger.error(f"Error deleting character: {e}")
@@ -714,13 +988,11 @@ class BookDatabase:
     def save_plot_point(self, plot_data: Dict[str, Any]) -> str:
         """Save or update a plot point."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
+            with self._writer() as conn:
                 plot_id = plot_data.get('id') or str(uuid.uuid4())
                 now = datetime.now().isoformat()
 
-                cursor.execute('''
+                conn.execute('''
                     INSERT OR REPLACE INTO plot_points
                     (id, project_id, title, description, chapter_number, plot_type,
                      importance, characters_involved, dependencies, consequences,
@@ -729,13 +1001,12 @@ class BookDatabase:
                 ''', (plot_id, plot_data['project_id'], plot_data['title'],
                       plot_data.get('description', ''), plot_data.get('chapter_number'),
                       plot_data.get('plot_type', 'event'), plot_data.get('importance', 1),
-                      json.dumps(plot_data.get('characters_involved', [])),
-                      json.dumps(plot_data.get('dependencies', [])),
-                      json.dumps(plot_data.get('consequences', [])),
+                      json_utils.dumps(plot_data.get('characters_involved', [])),
+                      json_utils.dumps(plot_data.get('dependencies', [])),
+                      json_utils.dumps(plot_data.get('consequences', [])),
                       plot_data.get('status', 'planned'), now,
-                      json.dumps(plot_data.get('metadata', {}))))
+                      json_utils.dumps(plot_data.get('metadata', {}))))
 
-                conn.commit()
                 logger.info(f"Saved plot point {plot_id}")
                 return plot_id
 
@@ -746,11 +1017,8 @@ class BookDatabase:
     def get_plot_points(self, project_id: str) -> List[Dict[str, Any]]:
         """Get all plot points for a project."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                cursor.execute('''
+            with self._reader() as conn:
+                cursor = conn.execute('''
                     SELECT id, project_id, title, description, chapter_number, plot_type,
                            importance, characters_involved, dependencies, consequences,
                            status, created_at, updated_at
@@ -768,9 +1036,9 @@ class BookDatabase:
                         'chapter_number': row['chapter_number'],
                         'plot_type': row['plot_type'],
                         'importance': row['importance'],
-                        'characters_involved': json.loads(row['characters_involved']),
-                        'dependencies': json.loads(row['dependencies']),
-                        'consequences': json.loads(row['consequences']),
+                        'characters_involved': json_utils.loads(row['characters_involved']),
+                        'dependencies': json_utils.loads(row['dependencies']),
+                        'consequences': json_utils.loads(row['consequences']),
                         'status': row['status'],
                         'created_at': row['created_at'],
                         'updated_at': row['updated_at']
@@ -785,10 +1053,8 @@ class BookDatabase:
     def delete_plot_point(self, plot_id: str) -> bool:
         """Delete a plot point."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('DELETE FROM plot_points WHERE id = ?', (plot_id,))
-                conn.commit()
+            with self._writer() as conn:
+                conn.execute('DELETE FROM plot_points WHERE id = ?', (plot_id,))
                 return True
         except Exception as e:
             logger.error(f"Error deleting plot point: {e}")
@@ -801,12 +1067,10 @@ class BookDatabase:
     def save_template(self, template_data: Dict[str, Any]) -> str:
         """Save or update a writing template."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
+            with self._writer() as conn:
                 template_id = template_data.get('id') or str(uuid.uuid4())
 
-                cursor.execute('''
+                conn.execute('''
                     INSERT OR REPLACE INTO writing_templates
                     (id, name, description, genre, system_prompt, outline_template,
                      character_template, chapter_prompt_template, created_by, is_public, metadata)
@@ -817,9 +1081,8 @@ class BookDatabase:
                       template_data.get('character_template', ''),
                       template_data.get('chapter_prompt_template', ''),
                       template_data.get('created_by'), template_data.get('is_public', True),
-                      json.dumps(template_data.get('metadata', {}))))
+                      json_utils.dumps(template_data.get('metadata', {}))))
 
-                conn.commit()
                 logger.info(f"Saved template {template_id}")
                 return template_id
 
@@ -831,31 +1094,28 @@ class BookDatabase:
                       user_id: str = None) -> List[Dict[str, Any]]:
         """Get writing templates, optionally filtered by genre."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
+            with self._reader() as conn:
                 if genre:
                     if include_private and user_id:
-                        cursor.execute('''
+                        cursor = conn.execute('''
                             SELECT * FROM writing_templates
                             WHERE genre = ? AND (is_public = 1 OR created_by = ?)
                             ORDER BY name
                         ''', (genre, user_id))
                     else:
-                        cursor.execute('''
+                        cursor = conn.execute('''
                             SELECT * FROM writing_templates WHERE genre = ? AND is_public = 1
                             ORDER BY name
                         ''', (genre,))
                 else:
                     if include_private and user_id:
-                        cursor.execute('''
+                        cursor = conn.execute('''
                             SELECT * FROM writing_templates
                             WHERE is_public = 1 OR created_by = ?
                             ORDER BY name
                         ''', (user_id,))
                     else:
-                        cursor.execute('''
+                        cursor = conn.execute('''
                             SELECT * FROM writing_templates WHERE is_public = 1 ORDER BY name
                         ''')
 
@@ -873,7 +1133,7 @@ class BookDatabase:
                         'created_by': row['created_by'],
                         'is_public': row['is_public'],
                         'created_at': row['created_at'],
-                        'metadata': json.loads(row['metadata'])
+                        'metadata': json_utils.loads(row['metadata'])
                     })
 
                 return templates
@@ -885,12 +1145,8 @@ class BookDatabase:
     def get_template(self, template_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific template by ID."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                cursor.execute('SELECT * FROM writing_templates WHERE id = ?', (template_id,))
-                row = cursor.fetchone()
+            with self._reader() as conn:
+                row = conn.execute('SELECT * FROM writing_templates WHERE id = ?', (template_id,)).fetchone()
 
                 if row:
                     return {
@@ -905,7 +1161,7 @@ class BookDatabase:
                         'created_by': row['created_by'],
                         'is_public': row['is_public'],
                         'created_at': row['created_at'],
-                        'metadata': json.loads(row['metadata'])
+                        'metadata': json_utils.loads(row['metadata'])
                     }
 
                 return None
@@ -6,12 +6,14 @@ Supports multiple export formats: PDF, EPUB, DOCX, and plain text.
 
 import os
 import io
-import json
 import logging
+from operator import itemgetter
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from pathlib import Path
 
+from utils import json_utils
+
 logger = logging.getLogger(__name__)
 
 # Try to import optional dependencies
@@ -62,19 +64,19 @@ class BookExporter:
 
         # Get all chapter files and sort them naturally
         chapter_files = []
-        for filename in os.listdir(chapters_dir):
-            if filename.endswith('.md'):
-                try:
-                    # Extract chapter number from filename
-                    num = int(filename.split('_')[1].split('.')[0])
-                    chapter_files.append((num, filename))
-                except (IndexError, ValueError):
-                    continue
+        with os.scandir(chapters_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.md'):
+                    try:
+                        # Extract chapter number from filename
+                        num = int(entry.name.split('_')[1].split('.')[0])
+                        chapter_files.append((num, entry.name, entry.path))
+                    except (IndexError, ValueError):
+                        continue
 
-        chapter_files.sort(key=lambda x: x[0])
+        chapter_files.sort(key=itemgetter(0))
 
-        for num, filename in chapter_files:
-            filepath = os.path.join(chapters_dir, filename)
+        for num, filename, filepath in chapter_files:
             try:
                 with open(filepath, 'r', encoding='utf-8') as f:
                     content = f.read()
@@ -154,7 +156,7 @@ class BookExporter:
             }
         }
 
-        return json.dumps(data, indent=2).encode('utf-8')
+        return json_utils.dumpb(data, indent=True)
 
     def export_to_pdf(self, title: str = "Book", author: str = "Unknown",
                       page_size: str = "letter") -> Optional[bytes]:
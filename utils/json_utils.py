@@ -0,0 +1,56 @@
+"""
+JSON helpers for BookGPT.
+
+Uses orjson when it is installed and falls back to the standard library
+json module otherwise. Both paths return str so callers can swap freely.
+"""
+
+import json
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Try to import optional dependencies
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.debug("orjson not installed. Falling back to stdlib json.")
+
+
+def dumpb(obj: Any, sort_keys: bool = False, indent: bool = False) -> bytes:
+    """
+    Serialize obj to UTF-8 JSON bytes, for files and response bodies.
+    
+    sort_keys gives a canonical form for hashing; indent pretty-prints with
+    two spaces.
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # orjson is stricter about some types (e.g. ints > 64 bit); let json decide
+            pass
+    if indent:
+        return json.dumps(obj, indent=2, sort_keys=sort_keys, ensure_ascii=False).encode('utf-8')
+    # Compact separators, the same layout orjson produces
+    return json.dumps(obj, separators=(',', ':'), sort_keys=sort_keys).encode('utf-8')
+
+
+def dumps(obj: Any, sort_keys: bool = False, indent: bool = False) -> str:
+    """Serialize obj to a JSON string. Options as for dumpb()."""
+    return dumpb(obj, sort_keys=sort_keys, indent=indent).decode('utf-8')
+
+
+def loads(data: Any) -> Any:
+    """Deserialize a JSON str or bytes value."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -1,23 +1,67 @@
 import os
-import json
+import re
+import sys
+import asyncio
+import copy
+import functools
+import hashlib
+import queue
+import threading
+import time
 import logging
-from typing import Dict, Any, List, Optional, Union, Generator, Callable, TypeVar
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Dict, Any, List, Optional, Union, Generator, Callable, TypeVar, Tuple, Iterator, AsyncIterator
+)
 from dataclasses import dataclass, field
 from enum import Enum
+import httpx
 import openai
 from dotenv import load_dotenv
 
+from utils import json_utils
+from utils.semantic_cache import SemanticCache
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Try to import optional dependencies
+try:
+    import h2  # noqa: F401 - presence enables HTTP/2 in httpx
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+    logger.debug("h2 not installed. LLM HTTP connections will use HTTP/1.1.")
+
+# Keep-alive pool shared by every request an LLMClient makes, so agent loops
+# reuse warm TCP/TLS connections instead of handshaking per call
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=32,
+                                keepalive_expiry=60.0)
+
+# Entries kept by each client's exact-match response cache
+RESPONSE_CACHE_SIZE = 1024
+
+# Requests chat_batch() keeps in flight at once
+BATCH_MAX_CONCURRENCY = 16
+
+# Stream updates buffered ahead of a slow run_stream() consumer
+STREAM_READ_AHEAD = 32
+
 class LLMProvider(Enum):
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
     GOOGLE = "google"
     MOCK = "mock"
 
-@dataclass
+# Slotted dataclasses need Python 3.10+; older interpreters keep __dict__ storage
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Accepts both the string value and the member itself (create_* factories pass members)
+_PROVIDER_MAP = {**{p.value: p for p in LLMProvider}, **{p: p for p in LLMProvider}}
+
+@dataclass(**_DATACLASS_OPTIONS)
 class LLMConfig:
     provider: LLMProvider = LLMProvider.OPENAI
     model: str = "gpt-4-turbo-preview"
@@ -26,23 +70,54 @@ class LLMConfig:
     temperature: float = 0.7
     max_tokens: int = 4000
     timeout: float = 60.0
+    response_cache_size: int = RESPONSE_CACHE_SIZE  # 0 disables the response cache
+    keep_raw_response: bool = False  # attach the SDK object to LLMResponse.raw_response
+    raw_sse_stream: bool = False  # parse tool-call streams from raw SSE instead of SDK objects
+    semantic_cache: bool = False  # serve chat() from similar earlier prompts
+    semantic_cache_threshold: float = 0.95
+    embedding_model: str = "text-embedding-3-small"
     extra_params: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ChatMessage:
     role: str
     content: str
     name: Optional[str] = None
     tool_calls: Optional[List[Dict[str, Any]]] = None
     tool_call_id: Optional[str] = None
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """API message dict, leaving out unset optional fields."""
+        d = {"role": self.role, "content": self.content}
+        if self.name: d["name"] = self.name
+        if self.tool_calls: d["tool_calls"] = self.tool_calls
+        if self.tool_call_id: d["tool_call_id"] = self.tool_call_id
+        return d
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ToolDefinition:
     name: str
     description: str
     parameters: Dict[str, Any]
+    # Same arguments give the same result until an impure tool runs, so
+    # AgentMode may reuse an earlier result instead of calling the tool again
+    pure: bool = False
+    # For pure tools that read one file: maps call arguments to its path, so
+    # reused results are also invalidated by writes made outside the agent
+    target_path: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """API tool schema dict."""
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters
+            }
+        }
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class LLMResponse:
     content: Optional[str]
     tool_calls: List[Dict[str, Any]] = field(default_factory=list)
@@ -53,6 +128,15 @@ class LLMResponse:
     def has_tool_calls(self) -> bool:
         return len(self.tool_calls) > 0
 
+@dataclass(**_DATACLASS_OPTIONS)
+class IterationInfo:
+    """Usage snapshot for a single LLM round, passed to ``on_iteration`` callbacks."""
+    iteration: int
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tool_calls: int = 0
+    elapsed_ms: float = 0.0
+
 class LLMClient:
     """Client for interacting with LLM providers."""
     
@@ -61,11 +145,7 @@ class LLMClient:
             self.config = config
         else:
             # Fallback for direct keyword arguments
-            provider_str = kwargs.get('provider', 'openai')
-            try:
-                provider = LLMProvider(provider_str)
-            except ValueError:
-                provider = LLMProvider.OPENAI
+            provider = _PROVIDER_MAP.get(kwargs.get('provider', 'openai'), LLMProvider.OPENAI)
                 
             self.config = LLMConfig(
                 provider=provider,
@@ -75,6 +155,13 @@ class LLMClient:
                 temperature=kwargs.get('temperature', 0.7),
                 max_tokens=kwargs.get('max_tokens', 4000)
             )
+        self._response_cache: "OrderedDict[bytes, LLMResponse]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._semantic_cache: Optional[SemanticCache] = None
+        if self.config.semantic_cache:
+            self._semantic_cache = SemanticCache(self._embed, threshold=self.config.semantic_cache_threshold)
         self._setup_client()
     
     def _setup_client(self):
@@ -83,14 +170,31 @@ class LLMClient:
             # but actual calls will fail unless base_url redirects elsewhere or key is set later
             api_key = self.config.api_key or os.getenv("OPENAI_API_KEY") or "sk-dummy-key-for-init"
             
+            # HTTP/2 (when h2 is installed) multiplexes concurrent streams over one
+            # connection; retries only cover failed connects, not API errors
+            self._http_client = httpx.Client(
+                transport=httpx.HTTPTransport(limits=HTTP_POOL_LIMITS, http2=H2_AVAILABLE, retries=2),
+                follow_redirects=True
+            )
             self._client = openai.OpenAI(
                 api_key=api_key,
-                base_url=self.config.base_url or os.getenv("OPENAI_BASE_URL")
+                base_url=self.config.base_url or os.getenv("OPENAI_BASE_URL"),
+                http_client=self._http_client
             )
         else:
             # Add other providers as needed
             raise ValueError(f"Provider {self.config.provider} not supported yet")
 
+    def close(self):
+        """Close the pooled HTTP connections."""
+        self._client.close()
+
+    @property
+    def uses_openai_api(self) -> bool:
+        """True when requests go to api.openai.com rather than a compatible server."""
+        return (self.config.provider == LLMProvider.OPENAI
+                and not (self.config.base_url or os.getenv("OPENAI_BASE_URL")))
+
     def test_connection(self) -> Dict[str, Any]:
         """Test the connection to the LLM provider."""
         try:
@@ -111,59 +215,206 @@ class LLMClient:
                 "error": str(e)
             }
 
-    def _format_messages(self, messages: List[Union[Dict[str, Any], ChatMessage]]) -> List[Dict[str, Any]]:
-        formatted = []
-        for msg in messages:
-            if isinstance(msg, dict):
-                formatted.append(msg)
-            else:
-                d = {"role": msg.role, "content": msg.content}
-                if msg.name: d["name"] = msg.name
-                if msg.tool_calls: d["tool_calls"] = msg.tool_calls
-                if msg.tool_call_id: d["tool_call_id"] = msg.tool_call_id
-                formatted.append(d)
-        return formatted
-
-    def _format_tools(self, tools: List[Union[Dict[str, Any], ToolDefinition]]) -> List[Dict[str, Any]]:
-        formatted = []
-        for tool in tools:
-            if isinstance(tool, dict):
-                formatted.append(tool)
-            else:
-                formatted.append({
+    @staticmethod
+    def _format_messages(messages: List[Union[Dict[str, Any], ChatMessage]]) -> List[Dict[str, Any]]:
+        # Agent loops only hold plain dicts; hand their list back without rebuilding it
+        if all(type(msg) is dict for msg in messages):
+            return messages
+        return [msg if isinstance(msg, dict) else msg.as_dict() for msg in messages]
+
+    @staticmethod
+    def _format_tools(tools: List[Union[Dict[str, Any], ToolDefinition]]) -> List[Dict[str, Any]]:
+        return [tool if isinstance(tool, dict) else tool.as_dict() for tool in tools]
+
+    def _chat_params(
+        self,
+        messages: List[Union[Dict[str, Any], ChatMessage]],
+        kwargs: Dict[str, Any],
+        tools: Optional[List[Union[Dict[str, Any], ToolDefinition]]] = None
+    ) -> Dict[str, Any]:
+        """Build chat.completions.create() arguments, letting kwargs override config."""
+        params = {
+            "model": kwargs.pop("model", self.config.model),
+            "messages": self._format_messages(messages)
+        }
+        if tools is not None:
+            params["tools"] = self._format_tools(tools)
+            params["tool_choice"] = kwargs.pop("tool_choice", "auto")
+        params["temperature"] = kwargs.pop("temperature", self.config.temperature)
+        params["max_tokens"] = kwargs.pop("max_tokens", self.config.max_tokens)
+        params.update(kwargs)
+        return params
+
+    def _cache_key(self, params: Dict[str, Any]) -> Optional[bytes]:
+        """
+        Hash of the full request, or None when the response must not be cached.
+        
+        Only deterministic requests are cached: temperature 0, or an explicit seed.
+        """
+        if self.config.response_cache_size <= 0:
+            return None
+        temperature = params.get("temperature")
+        if params.get("seed") is None and (temperature is None or temperature > 0):
+            return None
+        try:
+            payload = json_utils.dumps(params, sort_keys=True)
+        except TypeError:
+            return None
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+    
+    def _cache_get(self, key: Optional[bytes]) -> Optional[LLMResponse]:
+        if key is None:
+            return None
+        with self._cache_lock:
+            cached = self._response_cache.get(key)
+            if cached is None:
+                self._cache_misses += 1
+                return None
+            self._response_cache.move_to_end(key)
+            self._cache_hits += 1
+        # Callers append tool calls to message lists, so hand out a copy
+        return self._detached(cached)
+    
+    def _cache_put(self, key: Optional[bytes], response: LLMResponse):
+        if key is None:
+            return
+        entry = self._detached(response)
+        with self._cache_lock:
+            self._response_cache[key] = entry
+            self._response_cache.move_to_end(key)
+            while len(self._response_cache) > self.config.response_cache_size:
+                self._response_cache.popitem(last=False)
+    
+    @staticmethod
+    def _detached(response: LLMResponse) -> LLMResponse:
+        """Copy of a response without raw_response, so caches do not pin SDK objects."""
+        return LLMResponse(
+            content=response.content,
+            tool_calls=copy.deepcopy(response.tool_calls),
+            usage=dict(response.usage)
+        )
+    
+    def _embed(self, text: str) -> List[float]:
+        """Embed text with the provider's embeddings endpoint."""
+        response = self._client.embeddings.create(model=self.config.embedding_model, input=text)
+        return response.data[0].embedding
+    
+    def _semantic_get(self, params: Dict[str, Any]) -> Tuple[Optional[LLMResponse], Optional[Tuple[bytes, Any]]]:
+        """
+        Look params up in the semantic cache.
+        
+        Returns (cached response or None, pending entry for _semantic_put). The
+        user messages are embedded; everything else in the request must match
+        exactly, so a hit never crosses system prompts, models or parameters.
+        """
+        if self._semantic_cache is None:
+            return None, None
+        text = "\n".join(
+            m["content"] for m in params["messages"]
+            if m.get("role") == "user" and isinstance(m.get("content"), str)
+        )
+        if not text:
+            return None, None
+        scope_params = dict(params)
+        scope_params["messages"] = [m for m in params["messages"] if m.get("role") != "user"]
+        try:
+            scope = hashlib.blake2b(json_utils.dumps(scope_params, sort_keys=True).encode('utf-8'),
+                                    digest_size=16).digest()
+            cached, embedding = self._semantic_cache.lookup(scope, text)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            return None, None
+        if cached is not None:
+            return self._detached(cached), None
+        return None, (scope, embedding)
+    
+    def _semantic_put(self, pending: Optional[Tuple[bytes, Any]], response: LLMResponse):
+        if pending is not None:
+            scope, embedding = pending
+            self._semantic_cache.add(scope, embedding, self._detached(response))
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters and size of the response caches."""
+        with self._cache_lock:
+            stats = {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "size": len(self._response_cache),
+                "max_size": self.config.response_cache_size
+            }
+        if self._semantic_cache is not None:
+            stats["semantic_hits"] = self._semantic_cache.hits
+            stats["semantic_misses"] = self._semantic_cache.misses
+            stats["semantic_size"] = len(self._semantic_cache)
+        return stats
+    
+    def clear_cache(self):
+        """Drop all cached responses and reset the counters."""
+        with self._cache_lock:
+            self._response_cache.clear()
+            self._cache_hits = 0
+            self._cache_misses = 0
+        if self._semantic_cache is not None:
+            self._semantic_cache.clear()
+    
+    @staticmethod
+    def _usage_dict(usage: Any) -> Optional[Dict[str, int]]:
+        """Token counts from an SDK usage object or raw usage dict (None when the server sent none)."""
+        if usage is None:
+            return None
+        if isinstance(usage, dict):
+            return {
+                "prompt_tokens": usage.get("prompt_tokens"),
+                "completion_tokens": usage.get("completion_tokens"),
+                "total_tokens": usage.get("total_tokens")
+            }
+        return {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens
+        }
+    
+    def _to_response(self, response: Any, with_tools: bool) -> LLMResponse:
+        """Convert an SDK completion into an LLMResponse."""
+        choice = response.choices[0]
+        tool_calls = []
+        
+        if with_tools and choice.message.tool_calls:
+            for tc in choice.message.tool_calls:
+                tool_calls.append({
+                    "id": tc.id,
                     "type": "function",
                     "function": {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "parameters": tool.parameters
+                        "name": tc.function.name,
+                        "arguments": tc.function.arguments
                     }
                 })
-        return formatted
+        
+        return LLMResponse(
+            content=choice.message.content,
+            tool_calls=tool_calls,
+            usage=self._usage_dict(response.usage) or {},
+            # Holding the SDK object keeps its parsed payload alive; opt in only
+            raw_response=response if self.config.keep_raw_response else None
+        )
 
     def chat(self, messages: List[Union[Dict[str, Any], ChatMessage]], **kwargs) -> LLMResponse:
-        formatted_messages = self._format_messages(messages)
-        params = {
-            "model": kwargs.pop("model", self.config.model),
-            "messages": formatted_messages,
-            "temperature": kwargs.pop("temperature", self.config.temperature),
-            "max_tokens": kwargs.pop("max_tokens", self.config.max_tokens),
-            **kwargs
-        }
+        params = self._chat_params(messages, kwargs)
+        cache_key = self._cache_key(params)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        cached, semantic_entry = self._semantic_get(params)
+        if cached is not None:
+            return cached
         
         try:
             response = self._client.chat.completions.create(**params)
-            choice = response.choices[0]
-            
-            return LLMResponse(
-                content=choice.message.content,
-                tool_calls=[], # Standard chat doesn't have tool calls in this helper
-                usage={
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                },
-                raw_response=response
-            )
+            # Standard chat doesn't have tool calls in this helper
+            result = self._to_response(response, with_tools=False)
+            self._cache_put(cache_key, result)
+            self._semantic_put(semantic_entry, result)
+            return result
         except Exception as e:
             logger.error(f"Chat error: {e}")
             raise
@@ -174,59 +425,48 @@ class LLMClient:
         tools: List[Union[Dict[str, Any], ToolDefinition]],
         **kwargs
     ) -> LLMResponse:
-        formatted_messages = self._format_messages(messages)
-        formatted_tools = self._format_tools(tools)
-        
-        params = {
-            "model": kwargs.pop("model", self.config.model),
-            "messages": formatted_messages,
-            "tools": formatted_tools,
-            "tool_choice": kwargs.pop("tool_choice", "auto"),
-            "temperature": kwargs.pop("temperature", self.config.temperature),
-            "max_tokens": kwargs.pop("max_tokens", self.config.max_tokens),
-            **kwargs
-        }
+        params = self._chat_params(messages, kwargs, tools)
+        cache_key = self._cache_key(params)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
         
         try:
             response = self._client.chat.completions.create(**params)
-            choice = response.choices[0]
-            tool_calls = []
-            
-            if choice.message.tool_calls:
-                for tc in choice.message.tool_calls:
-                    tool_calls.append({
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.function.name,
-                            "arguments": tc.function.arguments
-                        }
-                    })
-            
-            return LLMResponse(
-                content=choice.message.content,
-                tool_calls=tool_calls,
-                usage={
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                },
-                raw_response=response
-            )
+            result = self._to_response(response, with_tools=True)
+            self._cache_put(cache_key, result)
+            return result
         except Exception as e:
             logger.error(f"Chat with tools error: {e}")
             raise
 
+    def chat_batch(
+        self,
+        batch: List[List[Union[Dict[str, Any], ChatMessage]]],
+        tools: Optional[List[Union[Dict[str, Any], ToolDefinition]]] = None,
+        **kwargs
+    ) -> List[LLMResponse]:
+        """
+        Send several independent conversations and return their responses in order.
+        
+        The requests go out concurrently over the shared connection pool, so a
+        server with continuous batching (vLLM, TGI) can serve them in the same
+        forward passes. Uses chat_with_tools() when tools are given.
+        """
+        if not batch:
+            return []
+        
+        def send(messages):
+            if tools is None:
+                return self.chat(messages, **kwargs)
+            return self.chat_with_tools(messages, tools, **kwargs)
+        
+        with ThreadPoolExecutor(max_workers=min(len(batch), BATCH_MAX_CONCURRENCY)) as pool:
+            return list(pool.map(send, batch))
+
     def chat_stream(self, messages: List[Union[Dict[str, Any], ChatMessage]], **kwargs) -> Generator[str, None, None]:
-        formatted_messages = self._format_messages(messages)
-        params = {
-            "model": kwargs.pop("model", self.config.model),
-            "messages": formatted_messages,
-            "temperature": kwargs.pop("temperature", self.config.temperature),
-            "max_tokens": kwargs.pop("max_tokens", self.config.max_tokens),
-            "stream": True,
-            **kwargs
-        }
+        params = self._chat_params(messages, kwargs)
+        params["stream"] = True
         
         try:
             stream = self._client.chat.completions.create(**params)
@@ -246,110 +486,256 @@ class LLMClient:
         """
         Stream a chat completion response with tool calling support.
         """
-        formatted_messages = self._format_messages(messages)
-        formatted_tools = self._format_tools(tools)
-        
-        params = {
-            "model": kwargs.pop("model", self.config.model),
-            "messages": formatted_messages,
-            "tools": formatted_tools,
-            "tool_choice": kwargs.pop("tool_choice", "auto"),
-            "temperature": kwargs.pop("temperature", self.config.temperature),
-            "max_tokens": kwargs.pop("max_tokens", self.config.max_tokens),
-            "stream": True,
-            **kwargs
-        }
+        params = self._chat_params(messages, kwargs, tools)
+        params["stream"] = True
         
         if self.config.provider == LLMProvider.OPENAI:
             params["stream_options"] = {"include_usage": True}
         
         try:
-            stream = self._client.chat.completions.create(**params)
-            
-            content_chunks = []
-            current_tool_calls = {}
-            final_usage = None
+            if self.config.raw_sse_stream:
+                deltas = map(self._raw_delta, self.raw_stream(params))
+            else:
+                deltas = map(self._sdk_delta, self._client.chat.completions.create(**params))
             
-            for chunk in stream:
-                if hasattr(chunk, 'usage') and chunk.usage:
-                    final_usage = {
-                        "prompt_tokens": chunk.usage.prompt_tokens,
-                        "completion_tokens": chunk.usage.completion_tokens,
-                        "total_tokens": chunk.usage.total_tokens
-                    }
+            assembler = _StreamAssembler()
+            for delta in deltas:
+                yield from assembler.feed(*delta)
+            yield from assembler.finish()
+                    
+        except Exception as e:
+            logger.error(f"Chat stream with tools error: {e}")
+            raise
+
+    @staticmethod
+    def _sdk_delta(chunk: Any) -> Tuple[Optional[str], List[Tuple], Any]:
+        """(content, [(index, id, name, arguments)], usage) of one SDK stream chunk."""
+        usage = getattr(chunk, 'usage', None)
+        if not chunk.choices:
+            return None, [], usage
+        delta = chunk.choices[0].delta
+        tool_calls = []
+        if delta.tool_calls:
+            for tc in delta.tool_calls:
+                function = tc.function
+                tool_calls.append((tc.index, tc.id, function.name if function else None,
+                                   function.arguments if function else None))
+        return delta.content, tool_calls, usage
+
+    @staticmethod
+    def _raw_delta(event: Dict[str, Any]) -> Tuple[Optional[str], List[Tuple], Any]:
+        """(content, [(index, id, name, arguments)], usage) of one raw SSE event dict."""
+        usage = event.get('usage')
+        choices = event.get('choices')
+        if not choices:
+            return None, [], usage
+        delta = choices[0].get('delta') or {}
+        tool_calls = []
+        for tc in delta.get('tool_calls') or ():
+            function = tc.get('function') or {}
+            tool_calls.append((tc.get('index'), tc.get('id'), function.get('name'), function.get('arguments')))
+        return delta.get('content'), tool_calls, usage
 
-                if not chunk.choices:
+    def _raw_request(self, params: Dict[str, Any]) -> Tuple[str, str, Dict[str, str]]:
+        """URL, JSON body and headers for a raw streaming chat completion POST."""
+        body = dict(params)
+        body.update(body.pop("extra_body", None) or {})
+        headers = {
+            "Authorization": f"Bearer {self._client.api_key}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+        headers.update(body.pop("extra_headers", None) or {})
+        url = str(self._client.base_url).rstrip('/') + '/chat/completions'
+        return url, json_utils.dumps(body), headers
+
+    def raw_stream(self, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        POST a streaming chat completion over the pooled HTTP client and yield
+        each server-sent event as a dict, skipping the SDK's chunk objects.
+        """
+        url, body, headers = self._raw_request(params)
+        
+        with self._http_client.stream("POST", url, content=body, headers=headers,
+                                      timeout=self.config.timeout) as response:
+            if response.status_code >= 400:
+                response.read()
+                response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith('data:'):
                     continue
-                    
-                delta = chunk.choices[0].delta
-                
-                # 1. Handle content
-                if delta.content:
-                    content_chunks.append(delta.content)
-                    yield {
-                        'type': 'content',
-                        'data': delta.content
-                    }
-                
-                # 2. Handle tool call chunks
-                if delta.tool_calls:
-                    for tc_chunk in delta.tool_calls:
-                        idx = str(tc_chunk.index)
-                        if idx not in current_tool_calls:
-                            current_tool_calls[idx] = {
-                                'id': tc_chunk.id,
-                                'type': 'function',
-                                'function': {
-                                    'name': tc_chunk.function.name or '',
-                                    'arguments': tc_chunk.function.arguments or ''
-                                }
-                            }
-                            # Signal UI that a tool call started IF we have an ID
-                            if tc_chunk.id:
-                                yield {
-                                    'type': 'tool_call_start',
-                                    'data': {
-                                        'id': tc_chunk.id,
-                                        'name': tc_chunk.function.name
-                                    }
-                                }
-                        else:
-                            # Accumulate arguments
-                            if tc_chunk.function.arguments:
-                                current_tool_calls[idx]['function']['arguments'] += tc_chunk.function.arguments
-                            # If ID appears in later chunk for same index
-                            if tc_chunk.id and not current_tool_calls[idx]['id']:
-                                current_tool_calls[idx]['id'] = tc_chunk.id
-                                yield {
-                                    'type': 'tool_call_start',
-                                    'data': {
-                                        'id': tc_chunk.id,
-                                        'name': current_tool_calls[idx]['function']['name']
-                                    }
-                                }
-            
-            # 3. After stream finishes, yield the COMPLETED tool calls
-            full_content = ''.join(content_chunks)
-            completed_tools = [v for v in current_tool_calls.values() if v.get('id') and v['function'].get('name')]
-            
-            for tc in completed_tools:
-                yield {
-                    'type': 'tool_call',
-                    'data': tc
-                }
-                
-            yield {
-                'type': 'complete',
-                'data': {
-                    'content': full_content,
-                    'tool_calls': completed_tools,
-                    'usage': final_usage
-                }
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                if data:
+                    yield json_utils.loads(data)
+
+
+class AsyncLLMClient(LLMClient):
+    """
+    LLMClient counterpart backed by openai.AsyncOpenAI.
+    
+    chat() and chat_with_tools() are coroutines and the streaming methods are
+    async generators, so several requests can be in flight at once over the
+    shared keep-alive pool.
+    """
+    
+    def _setup_client(self):
+        # Embedding lookups would block the event loop; only the exact cache applies
+        self._semantic_cache = None
+        if self.config.provider == LLMProvider.OPENAI:
+            api_key = self.config.api_key or os.getenv("OPENAI_API_KEY") or "sk-dummy-key-for-init"
+            
+            self._http_client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(limits=HTTP_POOL_LIMITS, http2=H2_AVAILABLE, retries=2),
+                follow_redirects=True
+            )
+            self._client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=self.config.base_url or os.getenv("OPENAI_BASE_URL"),
+                http_client=self._http_client
+            )
+        else:
+            raise ValueError(f"Provider {self.config.provider} not supported yet")
+    
+    async def close(self):
+        """Close the pooled HTTP connections."""
+        await self._client.close()
+    
+    async def test_connection(self) -> Dict[str, Any]:
+        """Test the connection to the LLM provider."""
+        try:
+            response = await self.chat([
+                {"role": "user", "content": "ping"}
+            ], max_tokens=5)
+            
+            return {
+                "success": True,
+                "response": response.content,
+                "usage": response.usage
             }
-                    
+        except Exception as e:
+            logger.error(f"Connection test failed: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    async def chat(self, messages: List[Union[Dict[str, Any], ChatMessage]], **kwargs) -> LLMResponse:
+        params = self._chat_params(messages, kwargs)
+        cache_key = self._cache_key(params)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self._client.chat.completions.create(**params)
+            result = self._to_response(response, with_tools=False)
+            self._cache_put(cache_key, result)
+            return result
+        except Exception as e:
+            logger.error(f"Chat error: {e}")
+            raise
+    
+    async def chat_with_tools(
+        self, 
+        messages: List[Union[Dict[str, Any], ChatMessage]], 
+        tools: List[Union[Dict[str, Any], ToolDefinition]],
+        **kwargs
+    ) -> LLMResponse:
+        params = self._chat_params(messages, kwargs, tools)
+        cache_key = self._cache_key(params)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self._client.chat.completions.create(**params)
+            result = self._to_response(response, with_tools=True)
+            self._cache_put(cache_key, result)
+            return result
+        except Exception as e:
+            logger.error(f"Chat with tools error: {e}")
+            raise
+    
+    async def chat_batch(
+        self,
+        batch: List[List[Union[Dict[str, Any], ChatMessage]]],
+        tools: Optional[List[Union[Dict[str, Any], ToolDefinition]]] = None,
+        **kwargs
+    ) -> List[LLMResponse]:
+        """Send several independent conversations concurrently. See LLMClient.chat_batch()."""
+        semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+        
+        async def send(messages):
+            async with semaphore:
+                if tools is None:
+                    return await self.chat(messages, **kwargs)
+                return await self.chat_with_tools(messages, tools, **kwargs)
+        
+        return list(await asyncio.gather(*(send(messages) for messages in batch)))
+    
+    async def chat_stream(self, messages: List[Union[Dict[str, Any], ChatMessage]], **kwargs) -> AsyncIterator[str]:
+        params = self._chat_params(messages, kwargs)
+        params["stream"] = True
+        
+        try:
+            stream = await self._client.chat.completions.create(**params)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            raise
+    
+    async def chat_stream_with_tools(
+        self,
+        messages: List[Union[Dict[str, Any], ChatMessage]],
+        tools: List[Union[Dict[str, Any], ToolDefinition]],
+        **kwargs
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a chat completion with tool calling. Yields the same events as LLMClient's."""
+        params = self._chat_params(messages, kwargs, tools)
+        params["stream"] = True
+        
+        if self.config.provider == LLMProvider.OPENAI:
+            params["stream_options"] = {"include_usage": True}
+        
+        try:
+            assembler = _StreamAssembler()
+            if self.config.raw_sse_stream:
+                async for event in self.raw_stream(params):
+                    for update in assembler.feed(*self._raw_delta(event)):
+                        yield update
+            else:
+                stream = await self._client.chat.completions.create(**params)
+                async for chunk in stream:
+                    for update in assembler.feed(*self._sdk_delta(chunk)):
+                        yield update
+            for update in assembler.finish():
+                yield update
+        
         except Exception as e:
             logger.error(f"Chat stream with tools error: {e}")
             raise
+    
+    async def raw_stream(self, params: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of LLMClient.raw_stream()."""
+        url, body, headers = self._raw_request(params)
+        
+        async with self._http_client.stream("POST", url, content=body, headers=headers,
+                                            timeout=self.config.timeout) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                if data:
+                    yield json_utils.loads(data)
 
 
 # Global client management
@@ -388,6 +774,8 @@ def get_llm_client() -> LLMClient:
 def reset_llm_client():
     """Reset the global LLM client (useful when settings change)."""
     global _llm_client
+    if _llm_client is not None:
+        _llm_client.clear_cache()
     _llm_client = None
 
 
@@ -430,6 +818,350 @@ def create_lmstudio_client(base_url: str = "http://localhost:1234/v1", model: st
 ToolFunction = TypeVar('ToolFunction', bound=Callable[..., Any])
 
 
+def _iteration_info(iteration: int, usage: Optional[Dict[str, int]], tool_calls: int, started: float) -> IterationInfo:
+    """Build an IterationInfo from a provider usage dict and a perf_counter start time."""
+    usage = usage or {}
+    return IterationInfo(
+        iteration=iteration,
+        input_tokens=usage.get("prompt_tokens", 0) or 0,
+        output_tokens=usage.get("completion_tokens", 0) or 0,
+        tool_calls=tool_calls,
+        elapsed_ms=(time.perf_counter() - started) * 1000.0
+    )
+
+
+def _tool_args(tc: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode a tool call's JSON arguments; an empty string means no arguments."""
+    raw = tc['function']['arguments']
+    return json_utils.loads(raw) if raw else {}
+
+
+def _read_ahead(iterator: Iterator[Any], maxsize: int = STREAM_READ_AHEAD) -> Generator[Any, None, None]:
+    """
+    Read iterator on a background thread through a bounded queue.
+    
+    The network read for the next chunk overlaps with whatever the consumer
+    does with the current one; once maxsize items are waiting the reader
+    blocks. Errors are re-raised in the consumer, and closing this generator
+    stops the reader (which then closes iterator) at its next item.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    done = object()
+    
+    def put(entry: Tuple[Any, Optional[BaseException]]) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def produce():
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+    
+    threading.Thread(target=produce, name='llm-stream-read-ahead', daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+async def _iterate_in_thread(iterator: Iterator[Any]) -> AsyncIterator[Any]:
+    """
+    Consume a blocking iterator from async code.
+    
+    Each next() runs in the default thread pool, so the event loop stays free
+    while the iterator waits on the network between items.
+    """
+    loop = asyncio.get_running_loop()
+    done = object()
+    try:
+        while True:
+            item = await loop.run_in_executor(None, next, iterator, done)
+            if item is done:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                # Still running on a worker thread (the consumer was cancelled);
+                # it is never resumed and gets closed once collected
+                pass
+
+
+class _StreamAssembler:
+    """
+    Turns (content, tool_call_deltas, usage) stream deltas into the event
+    dicts chat_stream_with_tools() yields. Shared by the sync and async clients.
+    """
+
+    def __init__(self):
+        self.content_chunks: List[str] = []
+        self.tool_calls: Dict[Any, Dict[str, Any]] = {}
+        # Argument fragments per tool call, joined once the stream ends
+        # (repeated str += would copy the whole argument string per delta)
+        self.argument_chunks: Dict[Any, List[str]] = {}
+        # Usage of the last chunk that carried one; converted at the end
+        self.usage: Any = None
+
+    def feed(self, content: Optional[str], tool_call_deltas: List[Tuple], usage: Any) -> List[Dict[str, Any]]:
+        """Record one delta and return the events it produces."""
+        events = []
+        if usage:
+            self.usage = usage
+        
+        # 1. Handle content
+        if content:
+            self.content_chunks.append(content)
+            events.append({
+                'type': 'content',
+                'data': content
+            })
+        
+        # 2. Handle tool call chunks
+        for idx, tc_id, name, arguments in tool_call_deltas:
+            current = self.tool_calls.get(idx)
+            if current is None:
+                self.tool_calls[idx] = {
+                    'id': tc_id,
+                    'type': 'function',
+                    'function': {
+                        'name': name or '',
+                        'arguments': ''
+                    }
+                }
+                self.argument_chunks[idx] = [arguments or '']
+                # Signal UI that a tool call started IF we have an ID
+                if tc_id:
+                    events.append({
+                        'type': 'tool_call_start',
+                        'data': {
+                            'id': tc_id,
+                            'name': name
+                        }
+                    })
+            else:
+                # Accumulate arguments
+                if arguments:
+                    self.argument_chunks[idx].append(arguments)
+                # If ID appears in later chunk for same index
+                if tc_id and not current['id']:
+                    current['id'] = tc_id
+                    events.append({
+                        'type': 'tool_call_start',
+                        'data': {
+                            'id': tc_id,
+                            'name': current['function']['name']
+                        }
+                    })
+        return events
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Events for the COMPLETED tool calls and the final 'complete' summary."""
+        for idx, chunks in self.argument_chunks.items():
+            self.tool_calls[idx]['function']['arguments'] = ''.join(chunks)
+        completed_tools = [v for v in self.tool_calls.values() if v.get('id') and v['function'].get('name')]
+        
+        events = [{'type': 'tool_call', 'data': tc} for tc in completed_tools]
+        events.append({
+            'type': 'complete',
+            'data': {
+                'content': ''.join(self.content_chunks),
+                'tool_calls': completed_tools,
+                'usage': LLMClient._usage_dict(self.usage)
+            }
+        })
+        return events
+
+
+class _ToolMemo:
+    """
+    Results of pure tool calls made during one agent run.
+
+    When the tool names a target file, entries are keyed on its (st_ino,
+    st_mtime_ns, st_size) as well as the call, so a write the agent did not
+    make is noticed. clear() bumps a generation counter; a call that started
+    before a clear does not store its possibly stale result afterwards.
+    """
+
+    __slots__ = ('_entries', '_generation', '_lock')
+
+    def __init__(self):
+        self._entries: Dict[Tuple[bytes, Optional[Tuple[int, int, int]]], Any] = {}
+        self._generation = 0
+        # Async runs execute tool calls on pool threads
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[bytes, Optional[Tuple[int, int, int]]]) -> Tuple[bool, Any, int]:
+        """(hit, result, generation); pass generation back to put() on a miss."""
+        with self._lock:
+            if key in self._entries:
+                return True, self._entries[key], self._generation
+            return False, None, self._generation
+
+    def put(self, key: Tuple[bytes, Optional[Tuple[int, int, int]]], result: Any, generation: int):
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = result
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+def _target_stamp(tool: ToolDefinition, args: Dict[str, Any]) -> Optional[Tuple[int, int, int]]:
+    """(st_ino, st_mtime_ns, st_size) of the file a pure tool call reads, if it names one."""
+    if tool.target_path is None:
+        return None
+    try:
+        path = tool.target_path(args)
+        if path is None:
+            return None
+        st = os.stat(path)
+    except (OSError, ValueError, TypeError, KeyError):
+        # Missing file or bad arguments; the call fails and is not memoized
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+# Values a templated request varies in: quoted strings, URLs and numbers
+_SLOT_PATTERN = re.compile(r'"[^"\n]*"|\'[^\'\n]*\'|https?://\S+|\b\d+(?:\.\d+)?\b')
+
+
+class StructuralCache:
+    """
+    Remembers which pure tool calls opened the answer to a templated request.
+    
+    A request is reduced to its shape by replacing quoted strings, URLs and
+    numbers with placeholders. When a later request has the same shape,
+    AgentMode replays the remembered first-round tool calls with the new
+    values substituted and skips the LLM planning round. Share one instance
+    between AgentMode objects to carry it across runs.
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, List[Tuple[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def fingerprint(text: str) -> Tuple[bytes, List[str]]:
+        """Shape key of text and the slot values removed from it, in order."""
+        slots = []
+        
+        def take(match):
+            slots.append(match.group(0).strip('"\''))
+            return '<slot>'
+        
+        shape = _SLOT_PATTERN.sub(take, text)
+        return hashlib.blake2b(shape.encode('utf-8'), digest_size=16).digest(), slots
+    
+    @classmethod
+    def _templatize(cls, value: Any, slots: List[str]) -> Any:
+        if isinstance(value, str) and value in slots:
+            return {"__slot__": slots.index(value)}
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and str(value) in slots:
+            return {"__slot__": slots.index(str(value)), "numeric": True}
+        if isinstance(value, dict):
+            return {k: cls._templatize(v, slots) for k, v in value.items()}
+        if isinstance(value, list):
+            return [cls._templatize(v, slots) for v in value]
+        return value
+    
+    @classmethod
+    def _fill(cls, template: Any, slots: List[str]) -> Any:
+        if isinstance(template, dict):
+            if "__slot__" in template:
+                value = slots[template["__slot__"]]
+                if template.get("numeric"):
+                    return float(value) if '.' in value else int(value)
+                return value
+            return {k: cls._fill(v, slots) for k, v in template.items()}
+        if isinstance(template, list):
+            return [cls._fill(v, slots) for v in template]
+        return template
+    
+    @classmethod
+    def _has_derived(cls, template: Any, slots: List[str]) -> bool:
+        """
+        True if a literal left in template was built from a slot value, such as
+        'chapters/chapter_3.md' for slot '3'. Replaying it unchanged would
+        answer a different request than the one asked.
+        """
+        if isinstance(template, str):
+            return any(slot and slot in template for slot in slots)
+        if isinstance(template, dict):
+            if "__slot__" in template:
+                return False
+            return any(cls._has_derived(k, slots) or cls._has_derived(v, slots)
+                       for k, v in template.items())
+        if isinstance(template, list):
+            return any(cls._has_derived(v, slots) for v in template)
+        return False
+    
+    def record(self, text: str, calls: List[Tuple[str, Dict[str, Any]]]):
+        """
+        Remember the (tool name, arguments) calls that answered text.
+        
+        Only calls whose arguments use slot values whole are remembered; if
+        any argument merely contains one, the shape is not replayable and an
+        entry recorded for it earlier is dropped.
+        """
+        key, slots = self.fingerprint(text)
+        if not slots or not calls:
+            return
+        templates = [(name, self._templatize(args, slots)) for name, args in calls]
+        if any(self._has_derived(args, slots) for _, args in templates):
+            with self._lock:
+                self._entries.pop(key, None)
+            return
+        with self._lock:
+            self._entries[key] = templates
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def plan(self, text: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """Tool calls to replay for text, or None when its shape is unknown."""
+        key, slots = self.fingerprint(text)
+        with self._lock:
+            templates = self._entries.get(key)
+            if templates is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            return [(name, self._fill(args, slots)) for name, args in templates]
+        except (IndexError, ValueError):
+            # The new request put a non-number where the template expects one
+            return None
+
+
 class AgentMode:
     """
     Agentic mode that handles iterative tool calling with proper message loop.
@@ -458,7 +1190,9 @@ class AgentMode:
         tools: List[ToolDefinition],
         system_message: str,
         max_iterations: int = 20,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        dynamic_system: Optional[str] = None,
+        structural_cache: Optional[StructuralCache] = None
     ):
         """
         Initialize the agent mode.
@@ -466,23 +1200,206 @@ class AgentMode:
         Args:
             client: LLMClient instance for making API calls
             tools: List of available tool definitions
-            system_message: System prompt for the agent
+            system_message: Static system prompt for the agent. Keep it
+                            byte-identical between runs so the provider's
+                            prompt cache can reuse the prefix.
             max_iterations: Maximum number of tool-calling iterations
             temperature: Optional temperature override
+            dynamic_system: Optional per-request system content (project
+                            status, retrieved notes). Sent as a second system
+                            message after the static prefix.
+            structural_cache: Optional StructuralCache. run() replays the
+                              remembered pure tool calls for requests shaped
+                              like an earlier one instead of asking the LLM
+                              to plan them.
         """
         self.client = client
         self.tools = {tool.name: tool for tool in tools}
         self.tool_definitions = tools
+        # Formatted once; every round re-sends the same schemas
+        self._tool_schemas = LLMClient._format_tools(tools)
+        self.structural_cache = structural_cache
         self.system_message = system_message
+        self.dynamic_system = dynamic_system
         self.max_iterations = max_iterations
         self.temperature = temperature
+        self.prompt_cache_key = hashlib.blake2b(system_message.encode('utf-8'), digest_size=8).hexdigest()
+    
+    def _initial_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """System prompt(s) followed by the caller's messages, static content first."""
+        full_messages = [{"role": "system", "content": self.system_message}]
+        if self.dynamic_system:
+            full_messages.append({"role": "system", "content": self.dynamic_system})
+        full_messages.extend(messages if isinstance(messages, list) else [messages])
+        return full_messages
+    
+    def _request_params(self) -> Dict[str, Any]:
+        """Extra request parameters shared by every round of a run."""
+        if getattr(self.client, "uses_openai_api", False):
+            # Routes runs that share a static prompt to the same prompt-cache shard
+            return {"extra_body": {"prompt_cache_key": self.prompt_cache_key}}
+        return {}
+    
+    def _execute_tool_call(
+        self,
+        tc: Dict[str, Any],
+        tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]],
+        context: Optional[Dict[str, Any]],
+        memo: _ToolMemo
+    ) -> Tuple[str, Dict[str, Any], Any, bool]:
+        """
+        Parse one tool call's arguments and execute it.
+        
+        Returns (name, args, result, cache_hit). Results of pure tools are
+        memoized in memo, which lives for one run; running any impure tool
+        clears it, since it may have changed what they would return.
+        """
+        tool_name = tc['function']['name']
+        try:
+            args = _tool_args(tc)
+        except ValueError:  # json and orjson decode errors both subclass it
+            args = {}
+        
+        # Add context if provided
+        if context:
+            args.update(context)
+        
+        cache_key = None
+        generation = 0
+        tool = self.tools.get(tool_name)
+        pure = tool is not None and tool.pure
+        if pure:
+            try:
+                payload = json_utils.dumps({"t": tool_name, "a": args}, sort_keys=True)
+                cache_key = (hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest(),
+                             _target_stamp(tool, args))
+            except TypeError:
+                pass
+            if cache_key is not None:
+                hit, cached, generation = memo.get(cache_key)
+                if hit:
+                    return tool_name, args, cached, True
+        else:
+            memo.clear()
+        
+        # Execute the tool
+        tool_result = None
+        if tool_executor:
+            tool_result = tool_executor(tool_name, args)
+        elif tool_name in self.tools:
+            try:
+                tool_result = self.tools[tool_name].execute(**args)
+            except Exception as e:
+                tool_result = {"success": False, "error": str(e)}
+        else:
+            tool_result = {"success": False, "error": f"Unknown tool: {tool_name}"}
+        
+        if not pure:
+            # Also drop anything read while the write was in progress
+            memo.clear()
+        # Failures are not memoized; the next attempt may succeed
+        elif cache_key is not None and not (isinstance(tool_result, dict) and tool_result.get("success") is False):
+            memo.put(cache_key, tool_result, generation)
+        
+        return tool_name, args, tool_result, False
+    
+    @staticmethod
+    def _tool_message(tc: Dict[str, Any], tool_name: str, tool_result: Any) -> Dict[str, Any]:
+        """Build the role="tool" message that reports a result back to the LLM."""
+        # Convert result to string; strings pass through without a copy
+        if isinstance(tool_result, str):
+            result_content = tool_result
+        elif isinstance(tool_result, (bytes, bytearray)):
+            result_content = tool_result.decode('utf-8', errors='replace')
+        elif isinstance(tool_result, (dict, list)):
+            try:
+                result_content = json_utils.dumps(tool_result)
+            except TypeError:
+                result_content = str(tool_result)
+        else:
+            result_content = str(tool_result)
+        return {
+            "role": "tool",
+            "tool_call_id": tc['id'],
+            "name": tool_name,
+            "content": result_content
+        }
+    
+    def _run_tool_calls(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]],
+        context: Optional[Dict[str, Any]],
+        memo: _ToolMemo,
+        full_messages: List[Dict[str, Any]],
+        tool_results: List[Dict[str, Any]]
+    ):
+        """Execute one round's tool calls in order, recording messages and results."""
+        for tc in tool_calls:
+            tool_name, args, tool_result, cache_hit = self._execute_tool_call(tc, tool_executor, context, memo)
+            full_messages.append(self._tool_message(tc, tool_name, tool_result))
+            
+            tool_results.append({
+                "tool_call_id": tc['id'],
+                "tool_name": tool_name,
+                "arguments": args,
+                "result": tool_result,
+                "success": isinstance(tool_result, dict) and tool_result.get("success", True),
+                "cache_hit": cache_hit
+            })
+    
+    @staticmethod
+    def _request_text(messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Content of the latest user message, when it is plain text."""
+        for msg in reversed(messages if isinstance(messages, list) else [messages]):
+            if msg.get("role") == "user":
+                return msg["content"] if isinstance(msg.get("content"), str) else None
+        return None
+    
+    def _replay_plan(self, text: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """Tool calls remembered by the structural cache for text, as API tool calls."""
+        if self.structural_cache is None or not text:
+            return None
+        plan = self.structural_cache.plan(text)
+        if not plan:
+            return None
+        return [
+            {
+                "id": f"replay_{i}",
+                "type": "function",
+                "function": {"name": name, "arguments": json_utils.dumps(args)}
+            }
+            for i, (name, args) in enumerate(plan)
+        ]
+    
+    def _remember_plan(
+        self,
+        text: Optional[str],
+        tool_calls: Optional[List[Dict[str, Any]]],
+        tool_results: List[Dict[str, Any]]
+    ):
+        """Record a first round of tool calls if every call was pure and succeeded."""
+        if self.structural_cache is None or not text or not tool_calls:
+            return
+        if not all(tc['function']['name'] in self.tools and self.tools[tc['function']['name']].pure
+                   for tc in tool_calls):
+            return
+        if not all(r["success"] for r in tool_results[:len(tool_calls)]):
+            return
+        try:
+            calls = [(tc['function']['name'], _tool_args(tc))
+                     for tc in tool_calls]
+        except ValueError:
+            return
+        self.structural_cache.record(text, calls)
     
     def run(
         self,
         messages: List[Dict[str, Any]],
         tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
         context: Optional[Dict[str, Any]] = None,
-        final_callback: Optional[Callable[[str], None]] = None
+        final_callback: Optional[Callable[[str], None]] = None,
+        on_iteration: Optional[Callable[[IterationInfo], Optional[bool]]] = None
     ) -> Dict[str, Any]:
         """
         Run the full agentic loop with tool calling.
@@ -493,26 +1410,39 @@ class AgentMode:
                           If None, uses default executor that looks up by name.
             context: Optional context passed to every tool call
             final_callback: Optional callback for streaming final response
+            on_iteration: Optional callback invoked after each LLM round with an
+                          IterationInfo. Returning False aborts the loop before
+                          the round's tool calls are executed.
             
         Returns:
             Dict with 'content', 'tool_results', 'iterations', 'finished'
         """
         # Build the full message list
-        full_messages = [{"role": "system", "content": self.system_message}]
-        full_messages.extend(messages if isinstance(messages, list) else [messages])
+        full_messages = self._initial_messages(messages)
         
         iterations = 0
         tool_results = []
+        memo = _ToolMemo()
+        
+        request_text = self._request_text(messages) if self.structural_cache is not None else None
+        first_round_calls = None
+        replayed = self._replay_plan(request_text)
+        if replayed:
+            # Known request shape: run its tool calls without an LLM planning round
+            full_messages.append({"role": "assistant", "content": "", "tool_calls": replayed})
+            self._run_tool_calls(replayed, tool_executor, context, memo, full_messages, tool_results)
         
         while iterations < self.max_iterations:
             iterations += 1
+            round_start = time.perf_counter()
             
             # Make the API call
             response = self.client.chat_with_tools(
                 messages=full_messages,
-                tools=self.tool_definitions,
+                tools=self._tool_schemas,
                 temperature=self.temperature,
-                tool_choice="auto"
+                tool_choice="auto",
+                **self._request_params()
             )
             
             # Get the assistant message
@@ -527,8 +1457,14 @@ class AgentMode:
             
             full_messages.append(assistant_msg)
             
+            abort = False
+            if on_iteration is not None:
+                info = _iteration_info(iterations, response.usage, len(response.tool_calls), round_start)
+                abort = on_iteration(info) is False
+            
             # If no tool calls, we're done
             if not response.has_tool_calls:
+                self._remember_plan(request_text, first_round_calls, tool_results)
                 if final_callback:
                     final_callback(response.content or "")
                 return {
@@ -539,49 +1475,20 @@ class AgentMode:
                     "usage": response.usage
                 }
             
-            # Execute tool calls
-            for tc in response.tool_calls:
-                tool_name = tc['function']['name']
-                try:
-                    args = json.loads(tc['function']['arguments'] or '{}')
-                except json.JSONDecodeError:
-                    args = {}
-                
-                # Add context if provided
-                if context:
-                    args.update(context)
-                
-                # Execute the tool
-                tool_result = None
-                if tool_executor:
-                    tool_result = tool_executor(tool_name, args)
-                elif tool_name in self.tools:
-                    try:
-                        tool_result = self.tools[tool_name].execute(**args)
-                    except Exception as e:
-                        tool_result = {"success": False, "error": str(e)}
-                else:
-                    tool_result = {"success": False, "error": f"Unknown tool: {tool_name}"}
-                
-                # Convert result to string
-                result_content = json.dumps(tool_result) if isinstance(tool_result, dict) else str(tool_result)
-                
-                # Create tool result message
-                tool_msg = {
-                    "role": "tool",
-                    "tool_call_id": tc['id'],
-                    "name": tool_name,
-                    "content": result_content
+            if abort:
+                return {
+                    "content": response.content or "Agent loop aborted by iteration callback.",
+                    "tool_results": tool_results,
+                    "iterations": iterations,
+                    "finished": False,
+                    "error": "aborted_by_callback"
                 }
-                full_messages.append(tool_msg)
-                
-                tool_results.append({
-                    "tool_call_id": tc['id'],
-                    "tool_name": tool_name,
-                    "arguments": args,
-                    "result": tool_result,
-                    "success": isinstance(tool_result, dict) and tool_result.get("success", True)
-                })
+            
+            if iterations == 1 and not replayed:
+                first_round_calls = response.tool_calls
+            
+            # Execute tool calls
+            self._run_tool_calls(response.tool_calls, tool_executor, context, memo, full_messages, tool_results)
         
         # Max iterations reached
         return {
@@ -596,39 +1503,62 @@ class AgentMode:
         self,
         messages: List[Dict[str, Any]],
         tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        on_iteration: Optional[Callable[[IterationInfo], Optional[bool]]] = None
     ) -> Generator[Dict[str, Any], None, None]:
         """
         Run the agentic loop with streaming support.
+        
+        ``on_iteration`` behaves as in run(): it receives an IterationInfo after
+        each streamed LLM round, and returning False aborts the loop.
         """
-        full_messages = [{"role": "system", "content": self.system_message}]
-        full_messages.extend(messages if isinstance(messages, list) else [messages])
+        full_messages = self._initial_messages(messages)
         
         iterations = 0
         tool_results = []
+        memo = _ToolMemo()
         
         while iterations < self.max_iterations:
             iterations += 1
             
             # Stream this turn
-            content_buffer = ""
+            round_start = time.perf_counter()
+            content_parts = []
             tool_calls_in_turn = []
             tool_results_in_turn = []
+            usage = None
             
-            for update in self.client.chat_stream_with_tools(
+            for update in _read_ahead(self.client.chat_stream_with_tools(
                 messages=full_messages,
-                tools=self.tool_definitions,
-                temperature=self.temperature
-            ):
+                tools=self._tool_schemas,
+                temperature=self.temperature,
+                **self._request_params()
+            )):
                 if update['type'] == 'content':
-                    content_buffer += update['data']
+                    content_parts.append(update['data'])
                     yield update
                 elif update['type'] == 'tool_call':
                     tc = update['data']
                     tool_calls_in_turn.append(tc)
                     yield update
                 elif update['type'] == 'complete':
+                    usage = update['data'].get('usage')
                     break
+            content_buffer = ''.join(content_parts)
+            
+            abort = False
+            if on_iteration is not None:
+                info = _iteration_info(iterations, usage, len(tool_calls_in_turn), round_start)
+                abort = on_iteration(info) is False
+            
+            if abort and tool_calls_in_turn:
+                yield {'type': 'complete', 'data': {
+                    'content': content_buffer or "Agent loop aborted by iteration callback.",
+                    'iterations': iterations,
+                    'finished': False,
+                    'error': 'aborted_by_callback'
+                }}
+                return
             
             if not tool_calls_in_turn:
                 # No tool calls, we're done
@@ -649,42 +1579,15 @@ class AgentMode:
             
             # Execute tool calls
             for tc in tool_calls_in_turn:
-                tool_name = tc['function']['name']
-                try:
-                    args = json.loads(tc['function']['arguments'] or '{}')
-                except json.JSONDecodeError:
-                    args = {}
-                
-                if context:
-                    args.update(context)
-                
-                # Execute
-                tool_result = None
-                if tool_executor:
-                    tool_result = tool_executor(tool_name, args)
-                elif tool_name in self.tools:
-                    try:
-                        tool_result = self.tools[tool_name].execute(**args)
-                    except Exception as e:
-                        tool_result = {"success": False, "error": str(e)}
-                else:
-                    tool_result = {"success": False, "error": f"Unknown tool: {tool_name}"}
-                
-                result_content = json.dumps(tool_result) if isinstance(tool_result, dict) else str(tool_result)
-                
-                tool_msg = {
-                    "role": "tool",
-                    "tool_call_id": tc['id'],
-                    "name": tool_name,
-                    "content": result_content
-                }
-                full_messages.append(tool_msg)
+                tool_name, args, tool_result, cache_hit = self._execute_tool_call(tc, tool_executor, context, memo)
+                full_messages.append(self._tool_message(tc, tool_name, tool_result))
                 
                 tool_results.append({
                     "tool_call_id": tc['id'],
                     "tool_name": tool_name,
                     "arguments": args,
-                    "result": tool_result
+                    "result": tool_result,
+                    "cache_hit": cache_hit
                 })
                 
                 yield {
@@ -704,6 +1607,167 @@ class AgentMode:
             'iterations': iterations,
             'finished': False
         }}
+    
+    def arun_stream(self, *args, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        run_stream() as an async iterator, for use from an event loop.
+        
+        The stream is driven on worker threads, so other coroutines keep
+        running between updates. Needs a streaming (synchronous) LLMClient.
+        """
+        return _iterate_in_thread(self.run_stream(*args, **kwargs))
+
+
+class AsyncAgentMode(AgentMode):
+    """
+    AgentMode whose run() is a coroutine driven by an AsyncLLMClient.
+    
+    Consecutive pure tool calls of one LLM round run concurrently: each is
+    dispatched to the default thread pool and the results are awaited together
+    with asyncio.gather, so a run of reads costs roughly its slowest call
+    instead of the sum. Impure calls (edits, writes, unknown tools) run one at
+    a time, after every earlier call of the round has finished and before any
+    later one starts, so they take effect in the order the LLM issued them.
+    Tool messages are appended in call order.
+    """
+    
+    async def _exec_tool(
+        self,
+        tc: Dict[str, Any],
+        tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]],
+        context: Optional[Dict[str, Any]],
+        memo: _ToolMemo
+    ) -> Tuple[str, Dict[str, Any], Any, bool]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self._execute_tool_call, tc, tool_executor, context, memo)
+        )
+    
+    async def _exec_round(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]],
+        context: Optional[Dict[str, Any]],
+        memo: _ToolMemo
+    ) -> List[Any]:
+        """Outcomes (or raised exceptions) of one round's tool calls, in call order."""
+        outcomes = []
+        pending = []
+        
+        async def flush():
+            outcomes.extend(await asyncio.gather(
+                *(self._exec_tool(tc, tool_executor, context, memo) for tc in pending),
+                return_exceptions=True
+            ))
+            pending.clear()
+        
+        for tc in tool_calls:
+            tool = self.tools.get(tc['function']['name'])
+            if tool is not None and tool.pure:
+                pending.append(tc)
+                continue
+            # Impure: let the earlier calls finish, then run it on its own
+            if pending:
+                await flush()
+            pending.append(tc)
+            await flush()
+        if pending:
+            await flush()
+        return outcomes
+    
+    async def run(
+        self,
+        messages: List[Dict[str, Any]],
+        tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        final_callback: Optional[Callable[[str], None]] = None,
+        on_iteration: Optional[Callable[[IterationInfo], Optional[bool]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the full agentic loop with tool calling. See AgentMode.run().
+        
+        A tool_executor that raises is reported to the LLM as a failed tool
+        result instead of aborting the other calls of the round.
+        """
+        full_messages = self._initial_messages(messages)
+        
+        iterations = 0
+        tool_results = []
+        memo = _ToolMemo()
+        
+        while iterations < self.max_iterations:
+            iterations += 1
+            round_start = time.perf_counter()
+            
+            response = await self.client.chat_with_tools(
+                messages=full_messages,
+                tools=self._tool_schemas,
+                temperature=self.temperature,
+                tool_choice="auto",
+                **self._request_params()
+            )
+            
+            assistant_msg = {
+                "role": "assistant",
+                "content": response.content or ""
+            }
+            if response.has_tool_calls:
+                assistant_msg["tool_calls"] = response.tool_calls
+            
+            full_messages.append(assistant_msg)
+            
+            abort = False
+            if on_iteration is not None:
+                info = _iteration_info(iterations, response.usage, len(response.tool_calls), round_start)
+                abort = on_iteration(info) is False
+            
+            if not response.has_tool_calls:
+                if final_callback:
+                    final_callback(response.content or "")
+                return {
+                    "content": response.content,
+                    "tool_results": tool_results,
+                    "iterations": iterations,
+                    "finished": True,
+                    "usage": response.usage
+                }
+            
+            if abort:
+                return {
+                    "content": response.content or "Agent loop aborted by iteration callback.",
+                    "tool_results": tool_results,
+                    "iterations": iterations,
+                    "finished": False,
+                    "error": "aborted_by_callback"
+                }
+            
+            # Execute this round's tool calls, pure runs concurrently
+            outcomes = await self._exec_round(response.tool_calls, tool_executor, context, memo)
+            
+            for tc, outcome in zip(response.tool_calls, outcomes):
+                if isinstance(outcome, Exception):
+                    tool_name, args, cache_hit = tc['function']['name'], {}, False
+                    tool_result = {"success": False, "error": str(outcome)}
+                else:
+                    tool_name, args, tool_result, cache_hit = outcome
+                full_messages.append(self._tool_message(tc, tool_name, tool_result))
+                
+                tool_results.append({
+                    "tool_call_id": tc['id'],
+                    "tool_name": tool_name,
+                    "arguments": args,
+                    "result": tool_result,
+                    "success": isinstance(tool_result, dict) and tool_result.get("success", True),
+                    "cache_hit": cache_hit
+                })
+        
+        return {
+            "content": "Agent reached maximum iteration limit. Some tasks may not be complete.",
+            "tool_results": tool_results,
+            "iterations": iterations,
+            "finished": False,
+            "error": "max_iterations_reached"
+        }
 
 
 class SubAgent:
@@ -758,12 +1822,19 @@ class SupervisorMode:
         agents: Dict[str, SubAgent],
         system_message: str,
         llm_client: Optional[LLMClient] = None,
-        max_delegations: int = 5
+        max_delegations: int = 5,
+        parallel_delegation: bool = True
     ):
+        """
+        Args:
+            parallel_delegation: Run the delegations the LLM issues in one round
+                                 concurrently instead of one after another.
+        """
         self.agents = agents
         self.system_message = system_message
         self.llm_client = llm_client
         self.max_delegations = max_delegations
+        self.parallel_delegation = parallel_delegation
         
         # Build tool definitions for calling sub-agents
         self.sub_agent_tools = [
@@ -790,6 +1861,102 @@ class SupervisorMode:
             )
             for name in agents.keys()
         ]
+        self._tool_schemas = LLMClient._format_tools(self.sub_agent_tools)
+        # Delegation tool name -> agent name, so dispatch is one dict lookup
+        self._delegate_names = {f"delegate_to_{name}": name for name in agents}
+    
+    def _handle_tool_call(
+        self,
+        tc: Dict[str, Any],
+        tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]],
+        delegate_callback: Optional[Callable[[str, str, Dict[str, Any]], Dict[str, Any]]]
+    ) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """Run one supervisor tool call. Returns (delegation record or None, result)."""
+        delegation, run = self._dispatch_tool_call(tc, tool_executor, delegate_callback)
+        return delegation, run()
+    
+    def _dispatch_tool_call(
+        self,
+        tc: Dict[str, Any],
+        tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]],
+        delegate_callback: Optional[Callable[[str, str, Dict[str, Any]], Dict[str, Any]]]
+    ) -> Tuple[Optional[Dict[str, Any]], Callable[[], Any]]:
+        """
+        Resolve one supervisor tool call without running it.
+        
+        Returns (delegation record or None, run); run() executes the call and
+        returns its result, so callers can report or schedule a delegation
+        before it starts.
+        """
+        tool_name = tc['function']['name']
+        
+        if self._delegation_target(tool_name) is None:
+            # Handle non-delegation tools
+            if tool_executor:
+                return None, functools.partial(tool_executor, tool_name, _tool_args(tc))
+            return None, lambda: {"error": f"Unknown function: {tool_name}"}
+        
+        # It's a delegation
+        agent_name, task, context = self._parse_delegation(tc)
+        delegation = {
+            "agent": agent_name,
+            "task": task,
+            "tool_call_id": tc['id']
+        }
+        return delegation, functools.partial(self._delegate, agent_name, task, context, delegate_callback)
+    
+    def _delegation_target(self, tool_name: str) -> Optional[str]:
+        """Agent name a delegate_to_* tool name addresses, or None for other tools."""
+        agent_name = self._delegate_names.get(tool_name)
+        if agent_name is None and tool_name.startswith("delegate_to_"):
+            # Not a registered agent; still a delegation, which _delegate() reports
+            agent_name = tool_name[len("delegate_to_"):]
+        return agent_name
+    
+    def _is_delegation(self, tc: Dict[str, Any]) -> bool:
+        return self._delegation_target(tc['function']['name']) is not None
+    
+    def _parse_delegation(self, tc: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+        """Split a delegate_to_* call into (agent name, task, context)."""
+        agent_name = self._delegation_target(tc['function']['name'])
+        args = _tool_args(tc)
+        return agent_name, args.get("task", ""), args.get("context", {})
+    
+    def _delegate(
+        self,
+        agent_name: str,
+        task: str,
+        context: Dict[str, Any],
+        delegate_callback: Optional[Callable[[str, str, Dict[str, Any]], Dict[str, Any]]]
+    ) -> Any:
+        if delegate_callback:
+            return delegate_callback(agent_name, task, context)
+        if agent_name in self.agents:
+            return self.agents[agent_name].run(task, context=context)
+        return {"error": f"Unknown agent: {agent_name}"}
+    
+    def _handle_tool_calls(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]],
+        delegate_callback: Optional[Callable[[str, str, Dict[str, Any]], Dict[str, Any]]]
+    ) -> List[Tuple[Optional[Dict[str, Any]], Any]]:
+        """
+        Run one round's tool calls and return their outcomes in call order.
+        
+        With parallel_delegation, delegations run on worker threads while any
+        other tool calls run inline.
+        """
+        handle = functools.partial(
+            self._handle_tool_call, tool_executor=tool_executor, delegate_callback=delegate_callback
+        )
+        delegation_calls = [tc for tc in tool_calls if self._is_delegation(tc)]
+        if not self.parallel_delegation or len(delegation_calls) < 2:
+            return [handle(tc) for tc in tool_calls]
+        
+        with ThreadPoolExecutor(max_workers=len(delegation_calls)) as pool:
+            futures = {id(tc): pool.submit(handle, tc) for tc in delegation_calls}
+            return [futures[id(tc)].result() if id(tc) in futures else handle(tc) for tc in tool_calls]
     
     def run(
         self,
@@ -811,7 +1978,7 @@ class SupervisorMode:
             
             response = client.chat_with_tools(
                 messages=all_messages,
-                tools=self.sub_agent_tools,
+                tools=self._tool_schemas,
                 tool_choice="auto"
             )
             
@@ -833,44 +2000,11 @@ class SupervisorMode:
                 }
             
             # Handle delegation tool calls
-            for tc in response.tool_calls:
-                tool_name = tc['function']['name']
-                
-                if not tool_name.startswith("delegate_to_"):
-                    # Handle non-delegation tools
-                    if tool_executor:
-                        args = json.loads(tc['function']['arguments'] or '{}')
-                        result = tool_executor(tool_name, args)
-                    else:
-                        result = {"error": f"Unknown function: {tool_name}"}
-                else:
-                    # It's a delegation
-                    agent_name = tool_name.replace("delegate_to_", "")
-                    args = json.loads(tc['function']['arguments'] or '{}')
-                    task = args.get("task", "")
-                    context = args.get("context", {})
-                    
-                    delegations.append({
-                        "agent": agent_name,
-                        "task": task,
-                        "tool_call_id": tc['id']
-                    })
-                    
-                    if delegate_callback:
-                        result = delegate_callback(agent_name, task, context)
-                    elif agent_name in self.agents:
-                        result = self.agents[agent_name].run(task, context=context)
-                    else:
-                        result = {"error": f"Unknown agent: {agent_name}"}
-                
-                result_content = json.dumps(result) if isinstance(result, dict) else str(result)
-                
-                all_messages.append({
-                    "role": "tool",
-                    "tool_call_id": tc['id'],
-                    "name": tool_name,
-                    "content": result_content
-                })
+            outcomes = self._handle_tool_calls(response.tool_calls, tool_executor, delegate_callback)
+            for tc, (delegation, result) in zip(response.tool_calls, outcomes):
+                if delegation:
+                    delegations.append(delegation)
+                all_messages.append(AgentMode._tool_message(tc, tc['function']['name'], result))
         
         return {
             "content": "Supervisor reached maximum delegation limit.",
@@ -898,21 +2032,22 @@ class SupervisorMode:
         while iterations < self.max_delegations:
             iterations += 1
             
-            content_buffer = ""
+            content_parts = []
             tool_calls_in_turn = []
             
-            for update in client.chat_stream_with_tools(
+            for update in _read_ahead(client.chat_stream_with_tools(
                 messages=all_messages,
-                tools=self.sub_agent_tools
-            ):
+                tools=self._tool_schemas
+            )):
                 if update['type'] == 'content':
-                    content_buffer += update['data']
+                    content_parts.append(update['data'])
                     yield update
                 elif update['type'] == 'tool_call':
                     tool_calls_in_turn.append(update['data'])
                     yield update
                 elif update['type'] == 'complete':
                     break
+            content_buffer = ''.join(content_parts)
             
             if not tool_calls_in_turn:
                 yield {'type': 'complete', 'data': {
@@ -929,62 +2064,29 @@ class SupervisorMode:
                 "tool_calls": tool_calls_in_turn
             })
             
-            # Handle delegations
-            for tc in tool_calls_in_turn:
-                tool_name = tc['function']['name']
-                
-                if tool_name.startswith("delegate_to_"):
-                    agent_name = tool_name.replace("delegate_to_", "")
-                    args = json.loads(tc['function']['arguments'] or '{}')
-                    task = args.get("task", "")
-                    context = args.get("context", {})
-                    
-                    delegations.append({
-                        "agent": agent_name,
-                        "task": task,
-                        "tool_call_id": tc['id']
-                    })
-                    
-                    yield {
-                        'type': 'delegation_start',
-                        'data': {
-                            'agent': agent_name,
-                            'task': task,
-                            'tool_call_id': tc['id']
-                        }
-                    }
-                    
-                    if delegate_callback:
-                        result = delegate_callback(agent_name, task, context)
-                    elif agent_name in self.agents:
-                        result = self.agents[agent_name].run(task, context=context)
-                    else:
-                        result = {"error": f"Unknown agent: {agent_name}"}
-                    
-                    yield {
-                        'type': 'delegation_result',
-                        'data': {
-                            'agent': agent_name,
-                            'tool_call_id': tc['id'],
-                            'result': result
-                        }
-                    }
-                else:
-                    # Handle non-delegation tools
-                    if tool_executor:
-                        args = json.loads(tc['function']['arguments'] or '{}')
-                        result = tool_executor(tool_name, args)
-                    else:
-                        result = {"error": f"Unknown function: {tool_name}"}
-                
-                result_content = json.dumps(result) if isinstance(result, dict) else str(result)
-                
-                all_messages.append({
-                    "role": "tool",
-                    "tool_call_id": tc['id'],
-                    "name": tool_name,
-                    "content": result_content
-                })
+            # Handle delegations. In parallel mode every delegation of the turn is
+            # started up front and its result reported in call order.
+            delegation_calls = [tc for tc in tool_calls_in_turn if self._is_delegation(tc)]
+            pool = None
+            futures = {}
+            if self.parallel_delegation and len(delegation_calls) > 1:
+                pool = ThreadPoolExecutor(max_workers=len(delegation_calls))
+                started = []
+                for tc in delegation_calls:
+                    delegation, run = self._dispatch_tool_call(tc, tool_executor, delegate_callback)
+                    futures[tc['id']] = (delegation, pool.submit(run))
+                    started.append(delegation)
+                delegations.extend(started)
+                for delegation in started:
+                    yield {'type': 'delegation_start', 'data': dict(delegation)}
+            
+            try:
+                yield from self._stream_tool_results(
+                    tool_calls_in_turn, futures, all_messages, delegations, tool_executor, delegate_callback
+                )
+            finally:
+                if pool is not None:
+                    pool.shutdown(wait=False)
             
             yield {'type': 'turn_complete', 'data': {'iteration': iterations}}
         
@@ -993,3 +2095,122 @@ class SupervisorMode:
             'delegations': delegations,
             'finished': False
         }}
+    
+    def arun_stream(self, *args, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """run_stream() as an async iterator; see AgentMode.arun_stream()."""
+        return _iterate_in_thread(self.run_stream(*args, **kwargs))
+    
+    def _stream_tool_results(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        futures: Dict[str, Tuple[Dict[str, Any], Any]],
+        all_messages: List[Dict[str, Any]],
+        delegations: List[Dict[str, Any]],
+        tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]],
+        delegate_callback: Optional[Callable[[str, str, Dict[str, Any]], Dict[str, Any]]]
+    ) -> Generator[Dict[str, Any], None, None]:
+        """Run (or collect) one turn's tool calls for run_stream(), in call order."""
+        for tc in tool_calls:
+            started = futures.get(tc['id'])
+            if started is not None:
+                # Already submitted by run_stream() in parallel mode
+                delegation, future = started
+                result = future.result()
+            else:
+                delegation, run = self._dispatch_tool_call(tc, tool_executor, delegate_callback)
+                if delegation is not None:
+                    delegations.append(delegation)
+                    yield {'type': 'delegation_start', 'data': dict(delegation)}
+                result = run()
+            
+            if delegation is not None:
+                yield {
+                    'type': 'delegation_result',
+                    'data': {
+                        'agent': delegation['agent'],
+                        'tool_call_id': tc['id'],
+                        'result': result
+                    }
+                }
+            
+            all_messages.append(AgentMode._tool_message(tc, tc['function']['name'], result))
+
+
+class AsyncSupervisorMode(SupervisorMode):
+    """
+    SupervisorMode whose run() is a coroutine driven by an AsyncLLMClient.
+    
+    Delegations issued in the same LLM round run concurrently in the default
+    thread pool (sub-agents themselves stay synchronous).
+    """
+    
+    async def run(
+        self,
+        messages: List[Dict[str, Any]],
+        tool_executor: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+        delegate_callback: Optional[Callable[[str, str, Dict[str, Any]], Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Run the supervisor with potential delegation. See SupervisorMode.run()."""
+        if not isinstance(self.llm_client, AsyncLLMClient):
+            raise ValueError("AsyncSupervisorMode requires an AsyncLLMClient")
+        client = self.llm_client
+        loop = asyncio.get_running_loop()
+        
+        all_messages = [{"role": "system", "content": self.system_message}]
+        all_messages.extend(messages if isinstance(messages, list) else [messages])
+        
+        delegations = []
+        iterations = 0
+        
+        while iterations < self.max_delegations:
+            iterations += 1
+            
+            response = await client.chat_with_tools(
+                messages=all_messages,
+                tools=self._tool_schemas,
+                tool_choice="auto"
+            )
+            
+            assistant_msg = {
+                "role": "assistant",
+                "content": response.content or ""
+            }
+            if response.has_tool_calls:
+                assistant_msg["tool_calls"] = response.tool_calls
+            
+            all_messages.append(assistant_msg)
+            
+            if not response.has_tool_calls:
+                return {
+                    "content": response.content,
+                    "delegations": delegations,
+                    "iterations": iterations,
+                    "finished": True
+                }
+            
+            # Fan out this round's calls, then report them in the original order
+            handle = functools.partial(
+                self._handle_tool_call, tool_executor=tool_executor, delegate_callback=delegate_callback
+            )
+            if self.parallel_delegation:
+                coros = [loop.run_in_executor(None, handle, tc) for tc in response.tool_calls]
+                outcomes = await asyncio.gather(*coros, return_exceptions=True)
+            else:
+                outcomes = [await loop.run_in_executor(None, handle, tc) for tc in response.tool_calls]
+            
+            for tc, outcome in zip(response.tool_calls, outcomes):
+                if isinstance(outcome, Exception):
+                    delegation, result = None, {"error": str(outcome)}
+                else:
+                    delegation, result = outcome
+                if delegation:
+                    delegations.append(delegation)
+                all_messages.append(AgentMode._tool_message(tc, tc['function']['name'], result))
+        
+        return {
+            "content": "Supervisor reached maximum delegation limit.",
+            "delegations": delegations,
+            "iterations": iterations,
+            "finished": False,
+            "error": "max_delegations_reached"
+        }
@@ -0,0 +1,180 @@
+"""
+Embedding-similarity cache for BookGPT LLM responses.
+
+Prompts are embedded and compared against earlier prompts by cosine
+similarity; a close enough match is served from the cache instead of
+calling the model again. Uses numpy for the similarity scan when it is
+installed and falls back to plain Python otherwise.
+"""
+
+import math
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Try to import optional dependencies
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.debug("numpy not installed. Semantic cache will use pure-Python similarity.")
+
+
+def _normalize(vector: Sequence[float]) -> Any:
+    """Scale a vector to unit length so a dot product is the cosine similarity."""
+    if NUMPY_AVAILABLE:
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(arr))
+        return arr / norm if norm else arr
+    norm = math.sqrt(sum(x * x for x in vector))
+    return tuple(x / norm for x in vector) if norm else tuple(vector)
+
+
+class _Bucket:
+    """
+    Entries cached under one scope, oldest first.
+
+    With numpy the vectors live in a ring buffer matrix that doubles when it
+    fills (up to the cache's max_entries), so adding or evicting an entry
+    never copies the rest of the bucket.
+    """
+
+    __slots__ = ('vectors', 'values', 'head', 'max_rows')
+
+    INITIAL_ROWS = 16
+
+    def __init__(self, vector: Any, max_rows: int):
+        self.values: deque = deque()
+        self.head = 0
+        self.max_rows = max(1, max_rows)
+        if NUMPY_AVAILABLE:
+            rows = min(self.INITIAL_ROWS, self.max_rows)
+            self.vectors = np.empty((rows, vector.shape[0]), dtype=np.float32)
+        else:
+            self.vectors = deque()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, vector: Any, value: Any):
+        if not NUMPY_AVAILABLE:
+            self.vectors.append(vector)
+            self.values.append(value)
+            return
+        rows = len(self.vectors)
+        size = len(self.values)
+        if size == rows:
+            # Unroll into a larger matrix so the oldest entry is row 0 again
+            grown = np.empty((min(rows * 2, self.max_rows), self.vectors.shape[1]), dtype=np.float32)
+            grown[:rows - self.head] = self.vectors[self.head:]
+            grown[rows - self.head:rows] = self.vectors[:self.head]
+            self.vectors, self.head, rows = grown, 0, len(grown)
+        self.vectors[(self.head + size) % rows] = vector
+        self.values.append(value)
+
+    def popleft(self):
+        """Drop the oldest entry."""
+        self.values.popleft()
+        if NUMPY_AVAILABLE:
+            # The slot is simply reused by a later append
+            self.head = (self.head + 1) % len(self.vectors)
+        else:
+            self.vectors.popleft()
+
+    def best_match(self, vector: Any) -> Tuple[Any, float]:
+        """Value of the most similar entry and its cosine similarity."""
+        if NUMPY_AVAILABLE:
+            end = self.head + len(self.values)
+            scores = self.vectors[self.head:end] @ vector
+            if end > len(self.vectors):
+                # The ring wraps; score the rows at the front of the matrix too
+                scores = np.concatenate((scores, self.vectors[:end - len(self.vectors)] @ vector))
+            best_index = int(np.argmax(scores))
+            best_score = float(scores[best_index])
+        else:
+            best_index, best_score = -1, -1.0
+            for i, cached in enumerate(self.vectors):
+                score = sum(a * b for a, b in zip(cached, vector))
+                if score > best_score:
+                    best_index, best_score = i, score
+        return self.values[best_index], best_score
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache keyed by prompt embeddings.
+
+    Entries live in per-scope buckets so prompts are only compared with
+    prompts sent under the same model, system prompt and parameters. The
+    oldest entry is evicted once max_entries is reached.
+    """
+
+    def __init__(
+        self,
+        embedder: Callable[[str], Sequence[float]],
+        threshold: float = 0.95,
+        max_entries: int = 10_000
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._buckets: Dict[Hashable, _Bucket] = {}
+        self._order: deque = deque()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def lookup(self, scope: Hashable, text: str) -> Tuple[Optional[Any], Any]:
+        """
+        Find the cached value whose prompt is most similar to text.
+
+        Returns (value or None, embedding); pass the embedding to add() on a
+        miss so the prompt is not embedded twice.
+        """
+        vector = _normalize(self.embedder(text))
+        with self._lock:
+            bucket = self._buckets.get(scope)
+            if bucket:
+                value, score = bucket.best_match(vector)
+                if score >= self.threshold:
+                    self.hits += 1
+                    return value, vector
+            self.misses += 1
+        return None, vector
+
+    def add(self, scope: Hashable, vector: Any, value: Any):
+        """Store value under an embedding returned by lookup()."""
+        with self._lock:
+            # Evict first so no bucket ever needs more than max_entries rows
+            while self._order and len(self._order) >= self.max_entries:
+                self._evict_oldest()
+
+            bucket = self._buckets.get(scope)
+            if bucket is None:
+                bucket = self._buckets[scope] = _Bucket(vector, self.max_entries)
+            bucket.append(vector, value)
+            self._order.append(scope)
+
+    def _evict_oldest(self):
+        # Buckets are append-only, so the oldest entry of a scope is its head
+        scope = self._order.popleft()
+        bucket = self._buckets[scope]
+        if len(bucket) == 1:
+            del self._buckets[scope]
+            return
+        bucket.popleft()
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._buckets.clear()
+            self._order.clear()
+            self.hits = 0
+            self.misses = 0
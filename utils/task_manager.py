@@ -4,18 +4,40 @@ Background task manager for BookGPT application.
 Handles asynchronous book writing processes without blocking the main application.
 """
 
+import os
+import sys
+import atexit
+import heapq
 import threading
 import queue
 import uuid
 import time
 import logging
-from typing import Dict, Any, Optional, Callable
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from datetime import datetime
 from dataclasses import dataclass, field
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Slotted dataclasses need Python 3.10+; older interpreters keep __dict__ storage
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Activity entries kept per task; older ones are evicted as new ones arrive
+MAX_TASK_ACTIVITIES = 50
+
+# Upper bound on worker threads; each one holds an agent and its LLM requests
+MAX_TASK_WORKERS = 16
+
+
+def _activity_dict(timestamp_ns: int, message: str) -> Dict[str, str]:
+    """Build the API form of an activity stamped with time.time_ns()."""
+    return {
+        'timestamp': datetime.fromtimestamp(timestamp_ns / 1e9).isoformat(),
+        'message': message
+    }
+
 class TaskStatus(Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -23,7 +45,7 @@ class TaskStatus(Enum):
     FAILED = "failed"
     CANCELLED = "cancelled"
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class Task:
     """Represents a background task."""
     id: str
@@ -38,11 +60,19 @@ class Task:
     created_at: datetime = field(default_factory=datetime.now)
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
-    activities: list = field(default_factory=list)
+    # API-form activity dicts, each formatted once when it is recorded
+    activities: deque = field(default_factory=lambda: deque(maxlen=MAX_TASK_ACTIVITIES))
+    # Serializes writers (worker, cancel); readers use _snapshot and never take it
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    # to_dict() form of the task, rebuilt by every write and swapped in whole
+    _snapshot: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert task to dictionary for JSON serialization."""
-        return {
+    def __post_init__(self):
+        self._publish()
+    
+    def _publish(self):
+        """Rebuild the read snapshot. Call with _lock held, after changing fields."""
+        self._snapshot = {
             'id': self.id,
             'type': self.type,
             'project_id': self.project_id,
@@ -55,18 +85,50 @@ class Task:
             'created_at': self.created_at.isoformat(),
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'activities': self.activities
+            'activities': list(self.activities)
         }
+    
+    def update(self, **changes):
+        """Set several fields at once and publish them to readers together."""
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self._publish()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert task to dictionary for JSON serialization.
+        
+        Returns the latest published snapshot without locking, so polling never
+        waits on the worker. The dict is shared between callers; do not modify it.
+        """
+        return self._snapshot
 
 class TaskManager:
     """Manages background tasks for async processing."""
     
     def __init__(self):
         self.tasks: Dict[str, Task] = {}
-        self.task_queue = queue.Queue()
+        # project_id -> {task_id: task} in creation order, so project lookups
+        # do not scan every task
+        self._tasks_by_project: Dict[str, Dict[str, Task]] = {}
+        # Heap of (completed_at timestamp, task_id) for finished tasks, oldest first
+        self._finished_heap: List[Tuple[float, str]] = []
+        # Guards both maps; held only for dict operations, never while a task runs
+        self._tasks_lock = threading.Lock()
+        # One queue shared by all workers, so a long book never holds up tasks
+        # queued behind it while another worker is idle. SimpleQueue skips
+        # Queue's maxsize and task_done() bookkeeping, which nothing here uses.
+        self.task_queue: queue.SimpleQueue = queue.SimpleQueue()
         self.worker_threads = []
-        self.max_workers = 3  # Limit concurrent background tasks
-        self.running = True
+        # Workers spend their time waiting on the LLM API, not the CPU, so the
+        # default stays small; BOOKGPT_WORKERS raises it up to MAX_TASK_WORKERS
+        self.max_workers = max(1, min(int(os.getenv("BOOKGPT_WORKERS", "3")), MAX_TASK_WORKERS))
+        # Shared by every task; BookDatabase is thread-safe (pooled readers, locked writer)
+        self._db = None
+        self._db_lock = threading.Lock()
+        # Set once by shutdown(); workers themselves stop on the queue sentinel
+        self._stop = threading.Event()
         self._start_workers()
     
     def _start_workers(self):
@@ -76,44 +138,56 @@ class TaskManager:
             worker.daemon = True
             worker.start()
             self.worker_threads.append(worker)
-            logger.info(f"Started worker thread: {worker.name}")
+            logger.debug(f"Started worker thread: {worker.name}")
     
     def _worker(self):
-        """Worker thread that processes tasks from the queue."""
-        logger.info(f"Worker thread {threading.current_thread().name} started")
-        while self.running:
+        """Worker thread that processes tasks from the queue until it receives None."""
+        logger.debug(f"Worker thread {threading.current_thread().name} started")
+        while True:
+            # Blocks without waking until a task or shutdown()'s None sentinel arrives
+            task_id = self.task_queue.get()
+            if task_id is None:
+                break
+            
             try:
-                task_id = self.task_queue.get(timeout=1.0)
-                if task_id is None:
-                    continue
-                
-                task = self.tasks.get(task_id)
+                task = self.get_task(task_id)
                 if not task:
                     logger.warning(f"Task {task_id} not found in tasks dict")
                     continue
                 
-                logger.info(f"Worker processing task {task_id} with status {task.status.value}")
+                logger.debug(f"Worker processing task {task_id} with status {task.status.value}")
                 self._execute_task(task)
                 
-                self.task_queue.task_done()
-                
-            except queue.Empty:
-                continue
             except Exception as e:
-                logger.error(f"Worker thread error: {e}")
-                import traceback
-                logger.error(f"Worker traceback: {traceback.format_exc()}")
+                logger.error(f"Worker thread error: {e}", exc_info=True)
         
-        logger.info(f"Worker thread {threading.current_thread().name} stopped")
+        logger.debug(f"Worker thread {threading.current_thread().name} stopped")
+    
+    def _get_db(self):
+        """Return the BookDatabase shared by all tasks, opening it on first use."""
+        if self._db is None:
+            with self._db_lock:
+                if self._db is None:
+                    # Import here to avoid circular imports
+                    from utils.database import BookDatabase
+                    self._db = BookDatabase()
+        return self._db
     
     def _execute_task(self, task: Task):
         """Execute a single task."""
         if not task:
             return
         
-        try:
+        with task._lock:
+            if task.status == TaskStatus.CANCELLED:
+                logger.info(f"Skipping cancelled task {task.id}")
+                return
             task.status = TaskStatus.RUNNING
             task.started_at = datetime.now()
+            task._publish()
+        
+        agent = None
+        try:
             logger.info(f"Starting task {task.id} of type {task.type}")
             
             # Execute task based on type
@@ -122,8 +196,7 @@ class TaskManager:
                 from utils.agent_factory import get_agent
 
                 # Get project details - use the same database as the main app
-                from utils.database import BookDatabase
-                db = BookDatabase()
+                db = self._get_db()
                 project = db.get_project(task.project_id)
 
                 if not project:
@@ -132,8 +205,10 @@ class TaskManager:
 
                 logger.info(f"Found project {task.project_id}: {project.title}")
 
-                # Get global agent instance
+                # Get global agent instance; progress callbacks are per thread, so
+                # tasks on other workers keep reporting to their own task
                 agent = get_agent()
+                agent.set_progress_callback(self._progress_callback(task))
 
                 # Update project status to writing
                 project.status = 'writing'
@@ -145,16 +220,13 @@ class TaskManager:
                 if task.type == 'resume_book':
                     result = agent.resume_writing_process(task.project_id)
                     if result.get('success'):
-                        task.status = TaskStatus.COMPLETED
-                        task.completed_at = datetime.now()
-                        task.message = result.get('message', 'Resume completed')
-                        task.result = result
-                        # Update project status
-                        project.status = result.get('phase', 'completed')
-                        if project.status == 'completed':
-                            project.completed_at = datetime.now()
-                        project.updated_at = datetime.now()
-                        db.save_project(project)
+                        task.update(
+                            status=TaskStatus.COMPLETED,
+                            completed_at=datetime.now(),
+                            message=result.get('message', 'Resume completed'),
+                            result=result
+                        )
+                        # The project's final status is saved once, below
                     else:
                         # Fall back to standard execution if resume fails
                         self._execute_book_writing(task, agent, project)
@@ -175,23 +247,24 @@ class TaskManager:
             
             # Only mark as completed if not already failed
             if task.status == TaskStatus.RUNNING:
-                task.status = TaskStatus.COMPLETED
-                task.completed_at = datetime.now()
-                task.message = "Task completed successfully"
+                task.update(
+                    status=TaskStatus.COMPLETED,
+                    completed_at=datetime.now(),
+                    message="Task completed successfully"
+                )
             
         except Exception as e:
-            task.status = TaskStatus.FAILED
-            task.error = str(e)
-            task.message = f"Task failed: {str(e)}"
-            task.completed_at = datetime.now()
-            logger.error(f"Task {task.id} failed: {e}")
-            import traceback
-            logger.error(f"Task failure traceback: {traceback.format_exc()}")
+            task.update(
+                status=TaskStatus.FAILED,
+                error=str(e),
+                message=f"Task failed: {str(e)}",
+                completed_at=datetime.now()
+            )
+            logger.error(f"Task {task.id} failed: {e}", exc_info=True)
             
             # Update project status to failed
             try:
-                from utils.database import BookDatabase
-                db = BookDatabase()
+                db = self._get_db()
                 project = db.get_project(task.project_id)
                 if project:
                     project.status = 'failed'
@@ -202,39 +275,46 @@ class TaskManager:
                 logger.error(f"Failed to update project status: {project_error}")
         
         finally:
+            if agent is not None:
+                # Do not leak this task's callback into the worker's next task
+                agent.set_progress_callback(None)
+            self._mark_finished(task)
             # Notify completion
             self._notify_task_completion(task)
     
-    def _execute_book_writing(self, task: Task, agent, project):
-        """Execute book writing task with progress tracking."""
-        project_id = task.project_id
-        
-        # Override agent's progress callback to update task
+    def _mark_finished(self, task: Task):
+        """Queue a task that reached a final status for cleanup_old_tasks()."""
+        completed_at = task.completed_at or datetime.now()
+        with self._tasks_lock:
+            heapq.heappush(self._finished_heap, (completed_at.timestamp(), task.id))
+    
+    @staticmethod
+    def _progress_callback(task: Task) -> Callable[..., None]:
+        """Build the agent progress callback that records updates on task."""
         def progress_callback(phase: str, progress: float, message: str, activity: str = None):
-            task.progress = progress
-            task.current_phase = phase
-            task.message = message
-            
-            if activity:
-                task.activities.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'message': activity
-                })
-            
-            # Limit activities to last 50 to prevent memory issues
-            if len(task.activities) > 50:
-                task.activities = task.activities[-50:]
-        
-        # Set progress callback
-        agent.set_progress_callback(progress_callback)
+            with task._lock:
+                task.progress = progress
+                task.current_phase = phase
+                task.message = message
+                
+                if activity:
+                    # Bounded deque: the oldest entry drops out once it is full
+                    task.activities.append(_activity_dict(time.time_ns(), activity))
+                task._publish()
         
+        return progress_callback
+    
+    def _execute_book_writing(self, task: Task, agent, project):
+        """Execute book writing task with progress tracking."""
         # Execute the writing process
         result = agent.start_writing_process(project)
         
-        task.result = result
-        task.progress = 100.0
-        task.current_phase = "refining"
-        task.message = "Book writing completed successfully. Entering Agent Mode."
+        task.update(
+            result=result,
+            progress=100.0,
+            current_phase="refining",
+            message="Book writing completed successfully. Entering Agent Mode."
+        )
     
     def _notify_task_completion(self, task: Task):
         """Notify about task completion (could be extended with websockets, etc.)."""
@@ -251,52 +331,74 @@ class TaskManager:
             message=f"Queued {task_type} task..."
         )
         
-        self.tasks[task_id] = task
+        with self._tasks_lock:
+            self.tasks[task_id] = task
+            self._tasks_by_project.setdefault(project_id, {})[task_id] = task
+            total = len(self.tasks)
         self.task_queue.put(task_id)
         
         logger.info(f"Created task {task_id} of type {task_type} for project {project_id}")
-        logger.info(f"Total tasks in manager: {len(self.tasks)}")
+        logger.debug(f"Total tasks in manager: {total}")
         return task_id
     
     def get_task(self, task_id: str) -> Optional[Task]:
         """Get task by ID."""
-        return self.tasks.get(task_id)
+        with self._tasks_lock:
+            return self.tasks.get(task_id)
     
     def get_project_tasks(self, project_id: str) -> list:
         """Get all tasks for a project."""
-        tasks = [task for task in self.tasks.values() if task.project_id == project_id]
-        logger.info(f"Getting tasks for project {project_id}: found {len(tasks)} tasks")
-        for task in tasks:
-            logger.info(f"  Task {task.id}: type={task.type}, status={task.status.value}")
+        with self._tasks_lock:
+            tasks = list(self._tasks_by_project.get(project_id, {}).values())
+        # Called on every progress poll; skip building the messages unless wanted
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Getting tasks for project {project_id}: found {len(tasks)} tasks")
+            for task in tasks:
+                logger.debug(f"  Task {task.id}: type={task.type}, status={task.status.value}")
         return tasks
     
     def cancel_task(self, task_id: str) -> bool:
         """Cancel a task (if it hasn't started yet)."""
-        task = self.tasks.get(task_id)
-        if task and task.status == TaskStatus.PENDING:
+        task = self.get_task(task_id)
+        if not task:
+            return False
+        with task._lock:
+            if task.status != TaskStatus.PENDING:
+                return False
             task.status = TaskStatus.CANCELLED
             task.completed_at = datetime.now()
             task.message = "Task cancelled"
-            return True
-        return False
+            task._publish()
+        self._mark_finished(task)
+        return True
     
     def cleanup_old_tasks(self, max_age_hours: int = 24):
         """Clean up old completed tasks to prevent memory leaks."""
         cutoff_time = datetime.now().timestamp() - (max_age_hours * 3600)
         
         tasks_to_remove = []
-        for task_id, task in self.tasks.items():
-            if (task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED] and
-                task.completed_at and task.completed_at.timestamp() < cutoff_time):
+        with self._tasks_lock:
+            # Only finished tasks are in the heap, so running ones are never visited
+            heap = self._finished_heap
+            while heap and heap[0][0] < cutoff_time:
+                _, task_id = heapq.heappop(heap)
+                task = self.tasks.pop(task_id, None)
+                if task is None:
+                    continue
                 tasks_to_remove.append(task_id)
+                project_tasks = self._tasks_by_project[task.project_id]
+                del project_tasks[task_id]
+                if not project_tasks:
+                    del self._tasks_by_project[task.project_id]
         
         for task_id in tasks_to_remove:
-            del self.tasks[task_id]
             logger.info(f"Cleaned up old task: {task_id}")
     
     def shutdown(self):
-        """Shutdown the task manager."""
-        self.running = False
+        """Shutdown the task manager. Safe to call more than once (atexit also calls it)."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
         
         # Send None to all workers to stop them
         for _ in range(len(self.worker_threads)):
@@ -308,5 +410,19 @@ class TaskManager:
         
         logger.info("Task manager shutdown complete")
 
-# Global task manager instance
-task_manager = TaskManager()
+# Global task manager instance, created on first use so importing this module
+# does not start worker threads (CLI tools, pre-fork servers)
+_task_manager: Optional[TaskManager] = None
+_task_manager_lock = threading.Lock()
+
+
+def get_task_manager() -> TaskManager:
+    """Return the shared TaskManager, starting it on the first call."""
+    global _task_manager
+    if _task_manager is None:
+        with _task_manager_lock:
+            if _task_manager is None:
+                manager = TaskManager()
+                atexit.register(manager.shutdown)
+                _task_manager = manager
+    return _task_manager